@@ -0,0 +1,127 @@
+#Шлендов М.А., 2-й курс, ИВТ-2. Лабораторная работа 2. Сумма двух.
+"""
+Сумма двух для многих target над одним массивом.
+
+two_sum строит словарь seen заново для каждого target. TwoSumIndex один раз
+сортирует nums (различные значения, первые и вторые вхождения, индексы
+вхождений каждого значения по возрастанию), а затем отвечает на пачку
+target векторно: дополнения ищутся через searchsorted по отсортированным
+значениям сразу для всех target пачки.
+
+Ответ совпадает с two_sum: [j, i], где i -- наименьший индекс, для которого
+раньше встретилось target - nums[i], а j -- последнее такое вхождение до i.
+Для значения b с дополнением a = target - b пара собирается на первом
+вхождении b, если a встретилось раньше, и на втором вхождении b, если
+a == b. Как и в two_sum, дополнение считается от более позднего элемента:
+с float target - b == a не значит target - a == b, и тогда пара собирается
+на первом вхождении b после первого a.
+
+Значения перебираются в порядке первых вхождений кусками растущего размера.
+Кандидат из куска не больше последнего первого вхождения в нём уже не
+улучшится, и такой target выбывает: если решение находится в начале
+массива, до конца массива дело не доходит.
+
+Значения и target должны помещаться в int64 или float64: в отличие от
+int Python, target - num здесь может переполниться.
+"""
+import numpy as np
+
+# Сколько клеток (target × значений) обрабатывается за один шаг
+BLOCK_ELEMENTS = 2 ** 20
+# Размер первого куска значений; следующие вдвое больше
+FIRST_CHUNK = 64
+
+class TwoSumIndex:
+    def __init__(self, nums):
+        values = np.asarray(nums)
+        if values.ndim != 1:
+            raise ValueError("nums должен быть одномерным")
+        if values.dtype.kind not in 'iuf':
+            values = values.astype(np.float64)
+        self.size = n = len(values)
+
+        # Устойчивая сортировка: внутри одинаковых значений индексы идут по возрастанию
+        self._order = order = np.argsort(values, kind='stable')
+        self.values, starts, counts = np.unique(values[order], return_index=True, return_counts=True)
+        # Ключи (номер значения, индекс) по возрастанию: по ним ищутся вхождения значения до и после индекса
+        self._keys = np.repeat(np.arange(len(self.values), dtype=np.int64), counts) * n + order
+        self._ends = starts + counts
+
+        self.first = order[starts]
+        # Второе вхождение; n -- «второго нет»
+        self.second = np.full(len(self.values), n, dtype=np.intp)
+        repeated = counts > 1
+        self.second[repeated] = order[starts[repeated] + 1]
+        # Номера значений в порядке первых вхождений
+        self._by_first = np.argsort(self.first)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def query(self, targets) -> np.ndarray:
+        """Массив (len(targets), 2) с парами [j, i]; [-1, -1] -- решения нет."""
+        targets = np.asarray(targets).reshape(-1)
+        result = np.full((len(targets), 2), -1, dtype=np.intp)
+        if self.size < 2:
+            return result
+
+        n = self.size
+        best = np.full(len(targets), n, dtype=np.intp)
+        partner = np.zeros(len(targets), dtype=np.int64)
+        active = np.arange(len(targets))
+        start, chunk = 0, FIRST_CHUNK
+        while active.size and start < len(self.values):
+            # Внутри куска -- по возрастанию значений: searchsorted по упорядоченным дополнениям быстрее
+            groups = np.sort(self._by_first[start:start + chunk])
+            rows_per_block = max(1, BLOCK_ELEMENTS // len(groups))
+            for block in range(0, active.size, rows_per_block):
+                rows = active[block:block + rows_per_block]
+                i, a = self._candidates(targets[rows], groups)
+                better = i < best[rows]
+                best[rows[better]] = i[better]
+                partner[rows[better]] = a[better]
+            start += len(groups)
+            chunk *= 2
+            active = active[best[active] > self.first[self._by_first[start - 1]]]
+
+        solved = np.nonzero(best < n)[0]
+        i = best[solved]
+        # j -- последнее вхождение дополнения до i
+        result[solved, 0] = self._order[np.searchsorted(self._keys, partner[solved] * n + i) - 1]
+        result[solved, 1] = i
+        return result
+
+    def _candidates(self, targets: np.ndarray, groups: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Для каждого target -- наименьший индекс, на котором собирается пара
+        со значением b из groups, и номер значения-дополнения a; n -- пары нет.
+        """
+        values, n = self.values, self.size
+        b = values[groups]
+        complements = targets[:, None] - b
+        partners = np.searchsorted(values, complements)
+        np.minimum(partners, len(values) - 1, out=partners)
+        found = values[partners] == complements
+
+        first_b, first_a = self.first[groups], self.first[partners]
+        # Если a встретилось позже b, пару соберёт сторона a, когда дойдёт до её куска
+        completes = np.where(first_a < first_b, first_b, n)
+        same = partners == groups
+        completes[same] = np.broadcast_to(self.second[groups], same.shape)[same]
+        completes[~found] = n
+
+        if values.dtype.kind == 'f':
+            # Сторона a не соберёт пару, если target - a != b: тогда -- первое b после первого a.
+            # Такие клетки редки, вхождения ищутся только для них
+            late = found & (first_a > first_b) & (targets[:, None] - values[partners] != b)
+            rows, columns = np.nonzero(late)
+            after = np.searchsorted(self._keys, groups[columns].astype(np.int64) * n + first_a[rows, columns], side='right')
+            completes[rows, columns] = np.where(after < self._ends[groups[columns]], self._order[np.minimum(after, n - 1)], n)
+
+        best = completes.argmin(axis=1)
+        rows = np.arange(len(targets))
+        return completes[rows, best], partners[rows, best]
+
+def two_sum_many(nums, targets) -> list[list[int]]:
+    """two_sum(nums, target) для каждого target, в формате two_sum: [j, i] или []."""
+    return [pair if pair[0] >= 0 else [] for pair in TwoSumIndex(nums).query(targets).tolist()]
@@ -0,0 +1,56 @@
+"""
+two_sum в цикле по target против TwoSumIndex над одним массивом.
+
+Два режима: «частые» решения (значения плотные, пара обычно находится в
+начале массива, и two_sum рано выходит) и «редкие» (значения разрежены,
+two_sum чаще всего проходит весь массив).
+
+Запуск из каталога лабораторной: python -m benchmarks.batch [--size 100000] [--targets 1000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from batch import TwoSumIndex
+
+def two_sum(nums, target):
+    seen = {}
+    for i, num in enumerate(nums):
+        complement = target - num
+        if complement in seen:
+            return [seen[complement], i]
+        seen[num] = i
+    return []
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=100_000)
+    parser.add_argument('--targets', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'режим':>8} | {'решено':>6} | {'two_sum, мс':>11} | {'индекс, мс':>10} | {'запросы, мс':>11} | {'ускорение':>9}")
+    for name, high in (('частые', args.size * 10), ('редкие', args.size ** 2)):
+        nums = rng.integers(0, high, args.size)
+        targets = rng.integers(0, 2 * high, args.targets)
+        nums_list, targets_list = nums.tolist(), targets.tolist()
+
+        start = time.perf_counter()
+        expected = [two_sum(nums_list, target) for target in targets_list]
+        loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = TwoSumIndex(nums)
+        built = time.perf_counter()
+        result = index.query(targets)
+        queried = time.perf_counter()
+
+        assert [pair if pair[0] >= 0 else [] for pair in result.tolist()] == expected
+        solved = sum(1 for pair in expected if pair)
+        total = queried - start
+        print(f"{name:>8} | {solved:>6} | {loop * 1000:>11.0f} | {(built - start) * 1000:>10.1f} | "
+              f"{(queried - built) * 1000:>11.0f} | {loop / total:>8.1f}×")
+
+if __name__ == '__main__':
+    main()
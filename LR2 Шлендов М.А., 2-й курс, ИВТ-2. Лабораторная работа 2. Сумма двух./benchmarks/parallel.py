@@ -0,0 +1,66 @@
+"""
+Масштабирование all_pairs и k_sum по числу процессов.
+
+all_pairs: --size случайных чисел из [0, size), target = size -- пар
+примерно size / 2. k_sum: --k-size чисел из широкого диапазона, тройки с
+суммой, которая встречается. Каждое число процессов из --workers (по
+умолчанию от 1 до числа ядер) проходит оба поиска; 1 -- в текущем процессе,
+без пула. Время включает запуск пула и копирование в разделяемую память.
+Для сравнения -- все пары через словарь списков на первых --dict-size числах.
+
+Запуск из каталога лабораторной: python -m benchmarks.parallel [--size 20000000] [--workers 1 2 4]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from parallel import all_pairs, k_sum
+
+def all_pairs_dict(nums, target):
+    seen = {}
+    pairs = []
+    for j, num in enumerate(nums):
+        for i in seen.get(target - num, ()):
+            pairs.append((i, j))
+        seen.setdefault(num, []).append(j)
+    return pairs
+
+def timed(func) -> tuple[object, float]:
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=20_000_000)
+    parser.add_argument('--k-size', type=int, default=20_000)
+    parser.add_argument('--dict-size', type=int, default=2_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=list(range(1, (os.cpu_count() or 1) + 1)))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    nums = rng.integers(0, args.size, args.size)
+    triples = rng.integers(-args.k_size * 50, args.k_size * 50, args.k_size)
+    triple_target = int(triples[0] + triples[1] + triples[2])
+    print(f"ядер: {os.cpu_count()}")
+
+    head = nums[:args.dict_size]
+    pairs, elapsed = timed(lambda: all_pairs_dict(head.tolist(), args.size))
+    assert len(pairs) == len(all_pairs(head, args.size, workers=1))
+    print(f"словарь списков, {args.dict_size:,} чисел: {elapsed:.1f} с, {args.dict_size / elapsed / 1e6:.1f} млн чисел/с\n")
+
+    print(f"{'процессов':>9} | {'пар':>10} | {'все пары, с':>11} | {'ускорение':>9} | {'троек':>6} | {'3-сумма, с':>10} | {'ускорение':>9}")
+    base = None
+    for workers in args.workers:
+        pairs, pairs_time = timed(lambda: all_pairs(nums, args.size, workers=workers))
+        found, triples_time = timed(lambda: k_sum(triples, triple_target, 3, workers=workers))
+        if base is None:
+            base = pairs_time, triples_time, len(pairs), len(found)
+        assert (len(pairs), len(found)) == base[2:]
+        print(f"{workers:>9} | {len(pairs):>10,} | {pairs_time:>11.1f} | {base[0] / pairs_time:>8.2f}× | "
+              f"{len(found):>6} | {triples_time:>10.1f} | {base[1] / triples_time:>8.2f}×")
+
+if __name__ == '__main__':
+    main()
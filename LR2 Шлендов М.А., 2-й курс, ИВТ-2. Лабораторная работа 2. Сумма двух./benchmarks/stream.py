@@ -0,0 +1,93 @@
+"""
+Потоковая сумма двух на большом файле: скорость и пиковая память.
+
+Файл из --size чисел int64 (по умолчанию 100 млн, 800 МБ) создаётся во
+временном каталоге. Все числа чётные, target нечётный -- решения нет, и
+файл читается до конца, а таблица набирает все --distinct различных
+значений: худший случай и по времени, и по памяти.
+
+Текстовый файл (по числу в строке) -- первые --text-size чисел. Для
+сравнения two_sum со словарём проходит первые --dict-size чисел.
+Пиковая память -- по tracemalloc (NumPy сообщает ему о своих массивах);
+страницы memmap -- это кэш файла, а не память процесса.
+
+Запуск из каталога лабораторной: python -m benchmarks.stream [--size 100000000] [--distinct 10000000]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from stream import CHUNK_SIZE, two_sum_stream
+
+def two_sum(nums, target):
+    seen = {}
+    for i, num in enumerate(nums):
+        complement = target - num
+        if complement in seen:
+            return [seen[complement], i]
+        seen[num] = i
+    return []
+
+def write_file(path: str, size: int, distinct: int):
+    rng = np.random.default_rng(0)
+    with open(path, 'wb') as f:
+        for start in range(0, size, CHUNK_SIZE):
+            (rng.integers(0, distinct, min(CHUNK_SIZE, size - start)) * 2).tofile(f)
+
+def measure(func) -> tuple[object, float, float]:
+    """Результат, секунды и пиковая память в МБ."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def report(name: str, n: int, elapsed: float, peak: float):
+    print(f"{name:>28} | {n:>11,} | {elapsed:>8.1f} | {n / elapsed / 1e6:>12.1f} | {peak:>13.0f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=100_000_000)
+    parser.add_argument('--distinct', type=int, default=10_000_000)
+    parser.add_argument('--dict-size', type=int, default=2_000_000)
+    parser.add_argument('--text-size', type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'numbers.bin')
+        write_file(path, args.size, args.distinct)
+        print(f"{'':>28} | {'чисел':>11} | {'сек':>8} | {'млн чисел/с':>12} | {'пик памяти, МБ':>13}")
+
+        result, elapsed, peak = measure(lambda: two_sum_stream(path, 1))
+        assert result == []
+        report('поток, двоичный файл', args.size, elapsed, peak)
+
+        # Текст -- только первые --text-size чисел: его запись и разбор медленнее
+        text_path = os.path.join(directory, 'numbers.txt')
+        with open(text_path, 'w') as f:
+            for start in range(0, args.text_size, CHUNK_SIZE):
+                chunk = np.fromfile(path, dtype=np.int64, count=min(CHUNK_SIZE, args.text_size - start), offset=start * 8)
+                f.write('\n'.join(map(str, chunk.tolist())) + '\n')
+        result, elapsed, peak = measure(lambda: two_sum_stream(text_path, 1, binary=False))
+        assert result == []
+        report('поток, текст', args.text_size, elapsed, peak)
+
+        nums = np.fromfile(path, dtype=np.int64, count=args.dict_size).tolist()
+        # Под tracemalloc каждый новый int отслеживается, поэтому время -- отдельным прогоном
+        start = time.perf_counter()
+        assert two_sum(nums, 1) == []
+        elapsed = time.perf_counter() - start
+        _, _, peak = measure(lambda: two_sum(nums, 1))
+        report('two_sum, dict', args.dict_size, elapsed, peak)
+        result, elapsed, peak = measure(lambda: two_sum_stream(nums, 1))
+        assert result == []
+        report('поток, тот же список', args.dict_size, elapsed, peak)
+
+if __name__ == '__main__':
+    main()
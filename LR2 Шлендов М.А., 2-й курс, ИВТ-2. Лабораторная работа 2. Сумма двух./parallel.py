@@ -0,0 +1,267 @@
+#Шлендов М.А., 2-й курс, ИВТ-2. Лабораторная работа 2. Сумма двух.
+"""
+Все пары и k-сумма на нескольких процессах с разбиением по хешу значения.
+
+all_pairs: значения раскладываются по P частям по хешу значения, а каждое
+дополнение target - nums[j] отправляется в часть, куда попало бы само
+дополнение. Часть q сопоставляет свои значения с пришедшими к ней
+дополнениями, не глядя на остальные части, поэтому части считаются
+независимо, каждая в своём процессе. Раскладка тоже параллельна: процесс
+группирует по частям свой отрезок массива, а часть q собирает свои
+индексы из групп всех отрезков.
+
+k_sum: различные значения и их количества строятся один раз, а по частям
+раскладывается первое (наименьшее) значение комбинации. Работа на первое
+значение растёт к началу отсортированного массива, и хеш распределяет её
+по частям равномерно, чего не дал бы делёж на отрезки.
+
+Массивы лежат в разделяемой памяти (multiprocessing.shared_memory):
+процессу передаются только имена блоков и границы, а не сами числа. С
+workers=1 всё считается в текущем процессе, без пула.
+
+Значения должны помещаться в int64 или float64: target - num здесь, в
+отличие от int Python, может переполниться. Для float пара (i, j)
+засчитывается, как в two_sum, если target - nums[j] == nums[i]; NaN не
+входит ни в одну пару.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+# Номер части хранится в uint8, и устойчивая сортировка по нему -- поразрядная
+MAX_PARTITIONS = 256
+MIN_PARTITIONS = 16
+# Множитель фибоначчиева хеширования: 2**64 / золотое сечение
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+def partition_of(values: np.ndarray, partitions: int) -> np.ndarray:
+    """Номер части для каждого значения (uint8); равные значения, в том числе 0.0 и -0.0, -- в одной части."""
+    if values.dtype.kind == 'f':
+        values = values + 0.0
+    mixed = (values.view(np.uint64) * _GOLDEN) >> np.uint64(32)
+    return (mixed % np.uint64(partitions)).astype(np.uint8)
+
+def _prepare(nums, target) -> tuple[np.ndarray, object]:
+    """nums и target одного типа, int64 или float64: иначе дополнение и значение хешируются по-разному."""
+    values = np.asarray(nums)
+    if values.ndim != 1:
+        raise ValueError("nums должен быть одномерным")
+    integer = values.dtype.kind in 'iub' and np.asarray(target).dtype.kind in 'iub'
+    values = values.astype(np.int64 if integer else np.float64, copy=False)
+    return values, values.dtype.type(target)
+
+def _defaults(workers: int | None, partitions: int | None) -> tuple[int, int]:
+    workers = workers or os.cpu_count() or 1
+    if partitions is None:
+        # Частей больше, чем процессов: неравные части не оставляют процессы без дела,
+        # а небольшая часть лучше помещается в кэш -- это быстрее и в одном процессе
+        partitions = min(MAX_PARTITIONS, max(MIN_PARTITIONS, 4 * workers))
+    if not 1 <= partitions <= MAX_PARTITIONS:
+        raise ValueError(f"partitions должно быть от 1 до {MAX_PARTITIONS}")
+    return workers, partitions
+
+class _Pool:
+    """
+    Пул процессов и массивы в разделяемой памяти для него. Задаче передаются
+    описания массивов (имя блока, форма, тип), процесс открывает блоки сам.
+    С workers=1 пула нет, и задачи получают обычные массивы.
+    """
+
+    def __init__(self, workers: int):
+        self.executor = ProcessPoolExecutor(workers) if workers > 1 else None
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.executor is not None:
+            self.executor.shutdown()
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+
+    def empty(self, shape, dtype):
+        dtype = np.dtype(dtype)
+        if self.executor is None:
+            return np.empty(shape, dtype)
+        block = SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        self._blocks.append(block)
+        return block.name, shape, dtype.str
+
+    def share(self, array: np.ndarray):
+        if self.executor is None:
+            return array
+        spec = self.empty(array.shape, array.dtype)
+        block = self._blocks[-1]
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        return spec
+
+    def map(self, func, arrays: list, tasks: list[tuple]) -> list:
+        """func(*массивы, *task) для каждой задачи, результаты -- в порядке задач."""
+        if self.executor is None:
+            return [func(*arrays, *task) for task in tasks]
+        return list(self.executor.map(_call, repeat(func), repeat(arrays), tasks))
+
+def _call(func, specs, task):
+    blocks = [SharedMemory(name=name) for name, _, _ in specs]
+    arrays = [np.ndarray(shape, dtype, buffer=block.buf) for block, (_, shape, dtype) in zip(blocks, specs)]
+    try:
+        return func(*arrays, *task)
+    finally:
+        # Блок нельзя закрыть, пока на его память смотрят массивы
+        del arrays
+        for block in blocks:
+            block.close()
+
+def _group(nums, order, complements, start: int, end: int, target, partitions: int) -> np.ndarray:
+    """
+    Индексы отрезка [start, end), сгруппированные по части значения (в order)
+    и по части дополнения (в complements); возвращает размеры групп, (2, partitions).
+    """
+    values = nums[start:end]
+    sizes = np.empty((2, partitions), dtype=np.int64)
+    for row, (keys, out) in enumerate(((values, order), (target - values, complements))):
+        parts = partition_of(keys, partitions)
+        # Устойчиво: внутри группы индексы по возрастанию
+        out[start:end] = np.argsort(parts, kind='stable') + start
+        sizes[row] = np.bincount(parts, minlength=partitions)
+    return sizes
+
+def _join(nums, order, complements, own: list, queries: list, target) -> np.ndarray:
+    """Пары [i, j], i < j, с target - nums[j] == nums[i] среди значений одной части; own и queries -- отрезки групп."""
+    mine = np.concatenate([order[start:end] for start, end in own])
+    asking = np.concatenate([complements[start:end] for start, end in queries])
+    values = nums[mine]
+    if values.dtype.kind == 'f':
+        present = ~np.isnan(values)
+        mine, values = mine[present], values[present]
+
+    # По значению, внутри значения -- по индексу
+    by_value = np.argsort(values, kind='stable')
+    values, mine = values[by_value], mine[by_value]
+    wanted = target - nums[asking]
+    # Упорядоченные дополнения ищутся подряд по памяти, а не вразброс: так в разы быстрее.
+    # Устойчиво: при равных дополнениях asking по-прежнему по возрастанию
+    by_wanted = np.argsort(wanted, kind='stable')
+    wanted, asking = wanted[by_wanted], asking[by_wanted]
+    first = np.searchsorted(values, wanted)
+    found = values[np.minimum(first, len(values) - 1)] == wanted if len(values) else np.zeros(len(wanted), dtype=bool)
+    first, asking = first[found], asking[found]
+
+    # Ключ (номер значения, индекс) по возрастанию: i < j -- это ключи до (номер, j)
+    groups = np.concatenate(([0], np.cumsum(values[1:] != values[:-1])))
+    keys = groups * len(nums) + mine
+    counts = np.searchsorted(keys, groups[first] * len(nums) + asking) - first
+
+    total = int(counts.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    pairs = np.empty((total, 2), dtype=np.int64)
+    pairs[:, 0] = mine[np.repeat(first, counts) + offsets]
+    pairs[:, 1] = np.repeat(asking, counts)
+    return pairs
+
+def all_pairs(nums, target, workers: int | None = None, partitions: int | None = None) -> np.ndarray:
+    """
+    Все пары индексов [i, j], i < j, с nums[i] + nums[j] == target, массив
+    (m, 2) по возрастанию. workers -- число процессов (по умолчанию по числу
+    ядер), partitions -- число частей хеша.
+    """
+    values, target = _prepare(nums, target)
+    workers, partitions = _defaults(workers, partitions)
+    n = len(values)
+    bounds = np.linspace(0, n, workers + 1).astype(np.int64)
+
+    with _Pool(workers) as pool:
+        arrays = [pool.share(values), pool.empty(n, np.int64), pool.empty(n, np.int64)]
+        sizes = np.array(pool.map(_group, arrays, [(int(start), int(end), target, partitions)
+                                                   for start, end in zip(bounds[:-1], bounds[1:])]))
+        # Начала групп: отрезок s, вид (значение / дополнение), часть q
+        starts = np.concatenate((np.zeros(sizes.shape[:2] + (1,), dtype=np.int64), np.cumsum(sizes, axis=2)), axis=2)
+        starts += bounds[:-1, None, None]
+        tasks = []
+        for q in range(partitions):
+            own = list(zip(starts[:, 0, q].tolist(), starts[:, 0, q + 1].tolist()))
+            queries = list(zip(starts[:, 1, q].tolist(), starts[:, 1, q + 1].tolist()))
+            tasks.append((own, queries, target))
+        parts = pool.map(_join, arrays, tasks)
+
+    # Одна сортировка ключей i * n + j быстрее lexsort по двум столбцам
+    keys = np.concatenate([pairs[:, 0] * n + pairs[:, 1] for pairs in parts])
+    keys.sort()
+    return np.column_stack(np.divmod(keys, max(n, 1)))
+
+def _pairs(values, counts, positions: np.ndarray, start: int, taken: int, remainder):
+    """Номера значений b <= c с remainder - b == c, b -- из positions; taken копий values[start] уже взято."""
+    b = values[positions]
+    c = remainder - b
+    partners = np.minimum(np.searchsorted(values, c), len(values) - 1)
+    left = counts[positions] - np.where(positions == start, taken, 0)
+    ok = (values[partners] == c) & (partners >= positions) & (left >= 1)
+    # b == c -- нужны две копии
+    ok &= (partners != positions) | (left >= 2)
+    return positions[ok], partners[ok]
+
+def _search(values, counts, positions: np.ndarray, start: int, taken: int, k: int, remainder, prefix: list, out: list):
+    """Комбинации из k значений с номерами из positions и дальше, дополняющие prefix до target."""
+    integer = values.dtype.kind == 'i'
+    if k == 2:
+        if integer:
+            # b <= c, то есть b <= remainder // 2
+            limit = np.searchsorted(values, remainder // 2, side='right')
+            positions = positions[:np.searchsorted(positions, limit)]
+        first, second = _pairs(values, counts, positions, start, taken, remainder)
+        if first.size:
+            rows = np.empty((len(first), len(prefix) + 2), dtype=values.dtype)
+            rows[:, :len(prefix)] = prefix
+            rows[:, -2], rows[:, -1] = values[first], values[second]
+            out.append(rows)
+        return
+
+    largest = values[-1].item()
+    for p in positions.tolist():
+        left = counts[p] - (taken if p == start else 0)
+        if left < 1:
+            continue
+        value = values[p].item()
+        if integer:
+            # Дальше значения только больше: k таких уже перебор
+            if value * k > remainder:
+                break
+            if value + (k - 1) * largest < remainder:
+                continue
+        _search(values, counts, np.arange(p, len(values)), p, (taken if p == start else 0) + 1,
+                k - 1, remainder - value, prefix + [value], out)
+
+def _k_sum_part(values, counts, q: int, partitions: int, k: int, target) -> np.ndarray:
+    out = []
+    positions = np.flatnonzero(partition_of(values, partitions) == q)
+    _search(values, counts, positions, 0, 0, k, target, [], out)
+    return np.concatenate(out) if out else np.empty((0, k), dtype=values.dtype)
+
+def k_sum(nums, target, k: int = 3, workers: int | None = None, partitions: int | None = None) -> np.ndarray:
+    """
+    Все различные наборы из k значений nums (по разным индексам) с суммой
+    target: массив (m, k), в строке значения по неубыванию, строки по
+    возрастанию. Для float сумма проверяется вычитанием по возрастанию значений.
+    """
+    if k < 2:
+        raise ValueError("k должно быть не меньше 2")
+    values, target = _prepare(nums, target)
+    target = target.item()
+    workers, partitions = _defaults(workers, partitions)
+    if values.dtype.kind == 'f':
+        values = values[~np.isnan(values)]
+    if not len(values):
+        return np.empty((0, k), dtype=values.dtype)
+    values, counts = np.unique(values, return_counts=True)
+
+    with _Pool(workers) as pool:
+        arrays = [pool.share(values), pool.share(counts)]
+        parts = pool.map(_k_sum_part, arrays, [(q, partitions, k, target) for q in range(partitions)])
+
+    rows = np.concatenate(parts)
+    return rows[np.lexsort(rows.T[::-1])]
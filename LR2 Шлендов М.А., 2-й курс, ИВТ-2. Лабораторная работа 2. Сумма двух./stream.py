@@ -0,0 +1,221 @@
+#Шлендов М.А., 2-й курс, ИВТ-2. Лабораторная работа 2. Сумма двух.
+"""
+Потоковая сумма двух: числа читаются кусками (из любого итерируемого, из
+двоичного файла int64/float64 через memmap или из текстового файла по
+числу в строке), и чтение останавливается на первом найденном ответе.
+
+Вместо словаря seen -- таблица с открытой адресацией на массивах NumPy:
+21 байт на ячейку (ключ, индекс, флаг занятости и служебная отметка для
+вставки), заполнено от четверти до половины ячеек. Ни ключи, ни индексы
+не становятся объектами int, как в dict, и куски обрабатываются целиком,
+без цикла Python по числам.
+
+Ответ совпадает с two_sum: [j, i], где i -- первый индекс, дополнение
+которого встретилось раньше, а j -- последнее вхождение дополнения до i.
+Кусок обрабатывается векторно: дополнения ищутся и в таблице (предыдущие
+куски), и в самом куске (по его сортировке), и только потом кусок попадает в таблицу.
+"""
+from itertools import islice
+from typing import Iterable, Iterator, Union
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 20
+TEXT_CHUNK_BYTES = 16 << 20
+MAX_LOAD = 0.5
+# Множитель фибоначчиева хеширования: 2**64 / золотое сечение
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+class IndexTable:
+    """Открытая адресация с линейным пробированием: значение -> индекс. Вставка и поиск -- сразу для массива ключей."""
+
+    def __init__(self, dtype, capacity: int = 1 << 16):
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.dtype(np.int64), np.dtype(np.float64)):
+            raise TypeError("Поддерживаются только int64 и float64")
+        self._allocate(max(16, 1 << (capacity - 1).bit_length()))
+
+    def _allocate(self, capacity: int):
+        self.capacity = capacity
+        self._shift = np.uint64(64 - capacity.bit_length() + 1)
+        self.keys = np.zeros(capacity, dtype=self.dtype)
+        self.values = np.zeros(capacity, dtype=np.int64)
+        self.used = np.zeros(capacity, dtype=bool)
+        # Кто из вставляемых ключей занял свободную ячейку на текущем круге put()
+        self._claims = np.empty(capacity, dtype=np.int32)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes + self.values.nbytes + self.used.nbytes + self._claims.nbytes
+
+    def _slots(self, keys: np.ndarray) -> np.ndarray:
+        if self.dtype.kind == 'f':
+            # -0.0 == 0.0, а биты у них разные
+            keys = keys + 0.0
+        return ((keys.view(np.uint64) * _GOLDEN) >> self._shift).astype(np.intp)
+
+    def get(self, keys: np.ndarray) -> np.ndarray:
+        """Индексы для keys; -1 -- ключа нет."""
+        keys = np.asarray(keys, dtype=self.dtype)
+        result = np.full(len(keys), -1, dtype=np.int64)
+        slots = self._slots(keys)
+        pending = np.arange(len(keys))
+        mask = self.capacity - 1
+        while pending.size:
+            s = slots[pending]
+            used = self.used[s]
+            match = used & (self.keys[s] == keys[pending])
+            result[pending[match]] = self.values[s[match]]
+            # Дальше идут только те, чья ячейка занята другим ключом
+            probe = used & ~match
+            pending = pending[probe]
+            slots[pending] = (s[probe] + 1) & mask
+        return result
+
+    def put(self, keys: np.ndarray, values: np.ndarray):
+        """Записывает keys -> values; ключи должны быть различными, существующие перезаписываются."""
+        keys = np.asarray(keys, dtype=self.dtype)
+        if self.dtype.kind == 'f':
+            # NaN не равен ничему, в том числе себе: найти его всё равно нельзя
+            present = ~np.isnan(keys)
+            keys, values = keys[present], values[present]
+        if (self.count + len(keys)) > self.capacity * MAX_LOAD:
+            self._grow(self.count + len(keys))
+
+        slots = self._slots(keys)
+        pending = np.arange(len(keys))
+        mask = self.capacity - 1
+        while pending.size:
+            s = slots[pending]
+            used = self.used[s]
+            done = used & (self.keys[s] == keys[pending])
+            self.values[s[done]] = values[pending[done]]
+
+            # Несколько ключей могут претендовать на одну свободную ячейку: её получает тот, чья
+            # запись в _claims осталась последней, остальные на следующем круге увидят её занятой
+            free = np.flatnonzero(~used)
+            if free.size:
+                taken = s[free]
+                self._claims[taken] = free
+                won = free[self._claims[taken] == free]
+                taken, winners = s[won], pending[won]
+                self.used[taken] = True
+                self.keys[taken] = keys[winners]
+                self.values[taken] = values[winners]
+                self.count += len(taken)
+                done[won] = True
+
+            probe = used & ~done
+            slots[pending[probe]] = (s[probe] + 1) & mask
+            pending = pending[~done]
+
+    def _grow(self, needed: int):
+        keys, values = self.keys[self.used], self.values[self.used]
+        capacity = self.capacity
+        while needed > capacity * MAX_LOAD:
+            capacity *= 2
+        # Старая таблица освобождается до выделения новой, а ключи переносятся кусками:
+        # иначе на пике в памяти обе таблицы и временные массивы на все ключи сразу
+        self.keys = self.values = self.used = self._claims = None
+        self._allocate(capacity)
+        for start in range(0, len(keys), CHUNK_SIZE):
+            self.put(keys[start:start + CHUNK_SIZE], values[start:start + CHUNK_SIZE])
+
+class StreamingTwoSum:
+    """Сумма двух по кускам: feed() возвращает [j, i], как только ответ найден."""
+
+    def __init__(self, target, dtype=np.int64, capacity: int = 1 << 16):
+        self.table = IndexTable(dtype, capacity)
+        self.target = np.asarray(target, dtype=self.table.dtype)
+        self.offset = 0
+
+    def feed(self, chunk) -> list[int] | None:
+        chunk = np.asarray(chunk, dtype=self.table.dtype)
+        if not len(chunk):
+            return None
+
+        complements = self.target - chunk
+        in_table = self.table.get(complements) >= 0
+        # Различные значения куска с первым и последним вхождением: одна неустойчивая
+        # сортировка и reduceat вместо двух np.unique (те сортируют устойчиво, вдвое дольше)
+        order = np.argsort(chunk)
+        ordered = chunk[order]
+        starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+        values = ordered[starts]
+        first = np.minimum.reduceat(order, starts)
+
+        # Дополнение встретилось в этом же куске раньше позиции p
+        positions = np.minimum(np.searchsorted(values, complements), len(values) - 1)
+        in_chunk = (values[positions] == complements) & (first[positions] < np.arange(len(chunk)))
+
+        hits = np.flatnonzero(in_table | in_chunk)
+        if hits.size:
+            p = int(hits[0])
+            earlier = np.flatnonzero(chunk[:p] == complements[p])
+            j = self.offset + int(earlier[-1]) if earlier.size else int(self.table.get(complements[p:p + 1])[0])
+            return [j, self.offset + p]
+
+        # В таблицу -- последнее вхождение каждого значения, как seen[num] = i в two_sum
+        self.table.put(values, self.offset + np.maximum.reduceat(order, starts))
+        self.offset += len(chunk)
+        return None
+
+def two_sum_chunks(chunks: Iterable, target, dtype=np.int64) -> list[int]:
+    """two_sum по последовательности кусков (массивов); [] -- ответа нет."""
+    search = StreamingTwoSum(target, dtype)
+    for chunk in chunks:
+        pair = search.feed(chunk)
+        if pair is not None:
+            return pair
+    return []
+
+def iter_chunks(numbers: Iterable, dtype=np.int64, chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Куски по chunk_size чисел из любого итерируемого, в том числе бесконечного."""
+    numbers = iter(numbers)
+    while True:
+        chunk = np.fromiter(islice(numbers, chunk_size), dtype=dtype)
+        if not len(chunk):
+            return
+        yield chunk
+
+def iter_binary(path: str, dtype=np.int64, chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Куски двоичного файла из чисел dtype через memmap: в памяти только читаемый кусок."""
+    data = np.memmap(path, dtype=dtype, mode='r')
+    for start in range(0, len(data), chunk_size):
+        yield np.array(data[start:start + chunk_size])
+
+def iter_text(path: str, dtype=np.int64, chunk_bytes: int = TEXT_CHUNK_BYTES) -> Iterator[np.ndarray]:
+    """Куски текстового файла с числами через пробельные символы (обычно -- по числу в строке)."""
+    with open(path, 'rb') as f:
+        tail = b''
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            block = tail + block
+            # Последнее число могло оборваться на границе блока
+            cut = max(block.rfind(b'\n'), block.rfind(b' '))
+            if cut < 0:
+                tail = block
+                continue
+            tail = block[cut + 1:]
+            yield np.fromstring(block[:cut + 1], dtype=dtype, sep=' ')
+        if tail.strip():
+            yield np.fromstring(tail, dtype=dtype, sep=' ')
+
+Source = Union[str, Iterable]
+
+def two_sum_stream(source: Source, target, dtype=np.int64, binary: bool = True, chunk_size: int = CHUNK_SIZE) -> list[int]:
+    """
+    two_sum над файлом (путь: двоичный dtype или, с binary=False, текст)
+    или над любым итерируемым чисел. Читает только до первого ответа.
+    """
+    if isinstance(source, str):
+        chunks = iter_binary(source, dtype, chunk_size) if binary else iter_text(source, dtype)
+    else:
+        chunks = iter_chunks(source, dtype, chunk_size)
+    return two_sum_chunks(chunks, target, dtype)
@@ -1,4 +1,15 @@
+import itertools
+import os
+import random
+import tempfile
 import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from batch import TwoSumIndex, two_sum_many
+from parallel import all_pairs, k_sum
+from stream import IndexTable, iter_text, two_sum_stream
 
 def two_sum(nums, target):
     seen = {}
@@ -40,5 +51,134 @@ class TestTwoSum(unittest.TestCase):
         result = two_sum(nums, target)
         self.assertEqual(sorted(result), [2, 3])
 
+class TestTwoSumIndex(unittest.TestCase):
+    def test_examples(self):
+        self.assertEqual(two_sum_many([2, 7, 11, 15], [9, 26, 100]), [[0, 1], [2, 3], []])
+        self.assertEqual(two_sum_many([3, 2, 4], [6]), [[1, 2]])
+        self.assertEqual(two_sum_many([3, 3], [6]), [[0, 1]])
+        self.assertEqual(two_sum_many([-1, -2, -3, -4], [-7]), [[2, 3]])
+        self.assertEqual(two_sum_many([], [1]), [[]])
+        self.assertEqual(two_sum_many([5], [10]), [[]])
+        self.assertEqual(TwoSumIndex([1, 2]).query([3, 4]).tolist(), [[0, 1], [-1, -1]])
+    
+    def test_same_as_two_sum(self):
+        rng = random.Random(0)
+        # Маленькие блоки, чтобы пройти через несколько кусков значений и блоков target
+        with patch('batch.BLOCK_ELEMENTS', 300):
+            for _ in range(100):
+                high = rng.choice([5, 50, 5000])
+                nums = [rng.randint(-high, high) for _ in range(rng.randint(0, 500))]
+                targets = [rng.randint(-2 * high, 2 * high) for _ in range(50)]
+                self.assertEqual(two_sum_many(nums, targets), [two_sum(nums, target) for target in targets])
+    
+    def test_floats(self):
+        # -3.0 - -0.9 == -2.1, но -3.0 - -2.1 != -0.9: пара собирается только на второй -0.9
+        self.assertEqual(two_sum([-0.9, -2.1, -0.9], -3.0), [1, 2])
+        self.assertEqual(two_sum_many([-0.9, -2.1, -0.9], [-3.0]), [[1, 2]])
+        rng = random.Random(1)
+        for _ in range(100):
+            nums = [rng.randint(-50, 50) / 10 for _ in range(rng.randint(0, 200))]
+            targets = [rng.randint(-100, 100) / 10 for _ in range(50)]
+            self.assertEqual(two_sum_many(nums, targets), [two_sum(nums, target) for target in targets])
+
+class TestTwoSumStream(unittest.TestCase):
+    def test_same_as_two_sum(self):
+        rng = random.Random(2)
+        self.assertEqual(two_sum_stream([3, 3], 6), [0, 1])
+        for _ in range(200):
+            high = rng.choice([3, 30, 10 ** 6])
+            nums = [rng.randint(-high, high) for _ in range(rng.randint(0, 200))]
+            target = rng.randint(-2 * high, 2 * high)
+            # Пара может быть внутри куска и между кусками
+            chunk_size = rng.choice([1, 2, 7, 64])
+            self.assertEqual(two_sum_stream(nums, target, chunk_size=chunk_size), two_sum(nums, target))
+            floats = [value / 10 for value in nums]
+            self.assertEqual(two_sum_stream(floats, target / 10, np.float64, chunk_size=chunk_size), two_sum(floats, target / 10))
+    
+    def test_stops_at_first_match(self):
+        self.assertEqual(two_sum_stream(itertools.count(), 2001, chunk_size=100), [1000, 1001])
+    
+    def test_files(self):
+        nums = [5, 1, 9, 4, -3, 4]
+        with tempfile.TemporaryDirectory() as directory:
+            binary = os.path.join(directory, 'nums.bin')
+            np.array(nums, dtype=np.int64).tofile(binary)
+            text = os.path.join(directory, 'nums.txt')
+            with open(text, 'w') as f:
+                f.write('\n'.join(map(str, nums)) + '\n')
+            
+            for target in (8, 1, 6, 100):
+                with self.subTest(target=target):
+                    self.assertEqual(two_sum_stream(binary, target, chunk_size=2), two_sum(nums, target))
+                    self.assertEqual(two_sum_stream(text, target, binary=False), two_sum(nums, target))
+            # Число на границе блока не разрывается
+            self.assertEqual(np.concatenate(list(iter_text(text, chunk_bytes=3))).tolist(), nums)
+    
+    def test_index_table(self):
+        table = IndexTable(np.int64, capacity=16)
+        keys = np.arange(0, 70_000, 7)
+        table.put(keys, keys * 2)
+        self.assertEqual(len(table), len(keys))
+        self.assertTrue((table.get(keys) == keys * 2).all())
+        self.assertTrue((table.get(keys + 1) == -1).all())
+        table.put(keys[:10], keys[:10])
+        self.assertEqual(len(table), len(keys))
+        self.assertEqual(table.get(keys[:10]).tolist(), keys[:10].tolist())
+        
+        floats = IndexTable(np.float64)
+        floats.put(np.array([0.0, np.nan, 1.5]), np.array([1, 2, 3]))
+        self.assertEqual(floats.get(np.array([-0.0, np.nan, 1.5])).tolist(), [1, -1, 3])
+        with self.assertRaises(TypeError):
+            IndexTable(np.int32)
+
+class TestPartitioned(unittest.TestCase):
+    @staticmethod
+    def pairs(nums, target):
+        return sorted([i, j] for j in range(len(nums)) for i in range(j) if target - nums[j] == nums[i])
+    
+    @staticmethod
+    def combinations(nums, target, k):
+        return sorted({tuple(sorted(c)) for c in itertools.combinations(nums, k) if sum(c) == target})
+    
+    def test_all_pairs(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            high = rng.choice([2, 5, 50])
+            nums = [rng.randint(-high, high) for _ in range(rng.randint(0, 40))]
+            target = rng.randint(-2 * high, 2 * high)
+            partitions = rng.choice([1, 3, 16])
+            self.assertEqual(all_pairs(nums, target, workers=1, partitions=partitions).tolist(), self.pairs(nums, target))
+            floats = [value / 10 for value in nums]
+            self.assertEqual(all_pairs(floats, target / 10, workers=1, partitions=partitions).tolist(), self.pairs(floats, target / 10))
+        
+        self.assertEqual(all_pairs([3, 3], 6).tolist(), [[0, 1]])
+        self.assertEqual(all_pairs([1, 2, 3], 4.5).tolist(), [])
+        self.assertEqual(all_pairs([0.0, -0.0, float('nan'), float('nan')], 0.0).tolist(), [[0, 1]])
+        # Первая пара по j -- ответ two_sum
+        nums = [rng.randint(0, 20) for _ in range(100)]
+        pairs = all_pairs(nums, 20, workers=1).tolist()
+        j = min(pair[1] for pair in pairs)
+        self.assertEqual([max(i for i, jj in pairs if jj == j), j], two_sum(nums, 20))
+    
+    def test_k_sum(self):
+        rng = random.Random(4)
+        for _ in range(200):
+            high = rng.choice([2, 5, 50])
+            nums = [rng.randint(-high, high) for _ in range(rng.randint(0, 14))]
+            target = rng.randint(-2 * high, 2 * high)
+            for k in (2, 3, 4):
+                found = k_sum(nums, target, k, workers=1, partitions=rng.choice([1, 3, 16]))
+                self.assertEqual([tuple(row) for row in found.tolist()], self.combinations(nums, target, k))
+        
+        self.assertEqual(k_sum([-1, 0, 1, 2, -1, -4], 0).tolist(), [[-1, -1, 2], [-1, 0, 1]])
+        with self.assertRaises(ValueError):
+            k_sum([1, 2], 3, k=1)
+    
+    def test_process_pool(self):
+        rng = np.random.default_rng(5)
+        nums = rng.integers(0, 100, 2000)
+        self.assertEqual(all_pairs(nums, 100, workers=3).tolist(), all_pairs(nums, 100, workers=1).tolist())
+        self.assertEqual(k_sum(nums, 100, 3, workers=2).tolist(), k_sum(nums, 100, 3, workers=1).tolist())
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,78 @@
+"""
+Полное дерево высотой 20-25: словари gen_bin_tree против плоского массива
+gen_bin_tree_flat -- время построения и память.
+
+Правила по умолчанию растут слишком быстро: уже к пятому уровню значения не
+помещаются в int64, а к двадцатому -- ни в какую память. Поэтому сравнение
+идёт на тех же правилах по модулю MODULUS: для словарей и для плоского
+дерева с вызовом правила на каждый узел, и для плоского дерева с правилом
+над целым уровнем (vectorized=True). Отдельно -- правила по умолчанию с
+корнем 1, на котором значения не растут (векторный путь без перехода на int
+Python). Словари строятся только до --dict-max-height: на 2^25 словарей
+не хватит памяти.
+
+Память -- по tracemalloc (NumPy сообщает ему о своих массивах), время --
+отдельным прогоном без него.
+
+Запуск из каталога лабораторной: python -m benchmarks.flat_tree [--heights 20 21 22 23 24 25]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from binary_tree import gen_bin_tree
+from flat_tree import gen_bin_tree_flat
+
+MODULUS = 1_000_003
+
+
+def left_leaf(x):
+    return x ** 3 % MODULUS
+
+
+def right_leaf(x):
+    return (x * 2 - 1) % MODULUS
+
+
+def measure(build) -> tuple[float, float]:
+    """Секунды и память построенного дерева в МБ."""
+    start = time.perf_counter()
+    tree = build()
+    elapsed = time.perf_counter() - start
+    del tree
+    gc.collect()
+
+    tracemalloc.start()
+    tree = build()
+    memory = tracemalloc.get_traced_memory()[0] / 2**20
+    tracemalloc.stop()
+    del tree
+    gc.collect()
+    return elapsed, memory
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--heights', type=int, nargs='+', default=[20, 21, 22, 23, 24, 25])
+    parser.add_argument('--dict-max-height', type=int, default=22)
+    args = parser.parse_args()
+
+    variants = (
+        ('словари', lambda h: gen_bin_tree(h, 12, left_leaf, right_leaf)),
+        ('массив, по узлу', lambda h: gen_bin_tree_flat(h, 12, left_leaf, right_leaf)),
+        ('массив, по уровню', lambda h: gen_bin_tree_flat(h, 12, left_leaf, right_leaf, vectorized=True)),
+        ('массив, по умолчанию', lambda h: gen_bin_tree_flat(h, 1)),
+    )
+    print(f"{'высота':>6} | {'узлов':>10} | {'вариант':>20} | {'построение, с':>13} | {'память, МБ':>10} | {'байт на узел':>12}")
+    for height in args.heights:
+        nodes = 2 ** height - 1
+        for name, build in variants:
+            if name == 'словари' and height > args.dict_max_height:
+                continue
+            elapsed, memory = measure(lambda: build(height))
+            print(f"{height:>6} | {nodes:>10,} | {name:>20} | {elapsed:>13.2f} | {memory:>10.1f} | {memory * 2**20 / nodes:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
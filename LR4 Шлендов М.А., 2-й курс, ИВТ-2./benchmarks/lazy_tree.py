@@ -0,0 +1,120 @@
+"""
+Ленивое дерево gen_bin_tree_lazy против gen_bin_tree_namedtuple, который
+строит все 2^height узлов сразу: время, память и число вычисленных узлов.
+
+Сценарии: путь от корня до листа, первые --levels уровней и полный обход.
+Правила по умолчанию к двадцатому уровню не помещаются ни в какую память,
+поэтому здесь -- те же правила по модулю MODULUS. Отдельно -- полный обход
+там, где значения повторяются и работает мемоизация: правила
+лабораторной №3 с корнем 1 (левая ветвь из единиц) и правила по умолчанию с
+корнем 1 (всё дерево -- один узел). Для правил №3 высота меньше: значения в
+них удваивают длину на каждом уровне.
+
+Память -- по tracemalloc, время -- отдельным прогоном без него.
+
+Запуск из каталога лабораторной: python -m benchmarks.lazy_tree [--height 20] [--levels 5]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from binary_tree import gen_bin_tree_namedtuple
+from lazy_tree import gen_bin_tree_lazy
+
+MODULUS = 1_000_003
+
+
+def left_leaf(x):
+    return x ** 3 % MODULUS
+
+
+def right_leaf(x):
+    return (x * 2 - 1) % MODULUS
+
+
+def square(x):
+    return x ** 2
+
+
+def square_plus_two(x):
+    return 2 + x ** 2
+
+
+def path(tree) -> int:
+    """Значение листа на пути влево-вправо-влево-..."""
+    step = 0
+    while tree.left is not None:
+        tree = tree.left if step % 2 == 0 else tree.right
+        step += 1
+    return tree.value
+
+
+def first_levels(tree, levels: int) -> list:
+    """Значения первых levels уровней по порядку, без ленивых средств -- для обоих деревьев одинаково."""
+    result, level = [], [tree]
+    for _ in range(levels):
+        result.extend(node.value for node in level)
+        level = [child for node in level for child in (node.left, node.right) if child is not None]
+    return result
+
+
+def walk(tree) -> int:
+    """Число узлов при полном обходе в прямом порядке."""
+    count, stack = 0, [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.left is not None:
+            stack.append(node.right)
+            stack.append(node.left)
+    return count
+
+
+def measure(func) -> tuple[object, float, float]:
+    """Результат, секунды и пик памяти в МБ."""
+    gc.collect()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--height', type=int, default=20)
+    parser.add_argument('--levels', type=int, default=5)
+    parser.add_argument('--lab3-height', type=int, default=14)
+    args = parser.parse_args()
+
+    height = args.height
+    scenarios = (
+        ('путь до листа', height, 12, left_leaf, right_leaf, path),
+        (f'первые {args.levels} уровней', height, 12, left_leaf, right_leaf, lambda tree: first_levels(tree, args.levels)),
+        ('полный обход', height, 12, left_leaf, right_leaf, walk),
+        ('полный обход, №3, корень 1', args.lab3_height, 1, square, square_plus_two, walk),
+        ('полный обход, корень 1', height, 1, None, None, walk),
+    )
+    print(f"{'сценарий':>28} | {'высота':>6} | {'вариант':>8} | {'время, с':>8} | {'пик, МБ':>8} | {'вычислено узлов':>15}")
+    for name, h, root, left, right, use in scenarios:
+        eager_result, eager_time, eager_peak = measure(lambda: use(gen_bin_tree_namedtuple(h, root, left, right)))
+        trees = []
+
+        def lazy():
+            trees.append(gen_bin_tree_lazy(h, root, left, right))
+            return use(trees[-1])
+
+        lazy_result, lazy_time, lazy_peak = measure(lazy)
+        assert lazy_result == eager_result
+        print(f"{name:>28} | {h:>6} | {'сразу':>8} | {eager_time:>8.2f} | {eager_peak:>8.1f} | {2 ** h - 1:>15,}")
+        print(f"{'':>28} | {h:>6} | {'лениво':>8} | {lazy_time:>8.2f} | {lazy_peak:>8.1f} | {trees[0].computed:>15,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -170,13 +170,16 @@ def gen_bin_tree_namedtuple(
     return _build_namedtree(1, root)
 
 
-def print_tree_structure(tree: Union[Dict, TreeNode], level: int = 0) -> None:
+def print_tree_structure(tree: Union[Dict, TreeNode], level: int = 0, max_depth: Optional[int] = None) -> None:
     """
     Print the tree structure in a readable format.
     
     Args:
-        tree: The tree to print (dict or TreeNode)
+        tree: The tree to print (dict, TreeNode or anything with value, left
+            and right fields, such as a lazy tree)
         level: Current level for indentation (used internally)
+        max_depth: Number of levels to print (default: all; required for
+            unbounded lazy trees)
     """
     if tree is None:
         return
@@ -193,13 +196,16 @@ def print_tree_structure(tree: Union[Dict, TreeNode], level: int = 0) -> None:
     indent = "  " * level
     print(f"{indent}{value}")
     
+    if max_depth is not None and level + 1 >= max_depth:
+        return
+    
     if left:
         print(f"{indent}L:", end="")
-        print_tree_structure(left, level + 1)
+        print_tree_structure(left, level + 1, max_depth)
     
     if right:
         print(f"{indent}R:", end="")
-        print_tree_structure(right, level + 1)
+        print_tree_structure(right, level + 1, max_depth)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,200 @@
+"""
+Module for storing complete binary trees in a flat heap-layout array.
+
+gen_bin_tree always builds a complete tree, so the links between nodes
+do not need to be stored: node i has children 2i+1 and 2i+2, and level d
+occupies indices [2^d - 1, 2^(d+1) - 1). The whole tree is one NumPy
+array instead of 2^height dicts, and it is generated a level at a time.
+"""
+
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from binary_tree import TreeNode
+
+
+def cube(x):
+    """Default left_leaf of this lab: root ^ 3."""
+    return x ** 3
+
+
+def double_minus_one(x):
+    """Default right_leaf of this lab: (root * 2) - 1."""
+    return (x * 2) - 1
+
+
+def square(x):
+    """left_leaf of lab 3: root ^ 2."""
+    return x ** 2
+
+
+def square_plus_two(x):
+    """right_leaf of lab 3: 2 + root ^ 2."""
+    return 2 + x ** 2
+
+
+# Largest |x| for which the rule's result still fits in int64. These rules
+# are applied to a whole level at once; past the limit the level is computed
+# on Python ints instead of silently overflowing.
+INT64_LIMITS = {
+    cube: 2_097_151,
+    double_minus_one: 2 ** 62 - 1,
+    square: 3_037_000_499,
+    square_plus_two: 3_037_000_499,
+}
+
+
+class FlatTree:
+    """
+    Complete binary tree stored level by level in one array.
+
+    Values are kept in an int64 array while they fit and in an object array
+    (Python ints or any other values) otherwise.
+    """
+
+    __slots__ = ('values', 'height')
+
+    def __init__(self, values: np.ndarray, height: int):
+        self.values = values
+        self.height = height
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def value(self, index: int) -> Any:
+        """Value of the node at index as a plain Python object."""
+        value = self.values[index]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def left(self, index: int) -> Optional[int]:
+        """Index of the left child, or None for a leaf."""
+        child = 2 * index + 1
+        return child if child < len(self.values) else None
+
+    def right(self, index: int) -> Optional[int]:
+        """Index of the right child, or None for a leaf."""
+        child = 2 * index + 2
+        return child if child < len(self.values) else None
+
+    def level(self, depth: int) -> np.ndarray:
+        """Values of level depth (0 is the root) as a view into the array."""
+        if not 0 <= depth < self.height:
+            raise IndexError("Level is out of range")
+        return self.values[2 ** depth - 1:2 ** (depth + 1) - 1]
+
+    def _build(self, index: int, make: Callable[[Any, Any, Any], Any]) -> Any:
+        """Convert the subtree at index bottom-up, one level at a time, without recursion."""
+        depth = (index + 1).bit_length() - 1
+        nodes = [None, None]
+        for offset in range(self.height - depth - 1, -1, -1):
+            first = (index + 1) * 2 ** offset - 1
+            level = self.values[first:first + 2 ** offset].tolist()
+            if offset == self.height - depth - 1:
+                nodes = [make(value, None, None) for value in level]
+            else:
+                nodes = [make(value, nodes[2 * k], nodes[2 * k + 1]) for k, value in enumerate(level)]
+        return nodes[0]
+
+    def to_dict(self, index: int = 0, value_key: str = 'value') -> Dict[str, Any]:
+        """
+        Convert the subtree at index to the dict form of gen_bin_tree.
+
+        Args:
+            index: Index of the subtree root (default: the whole tree)
+            value_key: Key for the node value ('root' gives the form of lab 3)
+
+        Returns:
+            A dictionary with keys value_key, 'left', 'right'.
+        """
+        return self._build(index, lambda value, left, right: {value_key: value, 'left': left, 'right': right})
+
+    def to_namedtuple(self, index: int = 0) -> TreeNode:
+        """Convert the subtree at index to the TreeNode form of gen_bin_tree_namedtuple."""
+        return self._build(index, TreeNode)
+
+
+def _store(values: np.ndarray, where: slice, results) -> np.ndarray:
+    """Write results into values[where], switching to an object array if they do not fit its dtype."""
+    if values.dtype != object:
+        array = np.asarray(results)
+        if array.dtype == values.dtype:
+            values[where] = array
+            return values
+        values = values.astype(object)
+        if not isinstance(results, list):
+            results = array.astype(object)
+    values[where] = results
+    return values
+
+
+def gen_bin_tree_flat(
+    height: int = 4,
+    root: int = 12,
+    left_leaf: Optional[Callable[[Any], Any]] = None,
+    right_leaf: Optional[Callable[[Any], Any]] = None,
+    vectorized: bool = False
+) -> FlatTree:
+    """
+    Generate a binary tree in heap layout, one level at a time.
+
+    The default rules (and the rules of lab 3, square and square_plus_two)
+    are applied to a whole level with NumPy while the values fit in int64.
+    Other rules are called once per node, unless vectorized is set.
+
+    Args:
+        height: The height of the tree (default: 4)
+        root: The value of the root node (default: 12)
+        left_leaf: Function to calculate left child value (default: root ^ 3)
+        right_leaf: Function to calculate right child value (default: (root * 2) - 1)
+        vectorized: The custom rules accept a NumPy array of a whole level and
+            return an array; overflow inside them is up to the caller
+
+    Returns:
+        A FlatTree with 2^height - 1 values.
+
+    Raises:
+        ValueError: If height is less than 1
+
+    Example:
+        >>> tree = gen_bin_tree_flat(height=3, root=2)
+        >>> tree.level(2).tolist()
+        [512, 15, 27, 5]
+    """
+    if height < 1:
+        raise ValueError("Height must be at least 1")
+
+    if left_leaf is None:
+        left_leaf = cube
+
+    if right_leaf is None:
+        right_leaf = double_minus_one
+
+    limit = None
+    if left_leaf in INT64_LIMITS and right_leaf in INT64_LIMITS:
+        limit = min(INT64_LIMITS[left_leaf], INT64_LIMITS[right_leaf])
+
+    values = np.empty(2 ** height - 1, dtype=np.asarray(root).dtype)
+    values[0] = root
+    for depth in range(height - 1):
+        start, end = 2 ** depth - 1, 2 ** (depth + 1) - 1
+        lefts, rights = slice(end, 2 * end + 1, 2), slice(end + 1, 2 * end + 1, 2)
+        parents = values[start:end]
+
+        if limit is not None:
+            # Known rules: exact on int64 within the limit, on Python ints past it
+            if values.dtype != np.int64 or parents.min() < -limit or parents.max() > limit:
+                if values.dtype != object:
+                    values = values.astype(object)
+                    parents = values[start:end]
+            values[lefts] = left_leaf(parents)
+            values[rights] = right_leaf(parents)
+        elif vectorized:
+            values = _store(values, lefts, left_leaf(parents))
+            values = _store(values, rights, right_leaf(values[start:end]))
+        else:
+            parents = parents.tolist()
+            values = _store(values, lefts, [left_leaf(value) for value in parents])
+            values = _store(values, rights, [right_leaf(value) for value in parents])
+
+    return FlatTree(values, height)
@@ -0,0 +1,223 @@
+"""
+Module for lazily generated binary trees with memoized subtrees.
+
+gen_bin_tree builds all 2^height nodes up front. Here a node computes its
+children with left_leaf/right_leaf only when they are accessed, and a memo
+table keyed by value makes every occurrence of a value share one node, so
+the tree is really a DAG. With the rules of lab 3 (root ^ 2, 2 + root ^ 2)
+1 maps to 1 on the left, so the whole left spine is a single node and the
+subtrees hanging off it are one shared subtree.
+"""
+
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from binary_tree import TreeNode
+
+
+_MISSING = object()
+
+
+class LazyNode:
+    """A value whose children are computed on first access and then kept."""
+
+    __slots__ = ('value', '_left', '_right', '_nodes')
+
+    def __init__(self, value: Any, nodes: '_Nodes'):
+        self.value = value
+        self._left = self._right = _MISSING
+        self._nodes = nodes
+
+    @property
+    def left(self) -> 'LazyNode':
+        if self._left is _MISSING:
+            self._left = self._nodes.get(self._nodes.left_leaf(self.value))
+        return self._left
+
+    @property
+    def right(self) -> 'LazyNode':
+        if self._right is _MISSING:
+            self._right = self._nodes.get(self._nodes.right_leaf(self.value))
+        return self._right
+
+
+class _Nodes:
+    """Rules and the memo table of one lazy tree."""
+
+    __slots__ = ('left_leaf', 'right_leaf', 'memo')
+
+    def __init__(self, left_leaf: Callable[[Any], Any], right_leaf: Callable[[Any], Any]):
+        self.left_leaf = left_leaf
+        self.right_leaf = right_leaf
+        self.memo: Dict[Tuple[type, Any], LazyNode] = {}
+
+    def get(self, value: Any) -> LazyNode:
+        """The node for value, shared with every other occurrence of it."""
+        # The type is part of the key: 1, 1.0 and True are equal but are different values
+        key = (type(value), value)
+        try:
+            node = self.memo.get(key)
+        except TypeError:
+            # Unhashable values are not shared
+            return LazyNode(value, self)
+        if node is None:
+            node = self.memo[key] = LazyNode(value, self)
+        return node
+
+
+class LazyTree:
+    """
+    A tree of the given height over shared LazyNode objects.
+
+    It has the same fields as TreeNode (value, left, right), so it can be used
+    where gen_bin_tree_namedtuple's result is expected. Children past the height
+    are None; with height=None the tree is unbounded.
+    """
+
+    __slots__ = ('node', 'height')
+
+    def __init__(self, node: LazyNode, height: Optional[int]):
+        self.node = node
+        self.height = height
+
+    @property
+    def value(self) -> Any:
+        return self.node.value
+
+    @property
+    def left(self) -> Optional['LazyTree']:
+        if self.height == 1:
+            return None
+        return LazyTree(self.node.left, None if self.height is None else self.height - 1)
+
+    @property
+    def right(self) -> Optional['LazyTree']:
+        if self.height == 1:
+            return None
+        return LazyTree(self.node.right, None if self.height is None else self.height - 1)
+
+    @property
+    def computed(self) -> int:
+        """Number of distinct nodes computed so far (shared by all views of the tree)."""
+        return len(self.node._nodes.memo)
+
+    def _limit(self, max_depth: Optional[int]) -> Optional[int]:
+        if self.height is None:
+            return max_depth
+        return self.height if max_depth is None else min(self.height, max_depth)
+
+    def walk(self, max_depth: Optional[int] = None) -> Iterator[Tuple[int, Any]]:
+        """
+        Pre-order traversal without recursion.
+
+        Args:
+            max_depth: Number of levels to visit (default: the whole tree)
+
+        Yields:
+            Pairs (depth, value), depth 0 being the root.
+        """
+        limit = self._limit(max_depth)
+        if limit == 0:
+            return
+        stack = [(self.node, 0)]
+        while stack:
+            node, depth = stack.pop()
+            yield depth, node.value
+            if limit is None or depth + 1 < limit:
+                stack.append((node.right, depth + 1))
+                stack.append((node.left, depth + 1))
+
+    def __iter__(self) -> Iterator[Any]:
+        """Values in pre-order."""
+        return (value for _, value in self.walk())
+
+    def levels(self, max_depth: Optional[int] = None) -> Iterator[List[Any]]:
+        """
+        Level-order traversal.
+
+        Args:
+            max_depth: Number of levels to yield (default: the whole tree)
+
+        Yields:
+            Lists of the values of each level, left to right.
+        """
+        limit = self._limit(max_depth)
+        level = [self.node]
+        depth = 0
+        # The next level is computed only if it is needed: the children of the last one are not
+        while limit is None or depth < limit:
+            yield [node.value for node in level]
+            depth += 1
+            if limit is None or depth < limit:
+                level = [child for node in level for child in (node.left, node.right)]
+
+    def _build(self, make: Callable[[Any, Any, Any], Any]) -> Any:
+        if self.height is None:
+            raise ValueError("An unbounded tree cannot be materialized")
+        # Nodes of the last level first, then each level up from its children
+        nodes = deque()
+        for level in reversed(list(self.levels())):
+            if not nodes:
+                nodes.extend(make(value, None, None) for value in level)
+            else:
+                nodes = deque(make(value, nodes.popleft(), nodes.popleft()) for value in level)
+        return nodes[0]
+
+    def to_dict(self, value_key: str = 'value') -> Dict[str, Any]:
+        """
+        Materialize the tree in the dict form of gen_bin_tree.
+
+        Args:
+            value_key: Key for the node value ('root' gives the form of lab 3)
+
+        Raises:
+            ValueError: If the tree is unbounded
+        """
+        return self._build(lambda value, left, right: {value_key: value, 'left': left, 'right': right})
+
+    def to_namedtuple(self) -> TreeNode:
+        """Materialize the tree in the TreeNode form of gen_bin_tree_namedtuple."""
+        return self._build(TreeNode)
+
+
+def gen_bin_tree_lazy(
+    height: Optional[int] = 4,
+    root: int = 12,
+    left_leaf: Optional[Callable[[Any], Any]] = None,
+    right_leaf: Optional[Callable[[Any], Any]] = None
+) -> LazyTree:
+    """
+    Generate a binary tree whose nodes are computed on demand.
+
+    Nothing but the root is computed here; each child is computed once, on
+    first access, and equal values share one subtree.
+
+    Args:
+        height: The height of the tree (default: 4); None for an unbounded tree
+        root: The value of the root node (default: 12)
+        left_leaf: Function to calculate left child value (default: root ^ 3)
+        right_leaf: Function to calculate right child value (default: (root * 2) - 1)
+
+    Returns:
+        A LazyTree with fields value, left and right.
+
+    Raises:
+        ValueError: If height is less than 1
+
+    Example:
+        >>> tree = gen_bin_tree_lazy(height=None, root=1, left_leaf=lambda x: x ** 2, right_leaf=lambda x: 2 + x ** 2)
+        >>> next(iter(tree.levels(max_depth=4)))
+        [1]
+        >>> tree.left.left.left.right.value, tree.computed
+        (3, 2)
+    """
+    if height is not None and height < 1:
+        raise ValueError("Height must be at least 1")
+
+    if left_leaf is None:
+        left_leaf = lambda x: x ** 3  # root ^ 3
+
+    if right_leaf is None:
+        right_leaf = lambda x: (x * 2) - 1  # (root * 2) - 1
+
+    return LazyTree(_Nodes(left_leaf, right_leaf).get(root), height)
@@ -2,9 +2,13 @@
 Unit tests for binary tree generation functions.
 """
 
+import contextlib
+import io
 import unittest
 from collections import deque
-from binary_tree import gen_bin_tree, gen_bin_tree_deque, gen_bin_tree_namedtuple, TreeNode
+from binary_tree import gen_bin_tree, gen_bin_tree_deque, gen_bin_tree_namedtuple, print_tree_structure, TreeNode
+from flat_tree import FlatTree, gen_bin_tree_flat, square, square_plus_two
+from lazy_tree import gen_bin_tree_lazy
 
 
 class TestBinaryTree(unittest.TestCase):
@@ -131,5 +135,118 @@ class TestBinaryTree(unittest.TestCase):
         self.assertEqual(tree3['right']['value'], 8)  # 3*3 - 1
 
 
+
+class TestFlatTree(unittest.TestCase):
+    """Test cases for the heap-layout tree."""
+
+    def test_same_as_dict_and_namedtuple(self):
+        """Test that the views match the existing tree forms."""
+        for height in range(1, 6):
+            for root in (2, 12, 0, -3, 1.5):
+                tree = gen_bin_tree_flat(height, root)
+                self.assertEqual(tree.to_dict(), gen_bin_tree(height, root))
+                self.assertEqual(tree.to_namedtuple(), gen_bin_tree_namedtuple(height, root))
+
+    def test_heap_layout(self):
+        """Test child indices and levels."""
+        tree = gen_bin_tree_flat(height=3, root=2)
+
+        self.assertIsInstance(tree, FlatTree)
+        self.assertEqual(len(tree), 7)
+        self.assertEqual(tree.values.tolist(), [2, 8, 3, 512, 15, 27, 5])
+        self.assertEqual((tree.left(1), tree.right(1)), (3, 4))
+        self.assertIsNone(tree.left(3))
+        self.assertEqual(tree.level(1).tolist(), [8, 3])
+        self.assertEqual(tree.to_dict(2), gen_bin_tree(height=2, root=3))
+
+        with self.assertRaises(IndexError):
+            tree.level(3)
+        with self.assertRaises(ValueError):
+            gen_bin_tree_flat(height=0)
+
+    def test_int64_overflow(self):
+        """Test that values past int64 switch to Python ints instead of overflowing."""
+        tree = gen_bin_tree_flat(height=5)
+
+        self.assertEqual(tree.values.dtype, object)
+        self.assertEqual(tree.value(len(tree) - 2), gen_bin_tree_namedtuple(height=5).right.right.right.left.value)
+        self.assertEqual(tree.to_dict(), gen_bin_tree(height=5))
+
+    def test_lab3_rules(self):
+        """Test the rules of lab 3 and its dict form with the 'root' key."""
+        tree = gen_bin_tree_flat(3, 1, square, square_plus_two)
+
+        self.assertEqual(tree.values.tolist(), [1, 1, 3, 1, 3, 9, 11])
+        self.assertEqual(tree.to_dict(value_key='root')['right']['right'], {'root': 11, 'left': None, 'right': None})
+
+    def test_custom_rules(self):
+        """Test per-node and vectorized custom rules."""
+        left_leaf, right_leaf = (lambda x: x * 3 % 7), (lambda x: x / 2)
+        expected = gen_bin_tree(4, 5, left_leaf, right_leaf)
+
+        self.assertEqual(gen_bin_tree_flat(4, 5, left_leaf, right_leaf).to_dict(), expected)
+        self.assertEqual(gen_bin_tree_flat(4, 5, left_leaf, right_leaf, vectorized=True).to_dict(), expected)
+
+
+def printed(tree, **kwargs) -> str:
+    """Output of print_tree_structure for the tree."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        print_tree_structure(tree, **kwargs)
+    return output.getvalue()
+
+
+class TestLazyTree(unittest.TestCase):
+    """Test cases for the lazy tree with memoized subtrees."""
+
+    def test_same_as_eager(self):
+        """Test that the lazy tree matches the eagerly built forms."""
+        for height in range(1, 6):
+            for root in (2, 12, 0, -3, 1.5):
+                tree = gen_bin_tree_lazy(height, root)
+                self.assertEqual(tree.to_dict(), gen_bin_tree(height, root))
+                self.assertEqual(tree.to_namedtuple(), gen_bin_tree_namedtuple(height, root))
+                self.assertEqual(printed(tree), printed(gen_bin_tree_namedtuple(height, root)))
+
+    def test_computed_on_access(self):
+        """Test that only the accessed nodes are computed."""
+        tree = gen_bin_tree_lazy(height=1000, root=2, left_leaf=lambda x: x + 1, right_leaf=lambda x: x * 2)
+
+        self.assertEqual(tree.computed, 1)
+        self.assertEqual(tree.left.right.left.value, 7)
+        self.assertEqual(tree.computed, 4)
+        self.assertIsNone(gen_bin_tree_lazy(height=1).left)
+
+    def test_memoized_subtrees(self):
+        """Test that equal values share one subtree."""
+        tree = gen_bin_tree_lazy(None, 1, square, square_plus_two)
+
+        # 1 ^ 2 = 1: the left spine is one node
+        self.assertIs(tree.left.left.node, tree.node)
+        self.assertIs(tree.left.right.node, tree.right.node)
+        self.assertEqual(sum(1 for _ in gen_bin_tree_lazy(10, 1, square, square_plus_two)), 1023)
+        # Default rules keep 1 as 1 on both sides: the whole tree is one node
+        ones = gen_bin_tree_lazy(height=12, root=1)
+        self.assertEqual(list(ones), [1] * (2 ** 12 - 1))
+        self.assertEqual(ones.computed, 1)
+        self.assertEqual(gen_bin_tree_lazy(10, 1, square, square_plus_two).to_dict(value_key='root'),
+                         gen_bin_tree_flat(10, 1, square, square_plus_two).to_dict(value_key='root'))
+
+    def test_depth_limited(self):
+        """Test depth-limited traversal and printing of an unbounded tree."""
+        tree = gen_bin_tree_lazy(height=None, root=2)
+
+        self.assertEqual(list(tree.levels(max_depth=3)), [[2], [8, 3], [512, 15, 27, 5]])
+        self.assertEqual(list(tree.walk(max_depth=3)),
+                         [(0, 2), (1, 8), (2, 512), (2, 15), (1, 3), (2, 27), (2, 5)])
+        self.assertEqual(list(gen_bin_tree_lazy(height=2, root=2).levels(max_depth=5)), [[2], [8, 3]])
+        self.assertEqual(list(gen_bin_tree_lazy(height=3, root=2)), [2, 8, 512, 15, 3, 27, 5])
+        self.assertEqual(printed(tree, max_depth=3), printed(gen_bin_tree_namedtuple(height=3, root=2)))
+
+        with self.assertRaises(ValueError):
+            tree.to_dict()
+        with self.assertRaises(ValueError):
+            gen_bin_tree_lazy(height=0)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,8 @@
 import requests
 import sys
 import logging
+import threading
+import time
 from functools import wraps
 from typing import List, Dict, Optional
 from unittest.mock import patch, MagicMock
@@ -42,8 +44,17 @@ def log_errors(func):
             return None
     return wrapper
 
-@log_errors
-def get_currencies(currency_codes: List[str], url: str = "https://www.cbr-xml-daily.ru/daily_json.js") -> Optional[Dict[str, float]]:
+CBR_URL = "https://www.cbr-xml-daily.ru/daily_json.js"
+REQUEST_TIMEOUT = 10
+
+class CurrencyNotFoundError(ValueError):
+    """В ответе API нет валюты с кодом code."""
+    
+    def __init__(self, code: str):
+        super().__init__(f"Валюта с кодом '{code}' не найдена в ответе API")
+        self.code = code
+
+def _fetch_currencies(currency_codes: List[str], url: str = CBR_URL) -> Dict[str, float]:
     """
     Получает курсы валют из API Центробанка РФ.
     
@@ -52,13 +63,13 @@ def get_currencies(currency_codes: List[str], url: str = "https://www.cbr-xml-da
         url: URL API (по умолчанию API ЦБ РФ)
     
     Returns:
-        Словарь с курсами валют или None в случае ошибки
+        Словарь с курсами валют; ошибки передаются вызывающему как исключения
     """
     if not currency_codes:
         raise ValueError("Список кодов валют не может быть пустым")
     
     # Выполнение запроса к API
-    response = requests.get(url)
+    response = requests.get(url, timeout=REQUEST_TIMEOUT)
     response.raise_for_status()  # Вызовет requests.RequestException при ошибке HTTP
     
     data = response.json()
@@ -73,7 +84,7 @@ def get_currencies(currency_codes: List[str], url: str = "https://www.cbr-xml-da
     # Получение курсов для запрошенных валют
     for code in currency_codes:
         if code not in valutes:
-            raise ValueError(f"Валюта с кодом '{code}' не найдена в ответе API")
+            raise CurrencyNotFoundError(code)
         
         currency_data = valutes[code]
         if 'Value' not in currency_data:
@@ -83,6 +94,120 @@ def get_currencies(currency_codes: List[str], url: str = "https://www.cbr-xml-da
     
     return result
 
+# Функция из итераций 1-3: ошибки логируются, вместо исключения возвращается None
+get_currencies = log_errors(_fetch_currencies)
+
+# Итерация 4: устойчивость к сбоям API
+class CircuitOpenError(requests.RequestException):
+    """Запрос не выполнялся: автомат разомкнут после серии ошибок."""
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель.
+    
+    closed -- запросы идут к API; после failure_threshold ошибок подряд
+    автомат переходит в open и reset_timeout секунд не пропускает запросы.
+    Затем half_open: пропускается один пробный запрос, успех замыкает
+    автомат, ошибка снова размыкает.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """Можно ли сейчас обращаться к API."""
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+            self._trial_running = False
+
+class ResilientCurrencies:
+    """
+    get_currencies с защитой от сбоев API:
+    
+    - ошибки запроса размыкают CircuitBreaker, и пока он разомкнут,
+      к API не обращаемся совсем;
+    - при ошибке или разомкнутом автомате возвращаются последние
+      полученные курсы, если они есть для всех запрошенных валют;
+    - коды, которых нет в ответе API (например 'XYZ'), negative_ttl секунд
+      считаются отсутствующими без повторного запроса.
+    
+    Как и get_currencies, при ошибке логирует её и возвращает None.
+    """
+    
+    def __init__(self, breaker: Optional[CircuitBreaker] = None, negative_ttl: float = 60.0, clock=time.monotonic):
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.last_good: Dict[str, float] = {}
+        self._missing: Dict[str, float] = {}
+    
+    @log_errors
+    def __call__(self, currency_codes: List[str], url: str = CBR_URL) -> Optional[Dict[str, float]]:
+        if not currency_codes:
+            raise ValueError("Список кодов валют не может быть пустым")
+        
+        now = self.clock()
+        for code in currency_codes:
+            expires = self._missing.get(code)
+            if expires is not None and expires > now:
+                raise CurrencyNotFoundError(code)
+        
+        if not self.breaker.allow():
+            return self._fallback(currency_codes, CircuitOpenError("Автомат разомкнут, запрос к API не выполнялся"))
+        
+        try:
+            result = _fetch_currencies(currency_codes, url)
+        except CurrencyNotFoundError as e:
+            # API ответил, просто такой валюты нет
+            self.breaker.record_success()
+            self._missing[e.code] = now + self.negative_ttl
+            raise
+        except Exception as e:
+            # Сетевая ошибка, HTTP-ошибка или испорченный ответ
+            self.breaker.record_failure()
+            return self._fallback(currency_codes, e)
+        
+        self.breaker.record_success()
+        self.last_good.update(result)
+        return result
+    
+    def _fallback(self, currency_codes: List[str], error: Exception) -> Dict[str, float]:
+        if all(code in self.last_good for code in currency_codes):
+            logging.warning(f"Ошибка запроса к API: {error}; возвращены последние полученные курсы")
+            return {code: self.last_good[code] for code in currency_codes}
+        raise error
+
 # ТЕСТИРОВАНИЕ
 import unittest
 
@@ -275,6 +400,128 @@ class TestGetCurrencies(unittest.TestCase):
             # Проверяем, что сообщение об ошибке было выведено в stdout
             self.assertIn("Ошибка запроса к API", stdout_output)
 
+class FakeClock:
+    """Управляемое время для проверки таймаутов автомата и кэша."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+class TestResilientCurrencies(unittest.TestCase):
+    
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=self.clock)
+        self.get = ResilientCurrencies(self.breaker, negative_ttl=60, clock=self.clock)
+        self.api_response = {
+            'Valute': {
+                'USD': {'Value': 75.50, 'Name': 'Доллар США'},
+                'EUR': {'Value': 82.30, 'Name': 'Евро'}
+            }
+        }
+    
+    def call(self, codes: List[str]) -> Optional[Dict[str, float]]:
+        with io.StringIO() as buffer:
+            with contextlib.redirect_stdout(buffer):
+                return self.get(codes)
+    
+    def respond(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.json.return_value = self.api_response
+        mock_response.raise_for_status.return_value = None
+        mock_get.side_effect = None
+        mock_get.return_value = mock_response
+    
+    def test_breaker_opens_after_failures(self):
+        """После failure_threshold ошибок подряд запросы к API не выполняются"""
+        with patch('requests.get') as mock_get:
+            mock_get.side_effect = requests.Timeout("Read timed out")
+            with self.assertLogs(level='ERROR'):
+                for _ in range(3):
+                    self.assertIsNone(self.call(['USD']))
+            self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+            self.assertEqual(mock_get.call_count, 3)
+            
+            with self.assertLogs(level='ERROR') as log_context:
+                start = time.perf_counter()
+                result = self.call(['USD'])
+                elapsed = time.perf_counter() - start
+            self.assertIsNone(result)
+            self.assertEqual(mock_get.call_count, 3)
+            self.assertLess(elapsed, 0.01)
+            self.assertTrue(any("Автомат разомкнут" in record.message for record in log_context.records))
+    
+    def test_half_open_trial(self):
+        """После reset_timeout пропускается один пробный запрос"""
+        with patch('requests.get') as mock_get:
+            mock_get.side_effect = requests.ConnectionError("Connection refused")
+            with self.assertLogs(level='ERROR'):
+                for _ in range(3):
+                    self.call(['USD'])
+            
+            self.clock.now += 30
+            with self.assertLogs(level='ERROR'):
+                self.call(['USD'])
+            self.assertEqual(mock_get.call_count, 4)
+            self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+            
+            self.clock.now += 30
+            self.assertTrue(self.breaker.allow())
+            self.assertFalse(self.breaker.allow())
+            self.breaker.record_success()
+            self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+            
+            self.respond(mock_get)
+            self.assertEqual(self.call(['USD']), {'USD': 75.50})
+            self.assertEqual(self.breaker.failures, 0)
+    
+    def test_last_good_fallback(self):
+        """При сбое API возвращаются последние полученные курсы"""
+        with patch('requests.get') as mock_get:
+            self.respond(mock_get)
+            self.assertEqual(self.call(['USD', 'EUR']), {'USD': 75.50, 'EUR': 82.30})
+            
+            mock_get.side_effect = requests.HTTPError("503 Service Unavailable")
+            with self.assertLogs(level='WARNING') as log_context:
+                for _ in range(5):
+                    self.assertEqual(self.call(['EUR']), {'EUR': 82.30})
+            self.assertEqual(mock_get.call_count, 4)
+            self.assertTrue(all("последние полученные курсы" in record.message for record in log_context.records))
+            
+            # Для валюты, которой не было в удачных ответах, подставить нечего
+            with self.assertLogs(level='ERROR'):
+                self.assertIsNone(self.call(['USD', 'GBP']))
+    
+    def test_negative_cache(self):
+        """Отсутствующая валюта не запрашивается повторно в течение negative_ttl"""
+        with patch('requests.get') as mock_get:
+            self.respond(mock_get)
+            with self.assertLogs(level='ERROR') as log_context:
+                for _ in range(3):
+                    self.assertIsNone(self.call(['USD', 'XYZ']))
+            self.assertEqual(mock_get.call_count, 1)
+            self.assertTrue(all("'XYZ' не найдена" in record.message for record in log_context.records))
+            self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+            
+            self.assertEqual(self.call(['USD']), {'USD': 75.50})
+            self.assertEqual(mock_get.call_count, 2)
+            
+            self.clock.now += 60
+            with self.assertLogs(level='ERROR'):
+                self.call(['XYZ'])
+            self.assertEqual(mock_get.call_count, 3)
+    
+    def test_empty_codes(self):
+        """Пустой список -- ошибка данных, автомат не затрагивается"""
+        with patch('requests.get') as mock_get:
+            with self.assertLogs(level='ERROR') as log_context:
+                self.assertIsNone(self.call([]))
+            mock_get.assert_not_called()
+            self.assertTrue(any('Ошибка данных' in record.message for record in log_context.records))
+            self.assertTrue(self.breaker.allow())
+
 # Демонстрация работы функции
 def demonstrate_function():
     """Демонстрация работы функции с реальным API"""
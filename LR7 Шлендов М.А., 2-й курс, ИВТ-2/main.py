@@ -1,8 +1,11 @@
+import argparse
+import asyncio
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 from urllib.parse import parse_qsl
-from pathlib import Path
-from utils.currencies_api import get_currencies
+from utils.currencies_api import get_currencies, rates_provider
+from utils.server import SERVING_MODES, KEEP_ALIVE_TIMEOUT, PooledHTTPServer, AsyncRequestHandler, serve_async
+from utils.static import StaticFiles
 
 from models.app import App
 from models.author import Author
@@ -48,12 +51,6 @@ USER_CURRENCIES = (
     UserCurrency(7, 3, 'R01235'),
 )
 
-MIME_TYPES: dict = {
-    '.css': 'text/css',
-    '.html': 'text/html',
-    '.js': 'text/javascript'
-}
-
 env = Environment(
     loader=FileSystemLoader('./templates/'),
     autoescape=select_autoescape()
@@ -65,15 +62,22 @@ template_user = env.get_template("user.html")
 template_author = env.get_template("author.html")
 template_currencies = env.get_template("currencies.html")
 
+static_files = StaticFiles('./static')
+
 def respond_bytes(handler: BaseHTTPRequestHandler, b: bytes, mime_type: str, status: int = 200):
     handler.send_response(status)
     handler.send_header('Content-Type', mime_type)
     handler.send_header('Content-Length', len(b))
     handler.end_headers()
     handler.wfile.write(b)
+
+def respond_status(handler: BaseHTTPRequestHandler, status: int):
+    handler.send_response(status)
+    handler.send_header('Content-Length', 0)
+    handler.end_headers()
         
 
-class HttpHandler(BaseHTTPRequestHandler):
+class RequestHandlerMixin:
     def do_GET(self):
         path = self.path.removesuffix('/')
 
@@ -97,7 +101,7 @@ class HttpHandler(BaseHTTPRequestHandler):
         elif path.startswith('/static'):
             self.serve_static(path.removeprefix('/static'))
         else:
-            self.send_response(404)
+            respond_status(self, 404)
 
     def index(self, params: dict):
         data = params | {
@@ -117,8 +121,7 @@ class HttpHandler(BaseHTTPRequestHandler):
     def user(self, params: dict):
         id = params.get('id')
         if id is None:
-            self.send_response(400)
-            self.end_headers()
+            respond_status(self, 400)
             return
         
         user = None
@@ -127,8 +130,7 @@ class HttpHandler(BaseHTTPRequestHandler):
                 user = u
         
         if user is None:
-            self.send_response(404)
-            self.end_headers()
+            respond_status(self, 404)
             return
         
         user_currencies = filter(lambda uc: str(uc.user_id) == id, USER_CURRENCIES)
@@ -159,28 +161,50 @@ class HttpHandler(BaseHTTPRequestHandler):
         respond_bytes(self, template_author.render(data).encode('utf-8'), 'text/html')
 
     def serve_static(self, path: str):
-        p = Path(path)
-        mime_type = MIME_TYPES.get(p.suffix, "application/octet-stream")
-        try:
-            with open('./static' + path, 'rb') as f:
-                respond_bytes(self, f.read(), mime_type)
-        except IsADirectoryError:
-            self.send_response(403)
-            self.end_headers()
-        except FileNotFoundError:
-            self.send_response(404)
-            self.end_headers()
+        static_files.serve(self, path)
             
     def redirect(self, url: str):
         self.send_response(301)
         self.send_header('Location', url)
+        self.send_header('Content-Length', 0)
         self.end_headers()
 
-def run_server(address: str, port: int):
-    HTTPServer((address, port), HttpHandler).serve_forever()
+class HttpHandler(RequestHandlerMixin, BaseHTTPRequestHandler):
+    pass
+
+class KeepAliveHttpHandler(HttpHandler):
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Заголовки и тело уходят отдельными write, без TCP_NODELAY ответ ждёт delayed ACK
+    disable_nagle_algorithm = True
+
+class AsyncHttpHandler(RequestHandlerMixin, AsyncRequestHandler):
+    pass
+
+def run_server(address: str, port: int, mode: str = 'threaded', workers: int = 16):
+    if mode == 'asyncio':
+        asyncio.run(serve_async(address, port, AsyncHttpHandler, max_workers=workers))
+        return
+
+    if mode == 'threaded':
+        server = PooledHTTPServer((address, port), KeepAliveHttpHandler, max_workers=workers)
+    else:
+        server = HTTPServer((address, port), HttpHandler)
+
+    with server:
+        server.serve_forever()
 
 def main():
-    run_server('', 1234)
+    parser = argparse.ArgumentParser(description='Сервер курсов валют')
+    parser.add_argument('--host', default='')
+    parser.add_argument('--port', type=int, default=1234)
+    parser.add_argument('--mode', choices=SERVING_MODES, default='threaded',
+                        help='single -- HTTPServer, threaded -- пул потоков, asyncio -- цикл событий + пул потоков')
+    parser.add_argument('--workers', type=int, default=16, help='размер пула потоков')
+    args = parser.parse_args()
+
+    rates_provider.start()
+    run_server(args.host, args.port, args.mode, args.workers)
 
 if __name__ == "__main__":
     main()
@@ -1,4 +1,7 @@
 class Currency:
+    # Без __dict__: поля лежат в слотах, экземпляр меньше. Снаружи поля только для чтения
+    __slots__ = ('_id', '_num_code', '_char_code', '_name', '_value', '_nominal')
+
     def __init__(self, id: str, num_code: int, char_code: str, name: str, value: float, nominal: int):
         self._id = id
         self._num_code = num_code
@@ -30,27 +33,3 @@ class Currency:
     @property
     def nominal(self) -> int:
         return self._nominal
-
-    @id.setter
-    def set_id(self, id: str):
-        self._id = id
-
-    @num_code.setter
-    def set_num_code(self, num_code: int):
-        self._num_code = num_code
-
-    @char_code.setter
-    def set_char_code(self, char_code: str):
-        self._char_code = char_code
-
-    @name.setter
-    def set_name(self, name: str):
-        self._name = name
-
-    @value.setter
-    def set_value(self, value: float):
-        self._value = value
-
-    @nominal.setter
-    def set_nominal(self, nominal: int):
-        self._nominal = nominal
@@ -1,4 +1,6 @@
 class User:
+    __slots__ = ('_id', '_name')
+
     def __init__(self, id: int, name: str):
         self._id = id
         self._name = name
@@ -10,11 +12,3 @@ class User:
     @property
     def name(self) -> str:
         return self._name
-
-    @id.setter
-    def set_id(self, id: int):
-        self._id = id
-
-    @name.setter
-    def set_name(self, name: str):
-        self._name = name
@@ -1,4 +1,6 @@
 class UserCurrency:
+    __slots__ = ('_id', '_user_id', '_currency_id')
+
     def __init__(self, id: int, user_id: int, currency_id: str):
         self._id = id
         self._user_id = user_id
@@ -15,15 +17,3 @@ class UserCurrency:
     @property
     def currency_id(self) -> str:
         return self._currency_id
-
-    @id.setter
-    def set_id(self, id: int):
-        self._id = id
-
-    @user_id.setter
-    def set_user_id(self, user_id: int):
-        self._user_id = user_id
-
-    @currency_id.setter
-    def set_currency_id(self, currency_id: str):
-        self._currency_id = currency_id
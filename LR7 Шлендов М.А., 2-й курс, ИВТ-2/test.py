@@ -1,10 +1,20 @@
+import asyncio
+import http.client
+import socket
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
 from io import BytesIO
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
-from utils.currencies_api import get_currencies
+from utils.currencies_api import get_currencies, RatesProvider
 from models.currency import Currency
-from main import HttpHandler, APP, PAGES, USERS, USER_CURRENCIES
+from models.user import User
+from models.user_currency import UserCurrency
+from main import HttpHandler, KeepAliveHttpHandler, AsyncHttpHandler, APP, PAGES, USERS, USER_CURRENCIES
+from utils.server import PooledHTTPServer, _serve_connection
 
 class MockRequest:
     def __init__(self, request: str):
@@ -55,6 +65,22 @@ class Test(unittest.TestCase):
         result = get_currencies(['KEK'])
         self.assertEqual(len(result), 0)
         
+    def test_rates_cache(self):
+        response = MagicMock(status_code=200, headers={'ETag': '"v1"'})
+        response.json.return_value = {'Valute': {'USD': {'ID': 'R01235', 'NumCode': '840', 'CharCode': 'USD', 'Name': 'Доллар США', 'Value': 80.0, 'Nominal': 1}}}
+        provider = RatesProvider(ttl=60)
+        
+        with patch('utils.currencies_api.requests.get', return_value=response) as mock_get:
+            for _ in range(3):
+                currencies = get_currencies(['R01235'], provider=provider)
+            self.assertEqual(mock_get.call_count, 1)
+            self.assertEqual(currencies[0].char_code, 'USD')
+            
+            response.status_code = 304
+            self.assertFalse(provider.refresh())
+            self.assertEqual(mock_get.call_args.kwargs['headers'], {'If-None-Match': '"v1"'})
+            self.assertEqual(len(get_currencies(provider=provider)), 1)
+        
     def test3(self):
         handler = TestHttpHandler(MockRequest("GET / HTTP/1.1"), client_address=("127.0.0.1", 1234), server=self)
         result: bytes = handler.wfile.getvalue()
@@ -86,7 +112,7 @@ class Test(unittest.TestCase):
     def test6(self):
         handler = TestHttpHandler(MockRequest("GET /user?id=42343 HTTP/1.1"), client_address=("127.0.0.1", 1234), server=self)
         result: bytes = handler.wfile.getvalue()
-        header = "HTTP/1.0 404 Not Found\r\nServer: TestServer\r\nDate: 123\r\n\r\n".encode('utf-8')
+        header = "HTTP/1.0 404 Not Found\r\nServer: TestServer\r\nDate: 123\r\nContent-Length: 0\r\n\r\n".encode('utf-8')
         self.assertEqual(result, header)
         
     def test7(self):
@@ -103,6 +129,106 @@ class Test(unittest.TestCase):
         template = self.template_author.render({'app': APP, 'pages': PAGES}).encode('utf-8')
         header = f"HTTP/1.0 200 OK\r\nServer: TestServer\r\nDate: 123\r\nContent-Type: text/html\r\nContent-Length: {len(template)}\r\n\r\n".encode('utf-8')
         self.assertEqual(result, header + template)
+        
+    def test_models_are_read_only(self):
+        currency, user, user_currency = Currency('R01235', 840, 'USD', 'Доллар США', 90.0, 1), User(1, 'Вася'), UserCurrency(1, 1, 'R01235')
+        self.assertEqual((currency.char_code, currency.value, user.name, user_currency.currency_id), ('USD', 90.0, 'Вася', 'R01235'))
+        
+        for model, field in ((currency, 'value'), (currency, 'id'), (user, 'name'), (user_currency, 'user_id')):
+            with self.subTest(model=type(model).__name__, field=field), self.assertRaises(AttributeError):
+                setattr(model, field, 2)
+
+    def test_static(self):
+        handler = TestHttpHandler(MockRequest("GET /static/css/index.css HTTP/1.1"), client_address=("127.0.0.1", 1234), server=self)
+        head, _, body = handler.wfile.getvalue().partition(b'\r\n\r\n')
+        with open('./static/css/index.css', 'rb') as f:
+            self.assertEqual(body, f.read())
+        self.assertIn(b'Content-Type: text/css', head)
+        etag = next(line for line in head.split(b'\r\n') if line.startswith(b'ETag: '))[6:].decode()
+        
+        handler = TestHttpHandler(MockRequest(f"GET /static/css/index.css HTTP/1.1\r\nIf-None-Match: {etag}\r\n\r\n"), client_address=("127.0.0.1", 1234), server=self)
+        self.assertTrue(handler.wfile.getvalue().startswith(b'HTTP/1.0 304 Not Modified\r\n'))
+        
+        # У gzip-варианта свой ETag: валидатор несжатого тела ему не подходит
+        handler = TestHttpHandler(MockRequest(f"GET /static/css/index.css HTTP/1.1\r\nAccept-Encoding: gzip\r\nIf-None-Match: {etag}\r\n\r\n"), client_address=("127.0.0.1", 1234), server=self)
+        head = handler.wfile.getvalue().partition(b'\r\n\r\n')[0]
+        self.assertTrue(head.startswith(b'HTTP/1.0 200 OK\r\n'))
+        self.assertIn(b'Content-Encoding: gzip', head)
+        self.assertIn(f'ETag: {etag[:-1]}-gz"'.encode(), head)
+        
+        for path in ('/static/../main.py', '/static/%2e%2e/main.py'):
+            handler = TestHttpHandler(MockRequest(f"GET {path} HTTP/1.1"), client_address=("127.0.0.1", 1234), server=self)
+            self.assertTrue(handler.wfile.getvalue().startswith(b'HTTP/1.0 403 Forbidden\r\n'))
+
+    def test_pool_serves_more_connections_than_workers(self):
+        server = PooledHTTPServer(('127.0.0.1', 0), KeepAliveHttpHandler, max_workers=2, idle_timeout=0.5)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        port = server.server_address[1]
+        connections = []
+        try:
+            # Соединения без запросов и простаивающие после ответа поток пула не держат
+            silent = [socket.create_connection(('127.0.0.1', port)) for _ in range(3)]
+            for _ in range(5):
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                start = time.perf_counter()
+                conn.request('GET', '/author')
+                response = conn.getresponse()
+                response.read()
+                self.assertEqual(response.status, 200)
+                self.assertLess(time.perf_counter() - start, 1)
+                connections.append(conn)
+            
+            # Два запроса одним пакетом: второй уже в буфере rfile, а не в сокете
+            with socket.create_connection(('127.0.0.1', port), timeout=10) as sock:
+                sock.sendall(b'GET /author HTTP/1.1\r\nHost: x\r\n\r\nGET /not-found HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+                data = b''
+                while chunk := sock.recv(65536):
+                    data += chunk
+            self.assertEqual(data.count(b'HTTP/1.1 '), 2)
+            self.assertIn(b'HTTP/1.1 404 ', data)
+            
+            # Простаивающие дольше idle_timeout закрываются
+            for sock in silent:
+                sock.settimeout(5)
+                self.assertEqual(sock.recv(1), b'')
+                sock.close()
+        finally:
+            for conn in connections:
+                conn.close()
+            server.shutdown()
+            server.server_close()
+            thread.join()
+    
+    def exchange(self, data: bytes) -> tuple[bytes, list[dict]]:
+        """Отправляет data соединению asyncio-сервера и закрывает запись; ответ сервера и ошибки цикла событий."""
+        errors = []
+
+        async def run():
+            asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                server = await asyncio.start_server(lambda r, w: _serve_connection(r, w, AsyncHttpHandler, executor), '127.0.0.1', 0)
+                async with server:
+                    reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+                    writer.write(data)
+                    writer.write_eof()
+                    response = await reader.read()
+                    writer.close()
+                    await asyncio.sleep(0.05)
+                    return response
+
+        return asyncio.run(run()), errors
+
+    def test_async_request_body_bounds(self):
+        response, _ = self.exchange(b'GET /author HTTP/1.1\r\nContent-Length: -1\r\n\r\n')
+        self.assertEqual(response, b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+
+        with patch('utils.server.MAX_BODY', 4):
+            response, _ = self.exchange(b'GET /author HTTP/1.1\r\nContent-Length: 5\r\n\r\n12345')
+        self.assertTrue(response.startswith(b'HTTP/1.1 413 '))
+
+        response, errors = self.exchange(b'GET /author HTTP/1.1\r\nContent-Length: 100\r\n\r\n123')
+        self.assertEqual((response, errors), (b'', []))
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,36 +1,175 @@
-from typing import Optional
+import logging
+import threading
+import time
+from typing import Callable, Iterable, Optional
 import requests
 
 from models.currency import Currency
 
+CBR_URL = "https://www.cbr-xml-daily.ru/daily_json.js"
+RATES_TTL = 3600
+REQUEST_TIMEOUT = 10
+
+logger = logging.getLogger(__name__)
+
 def dict_to_currency(v: dict) -> Currency:
     return Currency(v['ID'], v['NumCode'], v['CharCode'], v['Name'], v['Value'], v['Nominal'])
 
-def get_currencies(currency_ids: Optional[list[str]] = None) -> list[Currency]:
-    response = requests.get("https://www.cbr-xml-daily.ru/daily_json.js")
-    
-    if response.status_code != 200:
-        raise Exception("Ошибка выполнения запроса к API")
-
-    try:
-        data = response.json()
-    except ValueError:
-        raise Exception("Ошибка выполнения запроса к API")
-
-    if 'Valute' not in data:
-        raise Exception("В ответе не содержатся курсы валют")
-    
-    valutes = data['Valute'].values()
-    
-    if currency_ids is None:
-        return list(map(dict_to_currency, valutes))
-
-    result: list[Currency] = []
-    
-    for valute in valutes:
-        for id in currency_ids:
-            if valute['ID'] != id:
-                continue
-            
-            result.append(dict_to_currency(valute))
-    return result
+class ValuteIndex:
+    """Записи ленты ЦБ, проиндексированные по ID, CharCode и NumCode."""
+
+    def __init__(self, valutes: list[dict]):
+        self.valutes = valutes
+        self.by_id = {v['ID']: v for v in valutes}
+        self.by_char_code = {v['CharCode']: v for v in valutes}
+        self.by_num_code = {v['NumCode']: v for v in valutes}
+
+    def __len__(self) -> int:
+        return len(self.valutes)
+
+    def find(self, key: str) -> Optional[dict]:
+        """Ищет запись по ID ('R01235'), символьному ('USD') или цифровому ('840') коду."""
+        return self.by_id.get(key) or self.by_char_code.get(key) or self.by_num_code.get(key)
+
+    def currencies(self, keys: Optional[Iterable[str]] = None) -> list[Currency]:
+        """Currency для найденных ключей в порядке запроса; без keys -- вся лента."""
+        if keys is None:
+            return list(map(dict_to_currency, self.valutes))
+
+        result: list[Currency] = []
+        for key in keys:
+            valute = self.find(key)
+            if valute is not None:
+                result.append(dict_to_currency(valute))
+        return result
+
+class RatesProvider:
+    """
+    Кэш курсов ЦБ в памяти.
+
+    Первый вызов valutes() ждёт загрузки, дальше данные отдаются из памяти.
+    Когда кэш старше ttl секунд, его обновляет фоновый поток условным GET
+    (If-None-Match / If-Modified-Since), а до конца обновления читатели
+    получают старые данные. start() запускает периодическое обновление.
+    """
+
+    def __init__(self, url: str = CBR_URL, ttl: float = RATES_TTL, timeout: float = REQUEST_TIMEOUT):
+        self.url = url
+        self.ttl = ttl
+        self.timeout = timeout
+        self._index: Optional[ValuteIndex] = None
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: list[Callable[[list[Currency]], None]] = []
+
+    def subscribe(self, listener: Callable[[list[Currency]], None]):
+        """listener вызывается с новым списком валют после каждого изменения курсов."""
+        self._listeners.append(listener)
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._fetched_at >= self.ttl
+
+    def refresh(self) -> bool:
+        """Запрашивает курсы у ЦБ. Возвращает True, если данные изменились."""
+        headers = {}
+        if self._etag is not None:
+            headers['If-None-Match'] = self._etag
+        if self._last_modified is not None:
+            headers['If-Modified-Since'] = self._last_modified
+
+        response = requests.get(self.url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and self._index is not None:
+            self._fetched_at = time.monotonic()
+            return False
+
+        if response.status_code != 200:
+            raise Exception("Ошибка выполнения запроса к API")
+
+        try:
+            data = response.json()
+        except ValueError:
+            raise Exception("Ошибка выполнения запроса к API")
+
+        if 'Valute' not in data:
+            raise Exception("В ответе не содержатся курсы валют")
+
+        valutes = list(data['Valute'].values())
+        index = ValuteIndex(valutes)
+        with self._lock:
+            self._index = index
+            self._etag = response.headers.get('ETag')
+            self._last_modified = response.headers.get('Last-Modified')
+            self._fetched_at = time.monotonic()
+
+        if self._listeners:
+            currencies = list(map(dict_to_currency, valutes))
+            for listener in self._listeners:
+                listener(currencies)
+        return True
+
+    def index(self) -> ValuteIndex:
+        index = self._index
+        if index is None:
+            with self._load_lock:
+                if self._index is None:
+                    self.refresh()
+            return self._index
+
+        if self.is_stale():
+            self._refresh_in_background()
+        return index
+
+    def valutes(self) -> list[dict]:
+        return self.index().valutes
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._safe_refresh, name='rates-refresh', daemon=True).start()
+
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Не удалось обновить курсы валют: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def start(self):
+        """Загружает курсы (если их ещё нет) и запускает периодическое обновление раз в ttl секунд."""
+        if self._thread is not None:
+            return
+        if self._index is None:
+            self._safe_refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='rates-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.ttl):
+            with self._lock:
+                if self._refreshing:
+                    continue
+                self._refreshing = True
+            self._safe_refresh()
+
+rates_provider = RatesProvider()
+
+def get_currencies(currency_ids: Optional[list[str]] = None, provider: Optional[RatesProvider] = None) -> list[Currency]:
+    return (provider or rates_provider).index().currencies(currency_ids)
@@ -0,0 +1,101 @@
+"""
+Загрузка архива курсов за 365 дней с локального сервера-заглушки, который
+имитирует сеть: задержка ответа --latency и установка соединения
+--handshake (вместо TCP+TLS рукопожатия с ЦБ).
+
+Сравниваются прежний путь -- requests.get() на каждый день, последовательно
+и каждый раз с новым соединением, -- последовательная загрузка через одну
+Session и RatesClient.fetch_archive(): пул соединений и параллельные запросы.
+Запуск из каталога лабораторной: python -m benchmarks.archive_fetch [--days 365] [--workers 16]
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from utils.rates_client import RatesClient, archive_urls
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело уходят разными write(): без TCP_NODELAY keep-alive упирается в delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        time.sleep(self.server.handshake)
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        day = self.path.split('/')[2:5]
+        body = self.server.body.replace(b'DATE', '-'.join(day).encode())
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', len(body))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class ArchiveServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, latency: float, handshake: float):
+        super().__init__(('127.0.0.1', 0), ArchiveHandler)
+        self.latency = latency
+        self.handshake = handshake
+        valutes = {f'C{i:02d}': {'ID': f'R{i:05d}', 'NumCode': str(i), 'CharCode': f'C{i:02d}', 'Name': f'Валюта {i}',
+                                 'Nominal': 1, 'Value': 10.0 + i, 'Previous': 9.5 + i} for i in range(43)}
+        self.body = json.dumps({'Date': 'DATET11:30:00+03:00', 'Valute': valutes}, ensure_ascii=False).encode()
+
+    @property
+    def template(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/archive/{{day:%Y/%m/%d}}/daily_json.js'
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.02, help='задержка ответа, с')
+    parser.add_argument('--handshake', type=float, default=0.03, help='установка соединения, с')
+    args = parser.parse_args()
+
+    server = ArchiveServer(args.latency, args.handshake)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    start, end = date(2024, 1, 1), date(2024, 1, 1) + timedelta(days=args.days - 1)
+    urls = [mirrors[0] for mirrors in archive_urls(start, end, [server.template])]
+
+    def bare():
+        return [requests.get(url, timeout=10).json() for url in urls]
+
+    def session():
+        with requests.Session() as s:
+            return [s.get(url, timeout=10).json() for url in urls]
+
+    def client():
+        c = RatesClient(max_workers=args.workers)
+        snapshots, errors = c.fetch_archive(start, end, [server.template])
+        c.close()
+        assert not errors
+        return snapshots
+
+    print(f"{args.days} дней, задержка {args.latency * 1000:.0f} мс, соединение {args.handshake * 1000:.0f} мс")
+    baseline = None
+    for name, fetch in (('requests.get', bare), ('Session', session), (f'RatesClient, {args.workers} потоков', client)):
+        t = time.perf_counter()
+        snapshots = fetch()
+        elapsed = time.perf_counter() - t
+        assert len(snapshots) == args.days
+        baseline = baseline or elapsed
+        print(f"  {name:<24} {elapsed:>6.2f} с  x{baseline / elapsed:.1f}")
+
+    server.shutdown()
+    server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Обновление курсов: update_by_char_code на каждую валюту (отдельный UPDATE
+и commit) против CurrencyDatabase.update_many (одна транзакция, executemany).
+
+База -- файл во временном каталоге, чтобы в замер попадала стоимость commit.
+Запуск из каталога лабораторной: python -m benchmarks.batch_update [--synchronous FULL]
+"""
+import argparse
+import os
+import tempfile
+import timeit
+
+from benchmarks.fixtures import make_database, make_repositories
+
+SIZES = (50, 500, 5000)
+REPEAT = 3
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--synchronous', choices=('OFF', 'NORMAL', 'FULL'), default='NORMAL')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = make_database(max(SIZES), os.path.join(tmpdir, 'bench.sqlite3'))
+        with db.connection() as conn:
+            conn.execute(f"PRAGMA synchronous={args.synchronous}")
+        currencies_db, _, _ = make_repositories(db)
+
+        print(f"synchronous={args.synchronous}")
+        print(f"{'валют':>6} | {'по одной, мс':>12} | {'пакетом, мс':>11} | {'ускорение':>9}")
+        for size in SIZES:
+            rates = {f'C{i:05d}': 2.0 + i / 100 for i in range(size)}
+
+            def per_row():
+                for char_code, value in rates.items():
+                    currencies_db.update_by_char_code(char_code, value)
+
+            def batch():
+                currencies_db.update_many(rates)
+
+            per_row_time = min(timeit.repeat(per_row, number=1, repeat=REPEAT))
+            batch_time = min(timeit.repeat(batch, number=1, repeat=REPEAT))
+            print(f"{size:>6} | {per_row_time * 1000:>12.2f} | {batch_time * 1000:>11.2f} | {per_row_time / batch_time:>8.1f}x")
+        db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Пересчёт сумм через матрицу кросс-курсов: один векторный вызов
+CrossRates.convert_many() на NumPy против запасного варианта на array('d')
+и цикла convert() по каждой сумме; отдельно -- построение матрицы N×N.
+
+Запуск из каталога лабораторной: python -m benchmarks.conversion [--amounts 1000000]
+"""
+import argparse
+import random
+import time
+from unittest.mock import patch
+
+import numpy as np
+
+from models.currency import Currency
+from utils.conversion import CrossRates
+
+def make_currencies(n: int) -> list[Currency]:
+    return [Currency(str(i), f'C{i:04d}', f'Валюта {i}', random.uniform(0.01, 200), random.choice((1, 10, 100))) for i in range(n)]
+
+def measure(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--amounts', type=int, default=1_000_000)
+    parser.add_argument('--currencies', type=int, nargs='+', default=[43, 1000, 5000])
+    args = parser.parse_args()
+
+    currencies = make_currencies(args.currencies[0])
+    rates = CrossRates(currencies)
+    amounts = [random.uniform(0, 10_000) for _ in range(args.amounts)]
+    codes = [random.choice(rates.codes) for _ in range(args.amounts)]
+
+    print(f"{args.amounts} сумм, {len(rates)} валют")
+    print(f"  numpy, одна пара:       {measure(lambda: rates.convert_many('C0001', 'RUB', amounts)):>8.1f} мс")
+    array_amounts = np.asarray(amounts)
+    print(f"  numpy, ndarray на входе: {measure(lambda: rates.convert_many('C0001', 'RUB', array_amounts)):>7.1f} мс")
+    print(f"  numpy, разные пары:     {measure(lambda: rates.convert_many(codes, 'RUB', amounts)):>8.1f} мс")
+    print(f"  цикл convert():         {measure(lambda: [rates.convert('C0001', 'RUB', a) for a in amounts]):>8.1f} мс")
+    with patch('utils.conversion._numpy', return_value=None):
+        fallback = CrossRates(currencies)
+        print(f"  array, одна пара:       {measure(lambda: fallback.convert_many('C0001', 'RUB', amounts)):>8.1f} мс")
+        print(f"  array, разные пары:     {measure(lambda: fallback.convert_many(codes, 'RUB', amounts)):>8.1f} мс")
+
+    print(f"\n{'валют':>6} | {'numpy, мс':>9} | {'array, мс':>9}")
+    for n in args.currencies:
+        currencies = make_currencies(n)
+        build = measure(lambda: CrossRates(currencies))
+        with patch('utils.conversion._numpy', return_value=None):
+            fallback = measure(lambda: CrossRates(currencies))
+        print(f"{n:>6} | {build:>9.2f} | {fallback:>9.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Выборка валют из ленты ЦБ: вложенный цикл (прежний get_currencies)
+против ValuteIndex на синтетических лентах из 10k и 100k валют.
+
+Запуск из каталога лабораторной: python -m benchmarks.currency_filter
+"""
+import random
+import timeit
+
+from models.currency import Currency
+from utils.currencies_api import ValuteIndex, dict_to_currency
+
+FEED_SIZES = (10_000, 100_000)
+REQUESTED = (1, 10, 100)
+
+def make_valutes(n: int) -> list[dict]:
+    return [{'ID': f'R{i:06d}', 'NumCode': f'{i:06d}', 'CharCode': f'C{i:06d}', 'Name': f'Валюта {i}', 'Value': 1.0 + i / 1000, 'Nominal': 1}
+            for i in range(n)]
+
+def nested_loop(valutes: list[dict], currency_ids: list[str]) -> list[Currency]:
+    result: list[Currency] = []
+    for valute in valutes:
+        for id in currency_ids:
+            if valute['ID'] != id:
+                continue
+            result.append(dict_to_currency(valute))
+    return result
+
+def main():
+    random.seed(1)
+    print(f"{'лента':>8} | {'ids':>4} | {'цикл, мс':>9} | {'индекс, мкс':>11} | {'ускорение':>9}")
+    for size in FEED_SIZES:
+        valutes = make_valutes(size)
+        build = min(timeit.repeat(lambda: ValuteIndex(valutes), number=1, repeat=3)) * 1000
+        index = ValuteIndex(valutes)
+
+        for k in REQUESTED:
+            ids = [v['ID'] for v in random.sample(valutes, k)]
+            assert sorted(c.id for c in nested_loop(valutes, ids)) == sorted(c.id for c in index.currencies(ids))
+
+            loop_time = min(timeit.repeat(lambda: nested_loop(valutes, ids), number=1, repeat=3))
+            number = 1000
+            index_time = min(timeit.repeat(lambda: index.currencies(ids), number=number, repeat=3)) / number
+            print(f"{size:>8} | {k:>4} | {loop_time * 1000:>9.2f} | {index_time * 1e6:>11.2f} | {loop_time / index_time:>8.0f}x")
+        print(f"{size:>8} | построение индекса (один раз на обновление ленты): {build:.2f} мс")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Разбор большой ленты курсов: прежний путь -- json.load() всего ответа и
+список Currency -- против потокового iter_currencies(), который читает
+файл кусками по CHUNK_SIZE и разбирает записи Valute по одной.
+
+Лента синтетическая: записи в формате daily_json.js с уникальными кодами.
+Каждый режим запускается в отдельном процессе, чтобы пиковая память
+(ru_maxrss) не смешивалась. Полная загрузка 500 МБ не помещается в память
+небольшой машины, поэтому она мерится на --full-mb.
+Запуск из каталога лабораторной: python -m benchmarks.feed_stream [--mb 500] [--full-mb 100]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from utils.currencies_api import dict_to_currency
+from utils.feed_stream import CHUNK_SIZE, iter_currencies
+
+def write_feed(path: str, mb: int):
+    with open(path, 'wb') as f:
+        f.write(b'{"Date": "2024-01-01T11:30:00+03:00", "PreviousDate": "2023-12-29T11:30:00+03:00", "Valute": {')
+        i = 0
+        while f.tell() < mb * 2**20:
+            code = f'C{i:07d}'
+            valute = {'ID': f'R{i:07d}', 'NumCode': str(i % 1000), 'CharCode': code, 'Nominal': 1 + i % 100,
+                      'Name': f'Валюта номер {i}', 'Value': 10.0 + i % 1000 / 7, 'Previous': 10.0 + i % 999 / 7}
+            f.write(f'{", " if i else ""}"{code}": {json.dumps(valute, ensure_ascii=False)}'.encode())
+            i += 1
+        f.write(b'}}')
+
+def file_chunks(path: str):
+    with open(path, 'rb') as f:
+        while chunk := f.read(CHUNK_SIZE):
+            yield chunk
+
+def run(mode: str, path: str):
+    start = time.perf_counter()
+    if mode == 'json':
+        with open(path, 'rb') as f:
+            data = json.load(f)
+        count = len(list(map(dict_to_currency, data['Valute'].values())))
+    elif mode == 'stream':
+        count = sum(1 for _ in iter_currencies(file_chunks(path)))
+    else:
+        count = sum(1 for _ in iter_currencies(file_chunks(path), ['C0000001', 'C0001000']))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'count': count, 'seconds': elapsed, 'maxrss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+def measure(mode: str, path: str) -> dict:
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.feed_stream', '--run', mode, path],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mb', type=int, default=500)
+    parser.add_argument('--full-mb', type=int, default=100, help='размер ленты для json.load()')
+    parser.add_argument('--run', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        run(*args.run)
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        print(f"{'лента, МБ':>9} | {'режим':>18} | {'записей':>8} | {'время, с':>8} | {'пик RSS, МБ':>11}")
+        for mb, modes in ((args.full_mb, ('json', 'stream', 'stream-filter')), (args.mb, ('stream', 'stream-filter'))):
+            path = os.path.join(tmpdir, f'feed_{mb}.json')
+            write_feed(path, mb)
+            for mode in modes:
+                result = measure(mode, path)
+                print(f"{mb:>9} | {mode:>18} | {result['count']:>8} | {result['seconds']:>8.2f} | {result['maxrss_mb']:>11.0f}")
+            os.remove(path)
+
+if __name__ == '__main__':
+    main()
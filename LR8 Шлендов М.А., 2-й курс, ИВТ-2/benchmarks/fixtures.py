@@ -0,0 +1,43 @@
+from io import BytesIO
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from controllers.databaseController import Database, CurrencyDatabase, UserDatabase, UserCurrencyDatabase
+
+def make_env() -> Environment:
+    return Environment(
+        loader=FileSystemLoader('./templates/'),
+        autoescape=select_autoescape()
+    )
+
+def make_database(n_currencies: int, path: str = ':memory:') -> Database:
+    """Создаёт базу с n_currencies синтетическими валютами без обращения к API ЦБ."""
+    db = Database(path)
+    with db.connection() as conn:
+        conn.executemany("INSERT INTO Currencies(num_code, char_code, name, value, nominal) VALUES (?, ?, ?, ?, ?)",
+                         ((str(i), f'C{i:05d}', f'Валюта {i}', 1.0 + i / 100, 1) for i in range(n_currencies)))
+    return db
+
+def make_repositories(db: Database) -> tuple[CurrencyDatabase, UserDatabase, UserCurrencyDatabase]:
+    return CurrencyDatabase(db), UserDatabase(db), UserCurrencyDatabase(db)
+
+class BenchmarkHandler:
+    """Минимальная замена BaseHTTPRequestHandler: пишет ответ в BytesIO."""
+
+    def __init__(self):
+        self.wfile = BytesIO()
+        self.status = None
+        self.headers = {}
+
+    def send_response(self, status):
+        self.status = status
+
+    def send_header(self, key, value):
+        self.headers[key] = value
+
+    def end_headers(self):
+        pass
+
+    def reset(self):
+        self.wfile.seek(0)
+        self.wfile.truncate()
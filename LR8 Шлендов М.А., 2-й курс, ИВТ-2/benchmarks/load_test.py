@@ -0,0 +1,101 @@
+"""
+Нагрузочный тест режимов сервера (single, threaded, asyncio).
+
+Для каждого режима запускает main.py в отдельном процессе, нагружает его
+из нескольких клиентских потоков с keep-alive соединениями и печатает
+запросы в секунду и задержки p50/p99.
+
+Запуск из каталога лабораторной: python -m benchmarks.load_test [--clients 16] [--requests 200]
+"""
+import argparse
+import http.client
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from utils.cli import SERVING_MODES
+
+PATHS = ('/', '/currencies', '/users', '/user?id=1', '/author', '/static/css/index.css')
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_for_port(port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f'Сервер не открыл порт {port}')
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def run_clients(port: int, clients: int, requests: int) -> tuple[float, list[float], int]:
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def client(n: int):
+        nonlocal errors
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local, failed = [], 0
+        for i in range(requests):
+            path = PATHS[(n + i) % len(PATHS)]
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                continue
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, latencies, errors
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help='запросов на одного клиента')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--modes', nargs='+', choices=SERVING_MODES, default=SERVING_MODES)
+    args = parser.parse_args()
+
+    print(f"{'режим':>9} | {'запр/с':>8} | {'p50, мс':>8} | {'p99, мс':>8} | {'ошибок':>6}")
+    for mode in args.modes:
+        port = free_port()
+        server = subprocess.Popen([sys.executable, 'main.py', '--port', str(port), '--mode', mode, '--workers', str(args.workers)],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(port)
+            elapsed, latencies, errors = run_clients(port, args.clients, args.requests)
+        finally:
+            server.terminate()
+            server.wait()
+
+        rps = len(latencies) / elapsed
+        print(f"{mode:>9} | {rps:>8.0f} | {percentile(latencies, 0.5) * 1000:>8.2f} | {percentile(latencies, 0.99) * 1000:>8.2f} | {errors:>6}")
+
+if __name__ == '__main__':
+    main()
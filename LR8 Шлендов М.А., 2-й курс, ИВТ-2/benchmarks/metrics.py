@@ -0,0 +1,134 @@
+"""
+Цена сбора метрик на запрос.
+
+1. Обработчик сервера (KeepAliveHttpHandler из main) разбирает пачку
+   запросов из памяти, ответы отбрасываются -- весь путь запроса, кроме
+   сокета. Пачка обрабатывается парами прогонов, с метриками и без, в
+   чередующемся порядке; цена -- медиана разниц процессорного времени
+   потока в парах. Быстродействие виртуальной машины плавает сильнее, чем
+   стоят метрики, и только разница соседних прогонов его не замечает.
+2. Процессорное время сервера на запрос под нагрузкой через сокет (клиенты
+   load_test, сервер с --no-metrics), по /proc/<pid>/stat -- только Linux.
+   Пропускная способность на одном ядре шумит на ±20% между одинаковыми
+   прогонами и разницу в проценты не различает.
+
+Цена метрик -- разница из п. 1, делённая на время из п. 2.
+
+Запуск из каталога лабораторной: python -m benchmarks.metrics [--requests 600] [--pairs 81] [--rounds 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from io import BytesIO
+
+from main import KeepAliveHttpHandler, build
+from utils.metrics import Metrics, metrics
+
+from benchmarks.load_test import PATHS, free_port, run_clients, wait_for_port
+
+class NullWriter:
+    """wfile, который отбрасывает ответ: растущий BytesIO на мегабайты сам шумит сильнее метрик."""
+
+    def write(self, data) -> int:
+        return len(data)
+
+    def flush(self):
+        pass
+
+class InMemoryHandler(KeepAliveHttpHandler):
+    """Обработчик одного keep-alive соединения, запросы которого уже лежат в rfile."""
+
+    def __init__(self, payload: bytes):
+        self.rfile = BytesIO(payload)
+        self.wfile = NullWriter()
+        self.client_address = ('127.0.0.1', 0)
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+def payload(paths: tuple[str, ...], n: int) -> bytes:
+    return b''.join(f'GET {paths[i % len(paths)]} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode() for i in range(n))
+
+def serve_all(data: bytes):
+    InMemoryHandler(data).handle()
+
+def thread_time_per_request(data: bytes, n: int, enabled: bool) -> float:
+    metrics.enabled = enabled
+    return timeit.timeit(lambda: serve_all(data), number=1, timer=time.thread_time) / n * 1e6
+
+def in_memory(paths: tuple[str, ...], n: int, pairs: int) -> tuple[float, float]:
+    """Медианы микросекунд на запрос без метрик и разницы с метриками по pairs парам прогонов."""
+    data = payload(paths, n)
+    # Прогрев: шаблоны, PageCache, соединения с базой
+    serve_all(data)
+    plain, deltas = [], []
+    try:
+        for i in range(pairs):
+            order = (False, True) if i % 2 == 0 else (True, False)
+            times = {enabled: thread_time_per_request(data, n, enabled) for enabled in order}
+            plain.append(times[False])
+            deltas.append(times[True] - times[False])
+    finally:
+        metrics.enabled = True
+    return statistics.median(plain), statistics.median(deltas)
+
+def process_cpu(pid: int) -> float:
+    """utime + stime процесса, секунды."""
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+def server_cpu(clients: int, requests: int) -> float:
+    """Микросекунд процессорного времени сервера (threaded, без метрик) на запрос через сокет."""
+    port = free_port()
+    server = subprocess.Popen([sys.executable, 'main.py', '--port', str(port), '--mode', 'threaded', '--no-metrics'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        run_clients(port, clients, 20)
+        before = process_cpu(server.pid)
+        _, latencies, errors = run_clients(port, clients, requests)
+        after = process_cpu(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    if errors:
+        raise RuntimeError(f'{errors} ошибок')
+    return (after - before) / len(latencies) * 1e6
+
+def record_cost(n: int = 200_000) -> float:
+    """Микросекунд на begin() + end() одного запроса."""
+    m = Metrics()
+
+    def request():
+        stats = m.begin()
+        m.end(stats, '/currencies', 'GET', 200)
+
+    return min(timeit.repeat(request, number=n, repeat=5)) / n * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=600, help='запросов в одном прогоне')
+    parser.add_argument('--pairs', type=int, default=81)
+    parser.add_argument('--rounds', type=int, default=3, help='прогонов нагрузки через сокет')
+    parser.add_argument('--clients', type=int, default=4)
+    args = parser.parse_args()
+    build()
+
+    print(f"begin() + end(): {record_cost():.2f} мкс на запрос")
+
+    cpu = statistics.median(server_cpu(args.clients, 1500) for _ in range(args.rounds))
+    print(f"Процессорное время сервера на запрос через сокет: {cpu:.1f} мкс\n")
+
+    print(f"{'страница':>24} | {'без метрик, мкс':>15} | {'метрики, мкс':>12} | {'от запроса':>10}")
+    for name, paths in (('все страницы load_test', PATHS),) + tuple((path, (path,)) for path in PATHS):
+        plain, delta = in_memory(paths, args.requests, args.pairs)
+        print(f"{name:>24} | {plain:>15.1f} | {delta:>12.2f} | {delta / cpu * 100:>9.2f}%")
+
+if __name__ == '__main__':
+    main()
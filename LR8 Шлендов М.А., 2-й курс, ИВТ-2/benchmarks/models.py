@@ -0,0 +1,108 @@
+"""
+Память и скорость моделей: прежний Currency (__dict__ + property, строки
+через map(lambda ...)) против Currency со __slots__ и Currency.from_row
+в качестве row_factory.
+
+Замеры: загрузка N валют из SQLite, память, удерживаемая списком моделей,
+и рендер шаблона, читающего атрибуты каждой карточки.
+Запуск из каталога лабораторной: python -m benchmarks.models [--rows 1000000]
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from jinja2 import Template
+
+from controllers.databaseController import CURRENCY_COLUMNS, fetch_all
+from models.currency import Currency
+
+from benchmarks.fixtures import make_database
+
+TEMPLATE = Template("{% for c in currencies %}{{ c.id }}{{ c.char_code }}{{ c.name }}{{ c.value }}{{ c.nominal }}{% endfor %}")
+
+class LegacyCurrency:
+    """Currency до перехода на __slots__."""
+
+    def __init__(self, num_code: str, char_code: str, name: str, value: float, nominal: int, id: int | None = None):
+        self._num_code = num_code
+        self._char_code = char_code
+        self._name = name
+        self._value = value
+        self._nominal = nominal
+        self._id = id
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def num_code(self):
+        return self._num_code
+
+    @property
+    def char_code(self):
+        return self._char_code
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def value(self):
+        return self._value
+
+    @property
+    def nominal(self):
+        return self._nominal
+
+def load_legacy(conn) -> list:
+    result = conn.execute(f"SELECT {CURRENCY_COLUMNS} FROM Currencies").fetchall()
+    return list(map(lambda row: LegacyCurrency(row[1], row[2], row[3], row[4], row[5], id=row[0]), result))
+
+def load_slots(conn) -> list:
+    return fetch_all(conn, Currency.from_row, f"SELECT {CURRENCY_COLUMNS} FROM Currencies")
+
+def measure(load, conn) -> tuple[float, int, list]:
+    gc.collect()
+    start = time.perf_counter()
+    currencies = load(conn)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    retained = load(conn)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    return elapsed, size, currencies
+
+def object_size(obj) -> int:
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--render-rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    db = make_database(args.rows)
+    print(f"{'модель':>8} | {'объект, Б':>9} | {'загрузка, с':>11} | {'список, МБ':>10} | {'рендер, с':>9}")
+    with db.connection() as conn:
+        for name, load in (('dict', load_legacy), ('slots', load_slots)):
+            elapsed, size, currencies = measure(load, conn)
+            sample = currencies[:args.render_rows]
+            start = time.perf_counter()
+            TEMPLATE.render(currencies=sample)
+            render = time.perf_counter() - start
+            print(f"{name:>8} | {object_size(currencies[0]):>9} | {elapsed:>11.3f} | {size / 2**20:>10.1f} | {render:>9.3f}")
+            del currencies, sample
+    db.close()
+
+if __name__ == '__main__':
+    main()
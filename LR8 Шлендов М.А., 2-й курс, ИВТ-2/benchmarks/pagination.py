@@ -0,0 +1,55 @@
+"""
+Время ответа /currencies при разном числе строк в таблице: страница из
+PAGE_SIZE валют по keyset-курсору (в начале, в середине и в конце таблицы,
+по id и по value) против прежней выборки get_all() всех строк.
+
+Кэш страниц очищается перед каждым запросом, чтобы мерить запрос к базе и рендер.
+Запуск из каталога лабораторной: python -m benchmarks.pagination [--rows 10000 100000 1000000]
+"""
+import argparse
+import timeit
+
+from controllers.currenciesController import CurrenciesController
+from controllers.router import Router
+from utils.pagination import PAGE_SIZE
+from utils.page_cache import PageCache
+
+from benchmarks.fixtures import BenchmarkHandler, make_database, make_env, make_repositories
+
+REPEAT = 5
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--full-scan-limit', type=int, default=100_000, help='get_all() мерится только до этого размера')
+    args = parser.parse_args()
+
+    env = make_env()
+    print(f"{'строк':>9} | {'начало, мс':>10} | {'середина, мс':>12} | {'конец, мс':>9} | {'value, середина, мс':>19} | {'get_all, мс':>11}")
+    for rows in args.rows:
+        db = make_database(rows)
+        currencies_db, _, _ = make_repositories(db)
+        cache = PageCache()
+        router = Router(CurrenciesController(currencies_db, env, cache))
+        handler = BenchmarkHandler()
+        middle_by_value = currencies_db.get_page(1, after_id=rows // 2, sort='value').items[0].id
+
+        def request(params: dict):
+            def run():
+                cache.clear()
+                handler.reset()
+                router.dispatch(handler, '/currencies', params)
+            return min(timeit.repeat(run, number=10, repeat=REPEAT)) / 10 * 1000
+
+        first = request({})
+        middle = request({'after_id': str(rows // 2)})
+        last = request({'after_id': str(rows - PAGE_SIZE - 1)})
+        by_value = request({'sort': 'value', 'after_id': str(middle_by_value)})
+        full = '-'
+        if rows <= args.full_scan_limit:
+            full = f"{min(timeit.repeat(currencies_db.get_all, number=1, repeat=REPEAT)) * 1000:.1f}"
+        print(f"{rows:>9} | {first:>10.2f} | {middle:>12.2f} | {last:>9.2f} | {by_value:>19.2f} | {full:>11}")
+        db.close()
+
+if __name__ == '__main__':
+    main()
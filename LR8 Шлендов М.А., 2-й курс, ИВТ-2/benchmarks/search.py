@@ -0,0 +1,87 @@
+"""
+Поиск по валютам при разном числе строк: запрос FTS5 (редкое слово, слово
+из каждой строки, префикс, код), подсказки из PrefixIndex, весь запрос
+/search и, для сравнения, поиск подстроки через LIKE. Плюс время
+построения индекса подсказок, его память и цена вставки и удаления строки
+вместе с обоими индексами.
+
+Запуск из каталога лабораторной: python -m benchmarks.search [--rows 10000 100000 1000000]
+"""
+import argparse
+import time
+import timeit
+import tracemalloc
+
+from controllers.router import Router
+from controllers.searchController import SearchController
+from models.currency import Currency
+from utils.search import PrefixIndex
+
+from benchmarks.fixtures import BenchmarkHandler, make_database, make_repositories
+
+REPEAT = 5
+NUMBER = 200
+
+def per_call(func) -> float:
+    """Миллисекунд на вызов, лучший из REPEAT прогонов."""
+    return min(timeit.repeat(func, number=NUMBER, repeat=REPEAT)) / NUMBER * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'строк':>9} | {'редкое, мс':>10} | {'частое, мс':>10} | {'префикс, мс':>11} | {'код, мс':>7} | "
+          f"{'подсказки, мс':>13} | {'/search, мс':>11} | {'LIKE, мс':>8}")
+    builds = []
+    for rows in args.rows:
+        db = make_database(rows)
+        currencies_db, users_db, _ = make_repositories(db)
+        router = Router(SearchController(currencies_db, users_db))
+        handler = BenchmarkHandler()
+        middle = rows // 2
+        db.full_text = False
+        like = min(timeit.repeat(lambda: currencies_db.search(f'Валюта {middle}'), number=1, repeat=REPEAT)) * 1000
+        db.full_text = True
+
+        start = time.perf_counter()
+        currencies_db.prefixes.load()
+        build = time.perf_counter() - start
+        # Память -- отдельным построением: под tracemalloc оно в разы медленнее
+        tracemalloc.start()
+        index = PrefixIndex(currencies_db._prefix_texts)
+        index.load()
+        memory = tracemalloc.get_traced_memory()[0] / 2**20
+        tracemalloc.stop()
+        del index
+
+        def request():
+            handler.reset()
+            router.dispatch(handler, '/search', {'q': f'валюта {middle}'})
+
+        times = (
+            per_call(lambda: currencies_db.search(str(middle))),
+            per_call(lambda: currencies_db.search('валюта')),
+            per_call(lambda: currencies_db.search(f'валюта {middle // 10}')),
+            per_call(lambda: currencies_db.search(f'C{middle:05d}')),
+            per_call(lambda: currencies_db.suggest(f'валюта {middle // 10}')),
+            per_call(request),
+        )
+        print(f"{rows:>9} | {times[0]:>10.3f} | {times[1]:>10.3f} | {times[2]:>11.3f} | {times[3]:>7.3f} | "
+              f"{times[4]:>13.3f} | {times[5]:>11.3f} | {like:>8.1f}")
+
+        currency = Currency('999', 'ZZZ', 'Новая валюта', 1.0, 1)
+
+        def insert_and_delete():
+            currencies_db.insert(currency)
+            currencies_db.delete(currencies_db.search('ZZZ')[0].id)
+
+        builds.append((rows, build * 1000, memory, per_call(insert_and_delete)))
+        db.close()
+
+    print(f"\n{'строк':>9} | {'построение подсказок, мс':>24} | {'память, МБ':>10} | {'вставка + удаление, мс':>22}")
+    for rows, build, memory, write in builds:
+        print(f"{rows:>9} | {build:>24.0f} | {memory:>10.1f} | {write:>22.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Время запуска сервера: от старта процесса до открытого порта и до первого
+ответа 200, для main.py и start.py (сокет открывается до импорта
+приложения), с пустым и заполненным кэшем байткода шаблонов. Затем --
+самые дорогие импорты main по -X importtime.
+
+База database.sqlite3 должна уже существовать: заполнение пустой таблицы
+уходит в фоновую загрузку курсов и во время запуска не входит.
+Запуск из каталога лабораторной: python -m benchmarks.startup [--repeat 5] [--path /currencies]
+"""
+import argparse
+import http.client
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from main import TEMPLATE_CACHE
+
+from benchmarks.load_test import free_port
+
+def first_response(port: int, path: str, started: float, timeout: float = 30) -> tuple[float, float]:
+    """Секунды от started до принятого соединения и до первого ответа 200."""
+    deadline = started + timeout
+    while True:
+        try:
+            sock = socket.create_connection(('127.0.0.1', port), timeout=timeout)
+            break
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f'Сервер не открыл порт {port}')
+            time.sleep(0.002)
+    connected = time.perf_counter() - started
+
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    conn.sock = sock
+    conn.request('GET', path)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    if response.status != 200:
+        raise RuntimeError(f'{path}: HTTP {response.status}')
+    return connected, time.perf_counter() - started
+
+def measure(entry: str, path: str, cold_templates: bool) -> tuple[float, float]:
+    if cold_templates:
+        shutil.rmtree(TEMPLATE_CACHE, ignore_errors=True)
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, entry, '--port', str(port)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        return first_response(port, path, started)
+    finally:
+        server.terminate()
+        server.wait()
+
+def import_times(top: int) -> list[tuple[int, str]]:
+    """Суммарное время импорта (мкс) main и модулей, которые он импортирует напрямую."""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                            capture_output=True, text=True, check=True).stderr
+    lines = [line.removeprefix('import time:').split('|') for line in output.splitlines()[1:]]
+    # Всё до модуля site -- запуск интерпретатора
+    start = next(i for i, (_, _, name) in enumerate(lines) if name == ' site') + 1
+    result = []
+    for _, cumulative, name in lines[start:]:
+        # Отступ имени -- глубина вложенности: main на верхнем уровне, его импорты -- на следующем
+        if len(name) - len(name.lstrip()) <= 3:
+            result.append((int(cumulative), name.strip()))
+    return sorted(result, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--path', default='/currencies')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'запуск':>9} | {'шаблоны':>8} | {'порт, мс':>8} | {'первый 200, мс':>14}")
+    for entry in ('main.py', 'start.py'):
+        for cold in (True, False):
+            if not cold:
+                measure(entry, args.path, False)
+            runs = [measure(entry, args.path, cold) for _ in range(args.repeat)]
+            connected = statistics.median(run[0] for run in runs) * 1000
+            first = statistics.median(run[1] for run in runs) * 1000
+            print(f"{entry:>9} | {'без кэша' if cold else 'из кэша':>8} | {connected:>8.1f} | {first:>14.1f}")
+
+    print(f"\nimport main, -X importtime:")
+    for cumulative, name in import_times(args.top):
+        print(f"  {cumulative / 1000:>7.1f} мс  {name}")
+
+if __name__ == '__main__':
+    main()
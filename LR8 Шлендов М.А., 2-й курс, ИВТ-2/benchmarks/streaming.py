@@ -0,0 +1,99 @@
+"""
+Время до первого байта и пиковая память при отдаче /currencies
+с большим числом карточек: respond_html (render + encode + write)
+против respond_html_stream (generate + chunked).
+
+Каждый замер идёт в отдельном процессе, чтобы пиковый RSS не смешивался.
+Запуск из каталога лабораторной: python -m benchmarks.streaming [--cards 50000 200000]
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from common import APP, PAGES
+from models.currency import Currency
+from utils.response import respond_html, respond_html_stream
+
+from benchmarks.fixtures import make_env
+
+class SinkFile:
+    """wfile, который только считает байты и запоминает время первой записи."""
+
+    def __init__(self):
+        self.first_write = None
+        self.written = 0
+
+    def write(self, b):
+        if self.first_write is None:
+            self.first_write = time.perf_counter()
+        self.written += len(b)
+        return len(b)
+
+class SinkHandler:
+    protocol_version = 'HTTP/1.1'
+    request_version = 'HTTP/1.1'
+
+    def __init__(self):
+        self.wfile = SinkFile()
+        self.close_connection = False
+
+    def send_response(self, status):
+        pass
+
+    def send_header(self, key, value):
+        pass
+
+    def end_headers(self):
+        pass
+
+def render(mode: str, template, data: dict, handler: SinkHandler):
+    if mode == 'buffered':
+        respond_html(handler, template.render(data))
+    else:
+        respond_html_stream(handler, template, data)
+
+def run_child(mode: str, cards: int):
+    template = make_env().get_template('currencies.html')
+    data = {'app': APP, 'pages': PAGES,
+            'currencies': [Currency(str(i), f'C{i:06d}', f'Валюта номер {i}', 1.0 + i / 1000, 1) for i in range(cards)]}
+    render(mode, template, data, SinkHandler())
+
+    handler = SinkHandler()
+    start = time.perf_counter()
+    render(mode, template, data, handler)
+    total = time.perf_counter() - start
+    ttfb = handler.wfile.first_write - start
+
+    tracemalloc.start()
+    render(mode, template, data, SinkHandler())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(json.dumps({'ttfb': ttfb, 'total': total, 'bytes': handler.wfile.written, 'peak': peak,
+                      'maxrss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cards', type=int, nargs='+', default=[50_000, 200_000])
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'CARDS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]))
+        return
+
+    print(f"{'карточек':>9} | {'режим':>9} | {'TTFB, мс':>9} | {'всего, мс':>9} | {'тело, МБ':>8} | {'пик аллок., МБ':>14} | {'maxRSS, МБ':>10}")
+    for cards in args.cards:
+        for mode in ('buffered', 'streaming'):
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.streaming', '--child', mode, str(cards)],
+                                 capture_output=True, text=True, check=True).stdout
+            r = json.loads(out)
+            print(f"{cards:>9} | {mode:>9} | {r['ttfb'] * 1000:>9.2f} | {r['total'] * 1000:>9.1f} | {r['bytes'] / 2**20:>8.1f} | "
+                  f"{r['peak'] / 2**20:>14.1f} | {r['maxrss'] / 1024:>10.1f}")
+
+if __name__ == '__main__':
+    main()
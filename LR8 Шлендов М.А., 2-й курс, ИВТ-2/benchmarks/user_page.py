@@ -0,0 +1,64 @@
+"""
+Время ответа /user?id= в зависимости от числа подписок пользователя.
+
+Сравнивается прежний путь (get_by_id + get_by_user_id + get_by_id на каждую
+подписку) и один JOIN-запрос UserDatabase.get_with_currencies.
+
+Запуск из каталога лабораторной: python -m benchmarks.user_page
+"""
+import timeit
+
+from common import APP, PAGES
+from controllers.router import Router
+from controllers.userController import UserController
+from models.user_currency import UserCurrency
+from utils.page_cache import PageCache
+from utils.response import respond_html
+
+from benchmarks.fixtures import BenchmarkHandler, make_database, make_env, make_repositories
+
+SIZES = (3, 30, 300, 3000)
+REPEAT = 5
+
+def main():
+    env = make_env()
+    template_user = env.get_template('user.html')
+    db = make_database(max(SIZES))
+    currencies_db, users_db, user_currencies_db = make_repositories(db)
+    handler = BenchmarkHandler()
+    cache = PageCache()
+    router = Router(UserController(users_db, user_currencies_db, currencies_db, env, cache))
+
+    def old_path():
+        handler.reset()
+        user = users_db.get_by_id(1)
+        user_currencies = user_currencies_db.get_by_user_id(user.id)
+        currencies = map(lambda uc: currencies_db.get_by_id(uc.currency_id), user_currencies)
+        respond_html(handler, template_user.render({'app': APP, 'pages': PAGES, 'user': user, 'currencies': currencies}))
+
+    def queries_only_old():
+        user_currencies = user_currencies_db.get_by_user_id(1)
+        return [currencies_db.get_by_id(uc.currency_id) for uc in user_currencies]
+
+    def new_path():
+        handler.reset()
+        # Иначе со второго повтора это была бы страница из кэша, а не JOIN и рендер
+        cache.clear()
+        router.dispatch(handler, '/user', {'id': '1'})
+
+    def queries_only_new():
+        return users_db.get_with_currencies(1)
+
+    print(f"{'подписок':>9} | {'N+1, мс':>9} | {'JOIN, мс':>9} | {'N+1 SQL, мс':>11} | {'JOIN SQL, мс':>12}")
+    for size in SIZES:
+        with db.connection() as conn:
+            conn.execute("DELETE FROM UserCurrencies WHERE user_id = 1")
+        user_currencies_db.insert_many(UserCurrency(1, i) for i in range(1, size + 1))
+
+        number = max(1, 300 // size)
+        results = [min(timeit.repeat(f, number=number, repeat=REPEAT)) / number * 1000
+                   for f in (old_path, new_path, queries_only_old, queries_only_new)]
+        print(f"{size:>9} | {results[0]:>9.3f} | {results[1]:>9.3f} | {results[2]:>11.3f} | {results[3]:>12.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -4,34 +4,34 @@ from utils.response import *
 
 from jinja2.environment import Environment
 
+from utils.page_cache import PageCache
+
 from common import APP, PAGES
 
 class AuthorController:
-    def __init__(self, handler: BaseHTTPRequestHandler, env: Environment):
-        self.handler = handler
+    def __init__(self, env: Environment, cache: PageCache | None = None):
+        self.cache = cache if cache is not None else PageCache()
         self.template_index = env.get_template("index.html")
         self.template_author = env.get_template("author.html")
-    
-    def handle_get(self, path: str, params: dict) -> bool:
-        if path == '':
-            self._handle_index(params)
-            return True
-        if path == '/author':
-            self._handle_author(params)
-            return True
-        
-        return False
-    
-    def _handle_index(self, params: dict):
-        data = params | {
-            'app': APP,
-            'pages': PAGES
+        self.routes = {
+            '': self._handle_index,
+            '/author': self._handle_author,
         }
-        respond_html(self.handler, self.template_index.render(data))
     
-    def _handle_author(self, params: dict):
-        data = params | {
-            'app': APP,
-            'pages': PAGES
-        }
-        respond_html(self.handler, self.template_author.render(data))
\ No newline at end of file
+    def _handle_index(self, handler: BaseHTTPRequestHandler, params: dict):
+        self._respond_static_page(handler, '', self.template_index, params)
+    
+    def _handle_author(self, handler: BaseHTTPRequestHandler, params: dict):
+        self._respond_static_page(handler, '/author', self.template_author, params)
+        
+    def _respond_static_page(self, handler: BaseHTTPRequestHandler, path: str, template, params: dict):
+        # Страницы зависят только от APP и PAGES: версия данных постоянная, параметры запроса не важны
+        key = PageCache.key(path, {})
+        page = self.cache.get(key, None)
+        if page is None:
+            data = {
+                'app': APP,
+                'pages': PAGES
+            }
+            page = self.cache.put(key, None, template.render(data).encode('utf-8'))
+        respond_page(handler, page)
@@ -0,0 +1,112 @@
+import json
+import math
+from http.server import BaseHTTPRequestHandler
+
+from utils.response import *
+from utils.conversion import CurrencyConverter, UnknownCurrency
+
+# Миллион сумм в JSON занимает около 20 МБ
+MAX_BATCH_BODY = 64 * 2**20
+
+class ConversionController:
+    def __init__(self, converter: CurrencyConverter):
+        self.converter = converter
+        self.routes = {
+            '/convert': self._handle_convert,
+        }
+        self.post_routes = {
+            '/convert/batch': self._handle_batch,
+        }
+
+    def _handle_convert(self, handler: BaseHTTPRequestHandler, params: dict):
+        """/convert?from=USD&to=EUR[&amount=100]"""
+        from_code, to_code = params.get('from'), params.get('to')
+        try:
+            amount = float(params.get('amount', 1))
+        except ValueError:
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+
+        if from_code is None or to_code is None or not math.isfinite(amount):
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+
+        try:
+            rate = self.converter.rates().rate(from_code, to_code)
+        except UnknownCurrency:
+            respond_status(handler, HTTPStatus.NOT_FOUND)
+            return
+
+        result = amount * rate
+        if not math.isfinite(result):
+            # Конечная сумма, умноженная на курс, может не поместиться во float, а Infinity в JSON нет
+            respond_status(handler, HTTPStatus.UNPROCESSABLE_ENTITY)
+            return
+
+        respond_json(handler, {'from': from_code, 'to': to_code, 'amount': amount, 'rate': rate, 'result': result})
+
+    def _handle_batch(self, handler: BaseHTTPRequestHandler, params: dict):
+        """
+        Тело -- JSON {"from": "USD", "to": "EUR", "amounts": [...]}, где from и to --
+        код или список кодов длины amounts; ответ -- {"results": [...]}.
+        """
+        try:
+            length = int(handler.headers.get('Content-Length', 0))
+        except ValueError:
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+
+        if length < 0:
+            # Тело не прочитано, и где кончается запрос, неизвестно: соединение дальше не годится
+            handler.close_connection = True
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+
+        if length > MAX_BATCH_BODY:
+            handler.close_connection = True
+            respond_status(handler, HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            return
+
+        try:
+            request = json.loads(handler.rfile.read(length))
+        except ValueError:
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+
+        if not isinstance(request, dict) or not _is_codes(request.get('from')) or not _is_codes(request.get('to')):
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+
+        amounts = request.get('amounts')
+        if not _is_amounts(amounts):
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+
+        try:
+            results = self.converter.rates().convert_many(request['from'], request['to'], amounts)
+        except UnknownCurrency:
+            respond_status(handler, HTTPStatus.NOT_FOUND)
+            return
+        except ValueError:
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+
+        results = results.tolist()
+        if not all(map(math.isfinite, results)):
+            respond_status(handler, HTTPStatus.UNPROCESSABLE_ENTITY)
+            return
+
+        respond_json(handler, {'results': results})
+
+def _is_codes(codes) -> bool:
+    return isinstance(codes, str) or (isinstance(codes, list) and all(isinstance(code, str) for code in codes))
+
+def _is_amounts(amounts) -> bool:
+    """Список конечных чисел: json.loads пропускает NaN и Infinity, а целые -- любой длины."""
+    if not isinstance(amounts, list):
+        return False
+    try:
+        return all(type(amount) in (int, float) and math.isfinite(amount) for amount in amounts)
+    except OverflowError:
+        # Целое, которое не помещается во float64
+        return False
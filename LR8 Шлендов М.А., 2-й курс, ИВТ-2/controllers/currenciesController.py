@@ -1,69 +1,129 @@
+import json
+import math
 from http.server import BaseHTTPRequestHandler
 from jinja2.environment import Environment
 
 from utils.response import *
 
-from controllers.databaseController import CurrencyDatabase
+from controllers.databaseController import CURRENCY_SORT_KEYS, CurrencyDatabase
+from utils.page_cache import PageCache
+from utils.pagination import page_links, page_query, parse_page_params
 
 from common import APP, PAGES
 
+# Страницы с большим числом карточек отдаются потоком, без Content-Length
+STREAM_THRESHOLD = 500
+# Ограничение на тело POST /currency/update
+MAX_UPDATE_BODY = 2**20
+
 class CurrenciesController:
-    def __init__(self, handler: BaseHTTPRequestHandler, db: CurrencyDatabase, env: Environment):
-        self.handler = handler
+    def __init__(self, db: CurrencyDatabase, env: Environment, cache: PageCache | None = None):
+        self.cache = cache if cache is not None else PageCache()
         self.db = db
         self.template_currencies = env.get_template('currencies.html')
+        self.routes = {
+            '/currencies': self._handle_currencies,
+            '/currency/delete': self._handle_delete,
+            '/currency/update': self._handle_update,
+            '/currency/show': self._handle_show,
+        }
+        self.post_routes = {
+            '/currency/update': self._handle_update_post,
+        }
     
-    def handle_get(self, path: str, params: dict) -> bool:
-        if path == '/currencies':
-            self._handle_currencies(params)
-            return True
-        if path == '/currency/delete':
-            self._handle_delete(params)
-            return True
-        if path == '/currency/update':
-            self._handle_update(params)
-            return True
-        if path == '/currency/show':
-            self._handle_show()
-            return True
+    def _handle_currencies(self, handler: BaseHTTPRequestHandler, params: dict):
+        page_params = parse_page_params(params, CURRENCY_SORT_KEYS)
+        if page_params is None:
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
         
-        return False
-    
-    def _handle_currencies(self, params: dict):
-        currencies = self.db.get_all()
-        data = params | {
-            'app': APP,
-            'pages': PAGES,
-            'currencies': currencies,
-        }
-        respond_html(self.handler, self.template_currencies.render(data))
+        query = page_query(page_params, CURRENCY_SORT_KEYS)
+        key = PageCache.key('/currencies', query)
+        version = self.db.version()
+        page = self.cache.get(key, version)
+        if page is None:
+            result = self.db.get_page(**page_params)
+            currencies = result.items
+            data = {
+                'app': APP,
+                'pages': PAGES,
+                'currencies': currencies,
+                'total': result.total,
+            } | page_links('/currencies', query, result)
+            if len(currencies) > STREAM_THRESHOLD:
+                respond_html_stream(handler, self.template_currencies, data)
+                return
+            page = self.cache.put(key, version, self.template_currencies.render(data).encode('utf-8'))
+        respond_page(handler, page)
         
-    def _handle_delete(self, params: dict):
+    def _handle_delete(self, handler: BaseHTTPRequestHandler, params: dict):
         id = params.get('id')
         if id is None:
-            self.handler.send_response(HTTPStatus.BAD_REQUEST)
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
             return
             
         try:
             id = int(id)
         except ValueError:
-            self.handler.send_response(HTTPStatus.BAD_REQUEST)
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
             return
     
         self.db.delete(id=id)
-        self.handler.send_response(HTTPStatus.OK)
+        respond_status(handler, HTTPStatus.OK)
     
-    def _handle_update(self, params: dict):
+    def _handle_update(self, handler: BaseHTTPRequestHandler, params: dict):
+        rates = {}
         for char_code, value in params.items():
             try:
-                value = float(value)
+                rate = float(value)
             except ValueError:
                 continue
-            self.db.update_by_char_code(char_code, value)
-        self.handler.send_response(HTTPStatus.OK)
+            if _is_rate(rate):
+                rates[char_code] = rate
+        respond_json(handler, self.db.update_many(rates))
+        
+    def _handle_update_post(self, handler: BaseHTTPRequestHandler, params: dict):
+        """Тело запроса -- JSON-объект {"USD": 90.5, ...}; ответ -- число изменённых строк по кодам."""
+        try:
+            length = int(handler.headers.get('Content-Length', 0))
+        except ValueError:
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+        
+        if length < 0:
+            # Тело не прочитано, и где кончается запрос, неизвестно: соединение дальше не годится
+            handler.close_connection = True
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+        
+        if length > MAX_UPDATE_BODY:
+            handler.close_connection = True
+            respond_status(handler, HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            return
+        
+        try:
+            rates = json.loads(handler.rfile.read(length))
+        except ValueError:
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+        
+        if not isinstance(rates, dict) or not all(type(value) in (int, float) and _is_rate(value) for value in rates.values()):
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+        
+        respond_json(handler, self.db.update_many({char_code: float(value) for char_code, value in rates.items()}))
     
-    def _handle_show(self):
-        currencies = self.db.get_all()
-        for currency in currencies:
-            print(currency)
-        self.handler.send_response(HTTPStatus.OK)
\ No newline at end of file
+    def _handle_show(self, handler: BaseHTTPRequestHandler, params: dict):
+        """Все валюты JSON-списком (раньше печатались в консоль сервера)."""
+        respond_json(handler, [
+            {'id': c.id, 'num_code': c.num_code, 'char_code': c.char_code, 'name': c.name, 'value': c.value, 'nominal': c.nominal}
+            for c in self.db.get_all()
+        ])
+
+def _is_rate(value: int | float) -> bool:
+    """Курс -- конечное положительное число: json.loads и float() пропускают NaN и Infinity, а NaN база хранит как NULL."""
+    try:
+        return math.isfinite(value) and value > 0
+    except OverflowError:
+        # Целое, которое не помещается во float64
+        return False
\ No newline at end of file
@@ -1,145 +1,536 @@
 import sqlite3
-from typing import Iterable
+import threading
+from contextlib import contextmanager
+from queue import Queue, Empty
+from time import perf_counter
+from typing import Iterable, Iterator, Mapping
 
 from models.currency import Currency
 from models.user import User
 from models.user_currency import UserCurrency
 
 from utils.currencies_api import get_currencies
+from utils.metrics import metrics
+from utils.pagination import PAGE_SIZE, Page
+from utils.search import SEARCH_LIMIT, SUGGEST_LIMIT, PrefixIndex, fts_query, like_pattern
+
+DATABASE_PATH = 'database.sqlite3'
+# Не больше SQLITE_MAX_VARIABLE_NUMBER старых сборок SQLite в одном IN (...)
+MAX_QUERY_PARAMS = 999
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Currencies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    num_code TEXT NOT NULL,
+    char_code TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value FLOAT,
+    nominal INTEGER
+);
+CREATE TABLE IF NOT EXISTS Users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS UserCurrencies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    currency_id INTEGER NOT NULL,
+    FOREIGN KEY(user_id) REFERENCES Users(id) ON DELETE CASCADE,
+    FOREIGN KEY(currency_id) REFERENCES Currencies(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_currencies_char_code ON Currencies(char_code);
+CREATE INDEX IF NOT EXISTS idx_currencies_value ON Currencies(value);
+CREATE INDEX IF NOT EXISTS idx_user_currencies_user_id ON UserCurrencies(user_id);
+"""
+
+# Полнотекстовые индексы кодов и названий. Таблицы external content хранят
+# только индекс, текст берётся из Currencies/Users; триггеры обновляют индекс
+# в той же транзакции, что и строку. Курсы (value) в индекс не входят, и их
+# обновление индекс не трогает.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS CurrenciesSearch USING fts5(
+    char_code, name, content='Currencies', content_rowid='id', prefix='1 2 3 4 5 6'
+);
+CREATE TRIGGER IF NOT EXISTS currencies_search_insert AFTER INSERT ON Currencies BEGIN
+    INSERT INTO CurrenciesSearch(rowid, char_code, name) VALUES (new.id, new.char_code, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS currencies_search_delete AFTER DELETE ON Currencies BEGIN
+    INSERT INTO CurrenciesSearch(CurrenciesSearch, rowid, char_code, name) VALUES ('delete', old.id, old.char_code, old.name);
+END;
+CREATE TRIGGER IF NOT EXISTS currencies_search_update AFTER UPDATE OF char_code, name ON Currencies BEGIN
+    INSERT INTO CurrenciesSearch(CurrenciesSearch, rowid, char_code, name) VALUES ('delete', old.id, old.char_code, old.name);
+    INSERT INTO CurrenciesSearch(rowid, char_code, name) VALUES (new.id, new.char_code, new.name);
+END;
+CREATE VIRTUAL TABLE IF NOT EXISTS UsersSearch USING fts5(
+    name, content='Users', content_rowid='id', prefix='1 2 3 4 5 6'
+);
+CREATE TRIGGER IF NOT EXISTS users_search_insert AFTER INSERT ON Users BEGIN
+    INSERT INTO UsersSearch(rowid, name) VALUES (new.id, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS users_search_delete AFTER DELETE ON Users BEGIN
+    INSERT INTO UsersSearch(UsersSearch, rowid, name) VALUES ('delete', old.id, old.name);
+END;
+CREATE TRIGGER IF NOT EXISTS users_search_update AFTER UPDATE OF name ON Users BEGIN
+    INSERT INTO UsersSearch(UsersSearch, rowid, name) VALUES ('delete', old.id, old.name);
+    INSERT INTO UsersSearch(rowid, name) VALUES (new.id, new.name);
+END;
+"""
+SEARCH_TABLES = ('CurrenciesSearch', 'UsersSearch')
+
+# Начальные подписки пользователей (id пользователя, id валюты)
+USER_CURRENCIES_SEED = (
+    UserCurrency(1, 2),
+    UserCurrency(1, 5),
+    UserCurrency(1, 10),
+
+    UserCurrency(2, 10),
+    UserCurrency(2, 23),
+    UserCurrency(2, 12),
+
+    UserCurrency(3, 42),
+    UserCurrency(3, 34),
+    UserCurrency(3, 19),
+)
+
+CURRENCY_COLUMNS = "id, num_code, char_code, name, value, nominal"
+CURRENCY_SORT_KEYS = ('id', 'char_code', 'value')
+USER_SORT_KEYS = ('id',)
+
+def fetch_all(conn: sqlite3.Connection, row_factory, sql: str, params: tuple = ()) -> list:
+    """Выполняет запрос на отдельном курсоре, строки сразу превращаются в модели через row_factory."""
+    cursor = conn.cursor()
+    cursor.row_factory = row_factory
+    return cursor.execute(sql, params).fetchall()
+
+def fetch_page(conn: sqlite3.Connection, row_factory, table: str, columns: str, limit: int,
+               after_id: int | None = None, before_id: int | None = None, sort: str = 'id') -> Page:
+    """
+    Keyset-пагинация: строки после (или перед) строки с id курсора в порядке
+    (sort, id). Запрос идёт по индексу и не зависит от того, насколько
+    далеко страница от начала таблицы, в отличие от OFFSET.
+    sort подставляется в SQL, поэтому должен быть из белого списка вызывающего.
+    """
+    key = 'id' if sort == 'id' else f'{sort}, id'
+    cursor_key = '?' if sort == 'id' else f'(SELECT {key} FROM {table} WHERE id = ?)'
+    where, params = '', ()
+    backwards = before_id is not None
+    if backwards:
+        where, params = f'WHERE ({key}) < {cursor_key}', (before_id,)
+    elif after_id is not None:
+        where, params = f'WHERE ({key}) > {cursor_key}', (after_id,)
+
+    order = ', '.join(column + (' DESC' if backwards else '') for column in key.split(', '))
+    rows = fetch_all(conn, row_factory, f'SELECT {columns} FROM {table} {where} ORDER BY {order} LIMIT ?', params + (limit + 1,))
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+        return Page(rows, has_next=True, has_prev=more)
+    return Page(rows, has_next=more, has_prev=after_id is not None)
+
+class Database:
+    """
+    Файловая база SQLite (WAL) с общим потокобезопасным пулом соединений.
+
+    Для каждой таблицы ведётся счётчик изменений: репозитории увеличивают
+    его через bump() после фиксации записи, а кэш страниц сравнивает
+    version() со значением, с которым страница была построена.
+    """
+
+    def __init__(self, path: str = DATABASE_PATH, pool_size: int = 4):
+        self.path = path
+        # У базы в памяти каждое соединение -- отдельная база, поэтому оно одно
+        self.pool_size = 1 if path == ':memory:' else pool_size
+        self._pool: Queue[sqlite3.Connection] = Queue(maxsize=self.pool_size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._versions: dict[str, int] = {}
+
+        with self.connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        self.full_text = self._create_search_tables()
+
+    def _create_search_tables(self) -> bool:
+        """
+        Создаёт индексы SEARCH_SCHEMA; в базе, где таблицы уже были без них,
+        индексы заполняются из существующих строк. False, если SQLite собран
+        без FTS5 -- тогда поиск идёт через LIKE.
+        """
+        with self.connection() as conn:
+            existing = {name for name, in conn.execute(
+                f"SELECT name FROM sqlite_master WHERE name IN ({', '.join('?' * len(SEARCH_TABLES))})", SEARCH_TABLES)}
+            try:
+                conn.executescript(SEARCH_SCHEMA)
+            except sqlite3.OperationalError:
+                return False
+            for table in SEARCH_TABLES:
+                if table not in existing:
+                    conn.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+        return True
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256)
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get_nowait()
+        except Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                return self._connect()
+
+        return self._pool.get()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        # Время блока и число блоков идут в метрики текущего HTTP-запроса (фаза db)
+        stats = metrics.current()
+        start = perf_counter() if stats is not None else 0.0
+        conn = self._acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.put(conn)
+            if stats is not None:
+                stats.db += perf_counter() - start
+                stats.queries += 1
+
+    def version(self, *tables: str) -> tuple[int, ...]:
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump(self, *tables: str):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except Empty:
+                break
 
 class CurrencyDatabase:
-    def __init__(self):
-        self.conn = sqlite3.connect(':memory:')
-        self.cursor = self.conn.cursor()
-        
-        self.cursor.execute("""CREATE TABLE IF NOT EXISTS Currencies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            num_code TEXT NOT NULL,
-            char_code TEXT NOT NULL,
-            name TEXT NOT NULL,
-            value FLOAT,
-            nominal INTEGER
-        );""")
-        self.conn.commit()
-        
-        self.insert_many(get_currencies())
-        
+    """
+    Таблица валют. Пустая таблица заполняется из ленты ЦБ: сразу в конструкторе
+    или, с fetch_if_empty=False, при первом update_rates() -- например,
+    из фонового обновления RatesProvider, не задерживая запуск сервера.
+    """
+
+    def __init__(self, db: Database, fetch_if_empty: bool = True):
+        self.db = db
+        self._count: tuple[tuple[int, ...], int] | None = None
+        # Коды и названия для подсказок; insert/insert_many/delete обновляют его вместе с таблицей
+        self.prefixes = PrefixIndex(self._prefix_texts)
+
+        if fetch_if_empty and self.count() == 0:
+            self.insert_many(get_currencies())
+
+    def count(self) -> int:
+        """Число валют; COUNT(*) выполняется заново, только если таблица менялась."""
+        version = self.version()
+        cached = self._count
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with self.db.connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM Currencies").fetchone()[0]
+        self._count = (version, count)
+        return count
+
+    def version(self) -> tuple[int, ...]:
+        return self.db.version('Currencies')
+
     def insert(self, currency: Currency):
-        self.cursor.execute("INSERT INTO Currencies(num_code, char_code, name, value, nominal) VALUES (?, ?, ?, ?, ?)",
-                            (currency.num_code, currency.char_code, currency.name, currency.value, currency.nominal))
-        self.conn.commit()
-        
+        with self.prefixes.lock:
+            with self.db.connection() as conn:
+                conn.execute("INSERT INTO Currencies(num_code, char_code, name, value, nominal) VALUES (?, ?, ?, ?, ?)",
+                             (currency.num_code, currency.char_code, currency.name, currency.value, currency.nominal))
+            self.prefixes.add_many((currency.char_code, currency.name))
+        self.db.bump('Currencies')
+
     def insert_many(self, currencies: Iterable[Currency]):
-        self.cursor.executemany("INSERT INTO Currencies(num_code, char_code, name, value, nominal) VALUES (?, ?, ?, ?, ?)",
-                            map(lambda c: (c.num_code, c.char_code, c.name, c.value, c.nominal), currencies))
-        self.conn.commit()
-        
+        # currencies может быть потоком из ленты: для индекса запоминаются только строки, а не сами Currency
+        texts = []
+
+        def row(c: Currency) -> tuple:
+            texts.append(c.char_code)
+            texts.append(c.name)
+            return c.num_code, c.char_code, c.name, c.value, c.nominal
+
+        with self.prefixes.lock:
+            with self.db.connection() as conn:
+                conn.executemany("INSERT INTO Currencies(num_code, char_code, name, value, nominal) VALUES (?, ?, ?, ?, ?)",
+                                 map(row, currencies))
+            self.prefixes.add_many(texts)
+        self.db.bump('Currencies')
+
+    def _prefix_texts(self) -> list[str]:
+        with self.db.connection() as conn:
+            return [text for row in conn.execute("SELECT char_code, name FROM Currencies") for text in row]
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT) -> list[Currency]:
+        """
+        Валюты, в коде или названии которых есть все слова query (последнее --
+        как префикс), в порядке id. Без ранжирования bm25: сортировка по rank
+        оценивает все совпадения, и «валюта» на миллионе строк перестала бы
+        укладываться в миллисекунду.
+        """
+        if not self.db.full_text:
+            with self.db.connection() as conn:
+                pattern = like_pattern(query.strip())
+                return fetch_all(conn, Currency.from_row, f"SELECT {CURRENCY_COLUMNS} FROM Currencies "
+                                 "WHERE char_code LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\' ORDER BY id LIMIT ?", (pattern, pattern, limit))
+
+        match = fts_query(query)
+        if match is None:
+            return []
+        with self.db.connection() as conn:
+            return fetch_all(conn, Currency.from_row, f"SELECT {CURRENCY_COLUMNS} FROM Currencies WHERE id IN "
+                             "(SELECT rowid FROM CurrenciesSearch WHERE CurrenciesSearch MATCH ? LIMIT ?) ORDER BY id", (match, limit))
+
+    def suggest(self, prefix: str, limit: int = SUGGEST_LIMIT) -> list[str]:
+        """Коды и названия, начинающиеся с prefix, -- из памяти, без обращения к базе."""
+        return self.prefixes.complete(prefix, limit)
+
     def get_all(self) -> list[Currency]:
-        self.cursor.execute("SELECT * FROM Currencies")
-        result = self.cursor.fetchall()
-        return list(map(lambda row: Currency(row[1], row[2], row[3], row[4], row[5], id=row[0]), result))
-
-    def get_by_id(self, id: int) -> Currency:
-        self.cursor.execute("SELECT * FROM Currencies WHERE id = ?", (id,))
-        row = self.cursor.fetchone()
-        return Currency(row[1], row[2], row[3], row[4], row[5], id=row[0])
-    
+        with self.db.connection() as conn:
+            return fetch_all(conn, Currency.from_row, f"SELECT {CURRENCY_COLUMNS} FROM Currencies")
+
+    def get_page(self, limit: int = PAGE_SIZE, after_id: int | None = None, before_id: int | None = None, sort: str = 'id') -> Page:
+        if sort not in CURRENCY_SORT_KEYS:
+            raise ValueError(f"Нельзя сортировать валюты по '{sort}'")
+
+        with self.db.connection() as conn:
+            page = fetch_page(conn, Currency.from_row, 'Currencies', CURRENCY_COLUMNS, limit, after_id, before_id, sort)
+        page.total = self.count()
+        return page
+
+    def get_by_id(self, id: int) -> Currency | None:
+        with self.db.connection() as conn:
+            rows = fetch_all(conn, Currency.from_row, f"SELECT {CURRENCY_COLUMNS} FROM Currencies WHERE id = ?", (id,))
+        return rows[0] if rows else None
+
     def update_by_char_code(self, char_code: str, value: float):
-        self.cursor.execute("UPDATE Currencies SET value = ? WHERE char_code = ?", (value, char_code))
-        self.conn.commit()
-        
+        with self.db.connection() as conn:
+            updated = conn.execute("UPDATE Currencies SET value = ? WHERE char_code = ?", (value, char_code)).rowcount
+        if updated:
+            self.db.bump('Currencies')
+
+    def update_many(self, rates: Mapping[str, float]) -> dict[str, int]:
+        """
+        Обновляет курсы {char_code: value} одной транзакцией через executemany.
+        Возвращает число изменённых строк для каждого кода (0 -- код не найден).
+        """
+        rates = dict(rates)
+        counts = dict.fromkeys(rates, 0)
+        if not rates:
+            return counts
+
+        codes = list(rates)
+        with self.db.connection() as conn:
+            # Блокировка записи берётся сразу, чтобы подсчёт и UPDATE видели одни и те же строки
+            conn.execute("BEGIN IMMEDIATE")
+            for i in range(0, len(codes), MAX_QUERY_PARAMS):
+                chunk = codes[i:i + MAX_QUERY_PARAMS]
+                counts.update(conn.execute(f"SELECT char_code, COUNT(*) FROM Currencies WHERE char_code IN ({', '.join('?' * len(chunk))}) GROUP BY char_code", chunk))
+            conn.executemany("UPDATE Currencies SET value = ? WHERE char_code = ?",
+                             ((value, char_code) for char_code, value in rates.items() if counts[char_code]))
+        if any(counts.values()):
+            self.db.bump('Currencies')
+        return counts
+
+    def update_rates(self, currencies: Iterable[Currency]):
+        if self.count() == 0:
+            self.insert_many(currencies)
+            return
+        self.update_many({currency.char_code: currency.value for currency in currencies})
+
     def delete(self, id: int):
-        self.cursor.execute("DELETE FROM Currencies WHERE id = ?", (id,))
-        self.conn.commit()
-        
+        with self.prefixes.lock:
+            with self.db.connection() as conn:
+                deleted = conn.execute("DELETE FROM Currencies WHERE id = ? RETURNING char_code, name", (id,)).fetchall()
+            # Строку RETURNING нужно дочитать до фиксации транзакции
+            for row in deleted:
+                self.prefixes.discard_many(row)
+        if deleted:
+            self.db.bump('Currencies', 'UserCurrencies')
+
 class UserDatabase:
-    def __init__(self):
-        self.conn = sqlite3.connect(':memory:')
-        self.cursor = self.conn.cursor()
-        
-        self.cursor.execute("""CREATE TABLE IF NOT EXISTS Users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL
-        );""")
-        self.conn.commit()
-        
-        self.insertmany([
-            User(1, "Вадим Козаков"),
-            User(2, "Владимир Семенюк"),
-            User(3, "Максим Попов"),
-        ])
-        
+    def __init__(self, db: Database):
+        self.db = db
+        self._count: tuple[tuple[int, ...], int] | None = None
+        self.prefixes = PrefixIndex(self._prefix_texts)
+
+        if self.count() == 0:
+            self.insertmany([
+                User(1, "Вадим Козаков"),
+                User(2, "Владимир Семенюк"),
+                User(3, "Максим Попов"),
+            ])
+
+    def count(self) -> int:
+        """Число пользователей; COUNT(*) выполняется заново, только если таблица менялась."""
+        version = self.version()
+        cached = self._count
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with self.db.connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM Users").fetchone()[0]
+        self._count = (version, count)
+        return count
+
+    def version(self) -> tuple[int, ...]:
+        return self.db.version('Users')
+
     def insert(self, user: User):
-        self.cursor.execute("INSERT INTO Users(name) VALUES (?)", (user.name,))
-        self.conn.commit()
-        
+        with self.prefixes.lock:
+            with self.db.connection() as conn:
+                conn.execute("INSERT INTO Users(name) VALUES (?)", (user.name,))
+            self.prefixes.add_many((user.name,))
+        self.db.bump('Users')
+
     def insertmany(self, users: Iterable[User]):
-        self.cursor.executemany("INSERT INTO Users(name) VALUES (?)", map(lambda u: (u.name,), users))
-        self.conn.commit()
-        
+        names = [user.name for user in users]
+        with self.prefixes.lock:
+            with self.db.connection() as conn:
+                conn.executemany("INSERT INTO Users(name) VALUES (?)", ((name,) for name in names))
+            self.prefixes.add_many(names)
+        self.db.bump('Users')
+
+    def _prefix_texts(self) -> list[str]:
+        with self.db.connection() as conn:
+            return [name for name, in conn.execute("SELECT name FROM Users")]
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT) -> list[User]:
+        """Пользователи, в имени которых есть все слова query (последнее -- как префикс), в порядке id."""
+        if not self.db.full_text:
+            with self.db.connection() as conn:
+                return fetch_all(conn, User.from_row, "SELECT id, name FROM Users WHERE name LIKE ? ESCAPE '\\' ORDER BY id LIMIT ?",
+                                 (like_pattern(query.strip()), limit))
+
+        match = fts_query(query)
+        if match is None:
+            return []
+        with self.db.connection() as conn:
+            return fetch_all(conn, User.from_row, "SELECT id, name FROM Users WHERE id IN "
+                             "(SELECT rowid FROM UsersSearch WHERE UsersSearch MATCH ? LIMIT ?) ORDER BY id", (match, limit))
+
+    def suggest(self, prefix: str, limit: int = SUGGEST_LIMIT) -> list[str]:
+        """Имена, начинающиеся с prefix, -- из памяти, без обращения к базе."""
+        return self.prefixes.complete(prefix, limit)
+
     def get_all(self) -> list[User]:
-        self.cursor.execute("SELECT * FROM Users")
-        result = self.cursor.fetchall()
-        return list(map(lambda row: User(row[0], row[1]), result))
-    
+        with self.db.connection() as conn:
+            return fetch_all(conn, User.from_row, "SELECT id, name FROM Users")
+
+    def get_page(self, limit: int = PAGE_SIZE, after_id: int | None = None, before_id: int | None = None, sort: str = 'id') -> Page:
+        if sort not in USER_SORT_KEYS:
+            raise ValueError(f"Нельзя сортировать пользователей по '{sort}'")
+
+        with self.db.connection() as conn:
+            page = fetch_page(conn, User.from_row, 'Users', 'id, name', limit, after_id, before_id, sort)
+        page.total = self.count()
+        return page
+
     def get_by_id(self, id: int) -> User | None:
-        self.cursor.execute("SELECT * FROM Users WHERE id = ?", (id,))
-        row = self.cursor.fetchone()
-        if row is None:
-            return None
-        return User(row[0], row[1])
-        
+        with self.db.connection() as conn:
+            rows = fetch_all(conn, User.from_row, "SELECT id, name FROM Users WHERE id = ?", (id,))
+        return rows[0] if rows else None
+
+    def get_with_currencies(self, id: int) -> tuple[User | None, list[Currency]]:
+        with self.db.connection() as conn:
+            rows = conn.execute("""SELECT u.id, u.name, c.id, c.num_code, c.char_code, c.name, c.value, c.nominal
+                FROM Users u
+                LEFT JOIN UserCurrencies uc ON uc.user_id = u.id
+                LEFT JOIN Currencies c ON c.id = uc.currency_id
+                WHERE u.id = ?
+                ORDER BY uc.id""", (id,)).fetchall()
+        if not rows:
+            return None, []
+        user = User(rows[0][0], rows[0][1])
+        currencies = [Currency.from_row(None, row[2:]) for row in rows if row[2] is not None]
+        return user, currencies
+
     def delete(self, id: int):
-        self.cursor.execute("DELETE FROM Users WHERE id = ?", (id,))
-        self.conn.commit()
-        
+        with self.prefixes.lock:
+            with self.db.connection() as conn:
+                deleted = conn.execute("DELETE FROM Users WHERE id = ? RETURNING name", (id,)).fetchall()
+            # Строку RETURNING нужно дочитать до фиксации транзакции
+            for row in deleted:
+                self.prefixes.discard_many(row)
+        if deleted:
+            self.db.bump('Users', 'UserCurrencies')
+
 class UserCurrencyDatabase:
-    def __init__(self):
-        self.conn = sqlite3.connect(':memory:')
-        self.cursor = self.conn.cursor()
-        
-        self.cursor.execute("""CREATE TABLE IF NOT EXISTS UserCurrencies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            currency_id INTEGER NOT NULL,
-            FOREIGN KEY(user_id) REFERENCES Users(id),
-            FOREIGN KEY(currency_id) REFERENCES Currencies(id)
-        );""")
-        self.conn.commit()
-        
-        self.insert_many([
-            UserCurrency(1, 2),
-            UserCurrency(1, 5),
-            UserCurrency(1, 10),
-            
-            UserCurrency(2, 10),
-            UserCurrency(2, 23),
-            UserCurrency(2, 12),
-            
-            UserCurrency(3, 42),
-            UserCurrency(3, 34),
-            UserCurrency(3, 19),
-        ])
-        
+    """
+    Подписки пользователей на валюты. Начальные подписки ссылаются на
+    Currencies, поэтому пока валют нет (CurrencyDatabase с fetch_if_empty=False
+    на новой базе), seed() их не добавляет: его нужно вызвать ещё раз после
+    первой загрузки курсов.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+        self._seeded = False
+        self.seed()
+
+    def seed(self):
+        """Добавляет начальные подписки в пустую таблицу, если валюты уже загружены; пропускает валюты, которых нет."""
+        if self._seeded:
+            return
+
+        with self.db.connection() as conn:
+            if conn.execute("SELECT EXISTS (SELECT 1 FROM UserCurrencies)").fetchone()[0]:
+                self._seeded = True
+                return
+            if not conn.execute("SELECT EXISTS (SELECT 1 FROM Currencies)").fetchone()[0]:
+                return
+            conn.executemany("INSERT INTO UserCurrencies(user_id, currency_id) SELECT ?, ? "
+                             "WHERE EXISTS (SELECT 1 FROM Users WHERE id = ?) AND EXISTS (SELECT 1 FROM Currencies WHERE id = ?)",
+                             ((uc.user_id, uc.currency_id, uc.user_id, uc.currency_id) for uc in USER_CURRENCIES_SEED))
+        self._seeded = True
+        self.db.bump('UserCurrencies')
+
+    def count(self) -> int:
+        with self.db.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM UserCurrencies").fetchone()[0]
+
+    def version(self) -> tuple[int, ...]:
+        return self.db.version('UserCurrencies')
+
     def insert(self, user_currency: UserCurrency):
-        self.cursor.execute("INSERT INTO UserCurrencies(user_id, currency_id) VALUES (?, ?)", (user_currency.user_id, user_currency.currency_id))
-        self.conn.commit()
-        
+        with self.db.connection() as conn:
+            conn.execute("INSERT INTO UserCurrencies(user_id, currency_id) VALUES (?, ?)", (user_currency.user_id, user_currency.currency_id))
+        self.db.bump('UserCurrencies')
+
     def insert_many(self, user_currencies: Iterable[UserCurrency]):
-        self.cursor.executemany("INSERT INTO UserCurrencies(user_id, currency_id) VALUES (?, ?)",
-                                map(lambda uc: (uc.user_id, uc.currency_id), user_currencies))
-        self.conn.commit()
-        
+        with self.db.connection() as conn:
+            conn.executemany("INSERT INTO UserCurrencies(user_id, currency_id) VALUES (?, ?)",
+                             map(lambda uc: (uc.user_id, uc.currency_id), user_currencies))
+        self.db.bump('UserCurrencies')
+
     def get_all(self) -> list[UserCurrency]:
-        self.cursor.execute("SELECT * FROM UserCurrencies")
-        result = self.cursor.fetchall()
-        return list(map(lambda row: UserCurrency(id=row[0], user_id=row[1], currency_id=row[2]), result))
-        
+        with self.db.connection() as conn:
+            return fetch_all(conn, UserCurrency.from_row, "SELECT id, user_id, currency_id FROM UserCurrencies")
+
     def get_by_user_id(self, user_id: int) -> list[UserCurrency]:
-        self.cursor.execute("SELECT * FROM UserCurrencies WHERE user_id = ?", (user_id,))
-        result = self.cursor.fetchall()
-        return list(map(lambda row: UserCurrency(id=row[0], user_id=row[1], currency_id=row[2]), result))
-        
+        with self.db.connection() as conn:
+            return fetch_all(conn, UserCurrency.from_row, "SELECT id, user_id, currency_id FROM UserCurrencies WHERE user_id = ?", (user_id,))
+
     def delete(self, id: int):
-        self.cursor.execute("DELETE FROM UserCurrencies WHERE id = ?", (id,))
-        self.conn.commit()
\ No newline at end of file
+        with self.db.connection() as conn:
+            deleted = conn.execute("DELETE FROM UserCurrencies WHERE id = ?", (id,)).rowcount
+        if deleted:
+            self.db.bump('UserCurrencies')
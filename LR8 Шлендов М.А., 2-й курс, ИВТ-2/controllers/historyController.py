@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler
+
+from utils.response import *
+from utils.rates_history import RatesHistory, parse_day
+
+# Период по умолчанию, если from не указан
+DEFAULT_PERIOD = timedelta(days=30)
+
+class HistoryController:
+    def __init__(self, history: RatesHistory):
+        self.history = history
+        self.routes = {
+            '/currency/history': self._handle_history,
+        }
+    
+    def _handle_history(self, handler: BaseHTTPRequestHandler, params: dict):
+        """/currency/history?code=USD[&from=2024-01-01][&to=2024-03-01][&window=7]"""
+        code = params.get('code')
+        if code is None:
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+        
+        try:
+            end = parse_day(params['to']) if 'to' in params else date.today()
+            start = parse_day(params['from']) if 'from' in params else end - DEFAULT_PERIOD
+            window = int(params['window']) if 'window' in params else None
+        except ValueError:
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+        
+        if start > end or (window is not None and window < 1):
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+        
+        points = self.history.range(code, start, end)
+        if not points and self.history.series(code) is None:
+            respond_status(handler, HTTPStatus.NOT_FOUND)
+            return
+        
+        result = {
+            'code': code,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'points': [[day.isoformat(), value] for day, value in points],
+            'stats': self.history.stats(code, start, end),
+            'change': _isoformat_dates(self.history.change(code, end)),
+        }
+        if window is not None:
+            result['windows'] = [_isoformat_dates(w) for w in self.history.windows(code, start, end, window)]
+        respond_json(handler, result)
+
+def _isoformat_dates(d: dict | None) -> dict | None:
+    if d is None:
+        return None
+    return {key: value.isoformat() if isinstance(value, date) else value for key, value in d.items()}
@@ -0,0 +1,15 @@
+from http.server import BaseHTTPRequestHandler
+
+from utils.response import *
+from utils.metrics import CONTENT_TYPE, Metrics
+
+class MetricsController:
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+        self.routes = {
+            '/metrics': self._handle_metrics,
+        }
+
+    def _handle_metrics(self, handler: BaseHTTPRequestHandler, params: dict):
+        """Метрики сервера в текстовом формате Prometheus"""
+        respond_bytes(handler, self.metrics.exposition().encode('utf-8'), CONTENT_TYPE)
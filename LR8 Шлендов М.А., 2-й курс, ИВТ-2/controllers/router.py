@@ -0,0 +1,33 @@
+from http.server import BaseHTTPRequestHandler
+from typing import Callable
+
+Route = Callable[[BaseHTTPRequestHandler, dict], None]
+
+class Router:
+    """
+    Таблицы путь -> обработчик, собранные один раз из маршрутов контроллеров:
+    routes для GET и post_routes (необязательный атрибут контроллера) для POST.
+    """
+
+    def __init__(self, *controllers):
+        self.routes: dict[str, Route] = {}
+        self.post_routes: dict[str, Route] = {}
+        for controller in controllers:
+            self._register(self.routes, controller.routes)
+            self._register(self.post_routes, getattr(controller, 'post_routes', {}))
+    
+    @staticmethod
+    def _register(table: dict[str, Route], routes: dict[str, Route]):
+        for path, route in routes.items():
+            if path in table:
+                raise ValueError(f"Маршрут '{path}' зарегистрирован дважды")
+            table[path] = route
+    
+    def dispatch(self, handler: BaseHTTPRequestHandler, path: str, params: dict, method: str = 'GET') -> bool:
+        table = self.post_routes if method == 'POST' else self.routes
+        route = table.get(path)
+        if route is None:
+            return False
+        
+        route(handler, params)
+        return True
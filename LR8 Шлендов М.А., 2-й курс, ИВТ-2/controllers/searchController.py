@@ -0,0 +1,44 @@
+from http.server import BaseHTTPRequestHandler
+
+from utils.response import *
+from utils.search import SEARCH_LIMIT, SUGGEST_LIMIT
+
+from controllers.databaseController import CurrencyDatabase, UserDatabase
+
+MAX_SEARCH_LIMIT = 100
+
+class SearchController:
+    def __init__(self, currencies_db: CurrencyDatabase, users_db: UserDatabase):
+        self.currencies_db = currencies_db
+        self.users_db = users_db
+        self.routes = {
+            '/search': self._handle_search,
+        }
+
+    def _handle_search(self, handler: BaseHTTPRequestHandler, params: dict):
+        """
+        /search?q=текст[&limit=20] -- подсказки (коды и названия, начинающиеся
+        с q) и валюты и пользователи, в коде или названии которых есть все слова q.
+        """
+        query = params.get('q', '').strip()
+        try:
+            limit = int(params.get('limit', SEARCH_LIMIT))
+        except ValueError:
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+
+        if not query or not 1 <= limit <= MAX_SEARCH_LIMIT:
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
+
+        suggestions = self.currencies_db.suggest(query) + self.users_db.suggest(query)
+        suggestions.sort(key=str.casefold)
+        respond_json(handler, {
+            'query': query,
+            'suggestions': suggestions[:SUGGEST_LIMIT],
+            'currencies': [
+                {'id': c.id, 'char_code': c.char_code, 'name': c.name, 'value': c.value, 'nominal': c.nominal}
+                for c in self.currencies_db.search(query, limit)
+            ],
+            'users': [{'id': u.id, 'name': u.name} for u in self.users_db.search(query, limit)],
+        })
@@ -2,63 +2,74 @@ from http.server import BaseHTTPRequestHandler
 
 from jinja2.environment import Environment
 
+from utils.page_cache import PageCache
+
 from utils.response import *
 from common import APP, PAGES
 
-from controllers.databaseController import UserDatabase, UserCurrencyDatabase, CurrencyDatabase
+from controllers.databaseController import USER_SORT_KEYS, UserDatabase, UserCurrencyDatabase, CurrencyDatabase
+from utils.pagination import page_links, page_query, parse_page_params
 
 class UserController:
-    def __init__(self, handler: BaseHTTPRequestHandler, users_db: UserDatabase, user_currencies_db: UserCurrencyDatabase, currencies_db: CurrencyDatabase, env: Environment):
-        self.handler = handler
+    def __init__(self, users_db: UserDatabase, user_currencies_db: UserCurrencyDatabase, currencies_db: CurrencyDatabase, env: Environment, cache: PageCache | None = None):
+        self.cache = cache if cache is not None else PageCache()
         self.users_db = users_db
         self.user_currencies_db = user_currencies_db
         self.currencies_db = currencies_db
         self.template_users = env.get_template('users.html')
         self.template_user = env.get_template('user.html')
+        self.routes = {
+            '/users': self._handle_users,
+            '/user': self._handle_user,
+        }
     
-    def handle_get(self, path: str, params: dict) -> bool:
-        if path == '/users':
-            self._handle_users(params)
-            return True
-        if path == '/user':
-            self._handle_user(params)
-            return True
+    def _handle_users(self, handler: BaseHTTPRequestHandler, params: dict):
+        page_params = parse_page_params(params, USER_SORT_KEYS)
+        if page_params is None:
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
+            return
         
-        return False
-    
-    def _handle_users(self, params: dict):
-        users = self.users_db.get_all()
-        data = params | {
-            'app': APP,
-            'pages': PAGES,
-            'users': users,
-        }
-        respond_html(self.handler, self.template_users.render(data))
+        query = page_query(page_params, USER_SORT_KEYS)
+        key = PageCache.key('/users', query)
+        version = self.users_db.version()
+        page = self.cache.get(key, version)
+        if page is None:
+            result = self.users_db.get_page(**page_params)
+            data = {
+                'app': APP,
+                'pages': PAGES,
+                'users': result.items,
+                'total': result.total,
+            } | page_links('/users', query, result)
+            page = self.cache.put(key, version, self.template_users.render(data).encode('utf-8'))
+        respond_page(handler, page)
     
-    def _handle_user(self, params: dict):
+    def _handle_user(self, handler: BaseHTTPRequestHandler, params: dict):
         id = params.get('id')
         if id is None:
-            redirect(self.handler, '/users')
+            redirect(handler, '/users')
             return
         
         try:
             id = int(id)
         except ValueError:
-            self.handler.send_response(HTTPStatus.BAD_REQUEST)
+            respond_status(handler, HTTPStatus.BAD_REQUEST)
             return
         
-        user = self.users_db.get_by_id(int(id))
-        if user is None:
-            self.handler.send_response(HTTPStatus.NOT_FOUND)
-            return
-        
-        user_currencies = self.user_currencies_db.get_by_user_id(user.id)
-        currencies = map(lambda uc: self.currencies_db.get_by_id(uc.currency_id), user_currencies)
-        
-        data = params | {
-            'app': APP,
-            'pages': PAGES,
-            'user': user,
-            'currencies': currencies
-        }
-        respond_html(self.handler, self.template_user.render(data))
\ No newline at end of file
+        key = PageCache.key('/user', {'id': id})
+        version = self.users_db.version() + self.user_currencies_db.version() + self.currencies_db.version()
+        page = self.cache.get(key, version)
+        if page is None:
+            user, currencies = self.users_db.get_with_currencies(id)
+            if user is None:
+                respond_status(handler, HTTPStatus.NOT_FOUND)
+                return
+            
+            data = {
+                'app': APP,
+                'pages': PAGES,
+                'user': user,
+                'currencies': currencies
+            }
+            page = self.cache.put(key, version, self.template_user.render(data).encode('utf-8'))
+        respond_page(handler, page)
\ No newline at end of file
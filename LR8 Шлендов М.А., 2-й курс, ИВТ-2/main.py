@@ -1,46 +1,113 @@
+import argparse
+import os
+import socket
+import threading
 from http import HTTPStatus
 from http.server import HTTPServer, BaseHTTPRequestHandler
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from typing import TYPE_CHECKING
 from urllib.parse import parse_qsl
-from pathlib import Path
-from utils.currencies_api import get_currencies
+from utils.currencies_api import rates_provider
 
 from models.app import App
 from models.author import Author
 from models.user import User
 from models.user_currency import UserCurrency
 
-from controllers.userController import UserController
-from controllers.currenciesController import CurrenciesController
-from controllers.authorController import AuthorController
-from controllers.databaseController import CurrencyDatabase, UserDatabase, UserCurrencyDatabase
-
 from utils.response import *
+from utils.cli import make_parser
+from utils.server import KEEP_ALIVE_TIMEOUT, PooledHTTPServer, AsyncRequestHandler, adopt_socket, serve_async
+from utils.static import StaticFiles
+from utils.metrics import metrics
 
-MIME_TYPES: dict = {
-    '.css': 'text/css',
-    '.html': 'text/html',
-    '.js': 'text/javascript'
-}
-
-env = Environment(
-    loader=FileSystemLoader('./templates/'),
-    autoescape=select_autoescape()
-)
-
-currency_database = CurrencyDatabase()
-user_database = UserDatabase()
-user_currencies_database = UserCurrencyDatabase()
-
-class HttpHandler(BaseHTTPRequestHandler):
-    def __init__(self, request, client_address, server):
-        self.user_controller = UserController(self, user_database, user_currencies_database, currency_database, env)
-        self.author_controller = AuthorController(self, env)
-        self.currencies_controller = CurrenciesController(self, currency_database, env)
-        
-        super().__init__(request, client_address, server),
-    
-    def do_GET(self):
+# jinja2, контроллеры и база импортируются в build(): импорт main -- только обработчики запросов
+if TYPE_CHECKING:
+    from jinja2 import Environment, FileSystemBytecodeCache
+    from controllers.router import Router
+    from controllers.databaseController import Database, CurrencyDatabase, UserDatabase
+
+# Скомпилированные шаблоны переживают перезапуск: следующий процесс читает готовый байткод
+TEMPLATE_CACHE = '.jinja_cache'
+
+def make_bytecode_cache(path: str = TEMPLATE_CACHE) -> 'FileSystemBytecodeCache':
+    from jinja2 import FileSystemBytecodeCache
+
+    os.makedirs(path, exist_ok=True)
+    return FileSystemBytecodeCache(path)
+
+# Создаются в build(): импорт main не открывает базу и ничего в неё не пишет
+env: 'Environment | None' = None
+router: 'Router | None' = None
+currency_database: 'CurrencyDatabase | None' = None
+user_database: 'UserDatabase | None' = None
+
+def build(database: 'Database | None' = None, history_dir: str | None = None, cache_dir: str | None = None):
+    """
+    Шаблоны, база, репозитории и контроллеры. database -- своя база вместо
+    database.sqlite3 в текущем каталоге (в тестах -- ':memory:' или временный файл),
+    history_dir и cache_dir -- каталоги истории курсов и байткода шаблонов вместо
+    rates_history/ и .jinja_cache/ в текущем каталоге.
+    """
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+    from controllers.userController import UserController
+    from controllers.currenciesController import CurrenciesController
+    from controllers.authorController import AuthorController
+    from controllers.historyController import HistoryController
+    from controllers.conversionController import ConversionController
+    from controllers.metricsController import MetricsController
+    from controllers.searchController import SearchController
+    from controllers.router import Router
+    from controllers.databaseController import Database, CurrencyDatabase, UserDatabase, UserCurrencyDatabase
+
+    from utils.templates import MeteredTemplate
+    from utils.page_cache import PageCache
+    from utils.rates_history import RatesHistory
+    from utils.conversion import CurrencyConverter
+
+    global env, router, currency_database, user_database
+
+    env = Environment(
+        loader=FileSystemLoader('./templates/'),
+        autoescape=select_autoescape(),
+        bytecode_cache=make_bytecode_cache(cache_dir or TEMPLATE_CACHE)
+    )
+    env.template_class = MeteredTemplate
+
+    database = database or Database()
+    # Пустую таблицу заполнит фоновая загрузка rates_provider, а не конструктор до открытия сокета
+    currency_database = CurrencyDatabase(database, fetch_if_empty=False)
+    user_database = UserDatabase(database)
+    user_currencies_database = UserCurrencyDatabase(database)
+    rates_provider.subscribe(currency_database.update_rates)
+    # Подписки пользователей ссылаются на валюты: на новой базе они добавятся после первой загрузки курсов
+    rates_provider.subscribe(lambda currencies: user_currencies_database.seed())
+    rates_history = RatesHistory() if history_dir is None else RatesHistory(history_dir)
+    rates_provider.subscribe_snapshot(rates_history.append_snapshot)
+
+    page_cache = PageCache()
+    metrics.register_cache('page_cache', page_cache)
+    router = Router(
+        AuthorController(env, page_cache),
+        UserController(user_database, user_currencies_database, currency_database, env, page_cache),
+        CurrenciesController(currency_database, env, page_cache),
+        HistoryController(rates_history),
+        ConversionController(CurrencyConverter(currency_database)),
+        SearchController(currency_database, user_database),
+        MetricsController(metrics),
+    )
+
+static_files = StaticFiles('./static')
+
+def route_label(path: str, routes: dict) -> str:
+    """Метка маршрута для метрик: только известные пути, чтобы число рядов в /metrics не зависело от запросов."""
+    if path in routes:
+        return path
+    if path.startswith('/static'):
+        return '/static'
+    return 'other'
+
+class RequestHandlerMixin:
+    def parse_path(self) -> tuple[str, dict]:
         path = self.path.removesuffix('/')
         params = {}
 
@@ -48,41 +115,102 @@ class HttpHandler(BaseHTTPRequestHandler):
         if i != -1:
             path = self.path[:i]
             params = dict(parse_qsl(self.path[(i + 1):]))
-            
+        return path, params
+    
+    def send_response(self, code: int, message: str | None = None):
+        self.response_status = int(code)
+        super().send_response(code, message)
+
+    def do_GET(self):
+        self.metered('GET', router.routes, self.handle_get)
+
+    def do_POST(self):
+        self.metered('POST', router.post_routes, self.handle_post)
+
+    def metered(self, method: str, routes: dict, handle):
+        """Обрабатывает запрос, записывая его в metrics с меткой маршрута."""
+        path, params = self.parse_path()
+        # Если обработчик упадёт до ответа, запрос будет учтён как 500
+        self.response_status = int(HTTPStatus.INTERNAL_SERVER_ERROR)
+        stats = metrics.begin()
+        try:
+            handle(path, params)
+        finally:
+            if stats is not None:
+                metrics.end(stats, route_label(path, routes), method, self.response_status)
+
+    def handle_get(self, path: str, params: dict):
         if path.startswith('/static'):
             self.serve_static(path.removeprefix('/static'))
             return
             
-        if self.author_controller.handle_get(path, params):
-            return
-        
-        if self.user_controller.handle_get(path, params):
+        if router.dispatch(self, path, params):
             return
         
-        if self.currencies_controller.handle_get(path, params):
+        respond_status(self, 404)
+
+    def handle_post(self, path: str, params: dict):
+        if router.dispatch(self, path, params, 'POST'):
             return
         
-        self.send_response(404)
-
-    def do_POST(self):
-        self.send_response(HTTPStatus.BAD_REQUEST)
+        respond_status(self, HTTPStatus.BAD_REQUEST)
 
     def serve_static(self, path: str):
-        p = Path(path)
-        mime_type = MIME_TYPES.get(p.suffix, "application/octet-stream")
-        try:
-            with open('./static' + path, 'rb') as f:
-                respond_bytes(self, f.read(), mime_type)
-        except IsADirectoryError:
-            self.send_response(403)
-        except FileNotFoundError:
-            self.send_response(404)
+        static_files.serve(self, path)
+
+class HttpHandler(RequestHandlerMixin, BaseHTTPRequestHandler):
+    pass
+
+class KeepAliveHttpHandler(HttpHandler):
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Заголовки и тело уходят отдельными write, без TCP_NODELAY ответ ждёт delayed ACK
+    disable_nagle_algorithm = True
+
+class AsyncHttpHandler(RequestHandlerMixin, AsyncRequestHandler):
+    pass
+
+def warm_templates():
+    """Компилирует все шаблоны заранее; с FileSystemBytecodeCache -- только при первом запуске."""
+    for name in env.list_templates():
+        env.get_template(name)
+
+def warm_search():
+    """Читает коды и названия в индексы подсказок /search до первого запроса."""
+    currency_database.prefixes.load()
+    user_database.prefixes.load()
+
+def run_server(address: str, port: int, mode: str = 'threaded', workers: int = 16, sock: socket.socket | None = None):
+    """sock -- уже открытый слушающий сокет (см. start.py); без него сервер открывает свой."""
+    if mode == 'asyncio':
+        import asyncio
+        asyncio.run(serve_async(address, port, AsyncHttpHandler, max_workers=workers, sock=sock))
+        return
+    
+    bind = sock is None
+    if mode == 'threaded':
+        server = PooledHTTPServer((address, port), KeepAliveHttpHandler, max_workers=workers, bind_and_activate=bind)
+    else:
+        server = HTTPServer((address, port), HttpHandler, bind_and_activate=bind)
+    if not bind:
+        adopt_socket(server, sock)
+    
+    with server:
+        server.serve_forever()
 
-def run_server(address: str, port: int):
-    HTTPServer((address, port), HttpHandler).serve_forever()
+def start(args: argparse.Namespace, sock: socket.socket | None = None):
+    metrics.enabled = args.metrics
+    build()
+    # Курсы, шаблоны и индексы подсказок догружаются в фоне, запросы принимаются сразу
+    rates_provider.start()
+    threading.Thread(target=warm_templates, name='templates-warm', daemon=True).start()
+    if metrics.enabled:
+        threading.Thread(target=metrics.load, name='metrics-warm', daemon=True).start()
+    threading.Thread(target=warm_search, name='search-warm', daemon=True).start()
+    run_server(args.host, args.port, args.mode, args.workers, sock)
 
 def main():
-    run_server('', 1234)
+    start(make_parser().parse_args())
 
 if __name__ == "__main__":
     main()
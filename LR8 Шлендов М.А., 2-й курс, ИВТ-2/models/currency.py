@@ -1,4 +1,7 @@
 class Currency:
+    # Без __dict__: поля лежат в слотах, экземпляр меньше. Снаружи менять можно только char_code и value, с проверкой
+    __slots__ = ('_id', '_num_code', '_char_code', '_name', '_value', '_nominal')
+
     def __init__(self, num_code: str, char_code: str, name: str, value: float, nominal: int, id: int | None = None):
         self._num_code = num_code
         self._char_code = char_code
@@ -7,6 +10,13 @@ class Currency:
         self._nominal = nominal
         self._id = id
 
+    @classmethod
+    def from_row(cls, cursor, row: tuple) -> 'Currency':
+        """row_factory для строк (id, num_code, char_code, name, value, nominal)."""
+        currency = object.__new__(cls)
+        currency._id, currency._num_code, currency._char_code, currency._name, currency._value, currency._nominal = row
+        return currency
+
     @property
     def id(self):
         return self._id
@@ -15,6 +25,14 @@ class Currency:
     def num_code(self):
         return self._num_code
 
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def nominal(self):
+        return self._nominal
+
     @property
     def char_code(self):
         return self._char_code
@@ -25,10 +43,6 @@ class Currency:
             raise ValueError("Код валюты должен состоять из 3 символов")
         self._char_code = val.upper()
 
-    @property
-    def name(self):
-        return self._name
-
     @property
     def value(self):
         return self._value
@@ -38,10 +52,6 @@ class Currency:
         if val < 0:
             raise ValueError("Курс валюты не может быть отрицательным")
         self._value = val
-
-    @property
-    def nominal(self):
-        return self._nominal
     
     def __repr__(self) -> str:
         return f'{{"char_code": {self.char_code}, "name": {self.name}, "num_code": {self.num_code}, "value": {self.value}, "nominal": {self.nominal}}}'
\ No newline at end of file
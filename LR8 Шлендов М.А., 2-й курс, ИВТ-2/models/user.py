@@ -1,8 +1,17 @@
 class User:
+    __slots__ = ('_id', '_name')
+
     def __init__(self, id: int, name: str):
         self._id = id
         self._name = name
 
+    @classmethod
+    def from_row(cls, cursor, row: tuple) -> 'User':
+        """row_factory для строк (id, name)."""
+        user = object.__new__(cls)
+        user._id, user._name = row
+        return user
+
     @property
     def id(self) -> int:
         return self._id
@@ -10,11 +19,3 @@ class User:
     @property
     def name(self) -> str:
         return self._name
-
-    @id.setter
-    def set_id(self, id: int):
-        self._id = id
-
-    @name.setter
-    def set_name(self, name: str):
-        self._name = name
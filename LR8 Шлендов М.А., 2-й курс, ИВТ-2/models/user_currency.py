@@ -1,9 +1,18 @@
 class UserCurrency:
+    __slots__ = ('_id', '_user_id', '_currency_id')
+
     def __init__(self, user_id: int, currency_id: str, id: int = 0):
         self._id = id
         self._user_id = user_id
         self._currency_id = currency_id
 
+    @classmethod
+    def from_row(cls, cursor, row: tuple) -> 'UserCurrency':
+        """row_factory для строк (id, user_id, currency_id)."""
+        user_currency = object.__new__(cls)
+        user_currency._id, user_currency._user_id, user_currency._currency_id = row
+        return user_currency
+
     @property
     def id(self) -> int:
         return self._id
@@ -15,15 +24,3 @@ class UserCurrency:
     @property
     def currency_id(self) -> str:
         return self._currency_id
-
-    @id.setter
-    def set_id(self, id: int):
-        self._id = id
-
-    @user_id.setter
-    def set_user_id(self, user_id: int):
-        self._user_id = user_id
-
-    @currency_id.setter
-    def set_currency_id(self, currency_id: str):
-        self._currency_id = currency_id
@@ -0,0 +1,20 @@
+"""
+Быстрый запуск сервера: слушающий сокет открывается до импорта приложения
+(jinja2, контроллеров, базы), поэтому клиенты, подключившиеся во время
+запуска, ждут в очереди сокета, а не получают отказ в соединении.
+
+Запуск: python start.py [--host] [--port] [--mode] [--workers] -- те же аргументы, что у main.py.
+"""
+import socket
+
+from utils.cli import make_parser
+
+def main():
+    args = make_parser().parse_args()
+    sock = socket.create_server((args.host, args.port), backlog=128)
+
+    import main as app
+    app.start(args, sock)
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,129 @@
+import asyncio
+import gzip
+import http.client
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
 import unittest
-from unittest.mock import MagicMock, PropertyMock, call
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest.mock import MagicMock, PropertyMock, call, patch
 
 from io import BytesIO
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from pathlib import Path
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
 
 from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-from utils.currencies_api import get_currencies
+from utils.currencies_api import get_currencies, RatesProvider, ValuteIndex
 from models.currency import Currency
 from models.user import User
 from models.user_currency import UserCurrency
-from main import HttpHandler
+import main
+from main import HttpHandler, KeepAliveHttpHandler, AsyncHttpHandler
+from utils.server import PooledHTTPServer, AsyncRequestHandler, adopt_socket, serve_async, _serve_connection
+from utils.response import respond_html_stream
+from utils.templates import MeteredTemplate
+from utils.static import StaticFiles
+from utils.page_cache import PageCache
+from utils.pagination import Page
+from utils.rates_history import RatesHistory, parse_day
+from utils.feed_stream import iter_valutes, iter_currencies, stream_currencies
+from utils.rates_client import RatesClient, FetchError, archive_urls, merge_snapshots
+from controllers.historyController import HistoryController
+from controllers.conversionController import ConversionController
+from utils.conversion import CrossRates, CurrencyConverter, UnknownCurrency
+from utils.metrics import Metrics, metrics
+from utils.search import PrefixIndex, fts_query
 
 from common import APP, PAGES
 
 from controllers.currenciesController import CurrenciesController
 from controllers.authorController import AuthorController
 from controllers.userController import UserController
+from controllers.router import Router
+from controllers.searchController import SearchController
+from controllers.databaseController import SCHEMA, Database, CurrencyDatabase, UserDatabase, UserCurrencyDatabase
+
+def setUpModule():
+    # Приложение работает со своей базой, историей курсов и кэшем шаблонов во временном каталоге, а не в текущем
+    global app_dir
+    app_dir = tempfile.TemporaryDirectory()
+    provider = RatesProvider()
+    with patch('main.rates_provider', provider):
+        main.build(Database(os.path.join(app_dir.name, 'app.sqlite3')),
+                   history_dir=os.path.join(app_dir.name, 'rates_history'),
+                   cache_dir=os.path.join(app_dir.name, 'jinja_cache'))
+    # Как после первой загрузки курсов: валюты, затем подписки пользователей
+    currencies = [Currency(str(i), f'C{i:02d}', f'Валюта {i}', float(i), 1) for i in range(1, 50)]
+    for listener in provider._listeners:
+        listener(currencies)
+
+def tearDownModule():
+    app_dir.cleanup()
+
+class StubArchiveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        server: StubArchiveServer = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.connections.add(self.client_address)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            failures = server.failures.get(self.path, 0)
+            if failures:
+                server.failures[self.path] = failures - 1
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+        
+        feed = server.feeds.get(self.path)
+        status = 503 if failures else 200 if feed is not None else 404
+        body = json.dumps(feed).encode() if status == 200 else b''
+        self.send_response(status)
+        self.send_header('Content-Length', len(body))
+        self.end_headers()
+        self.wfile.write(body)
+        
+    def log_message(self, format, *args):
+        pass
+
+class StubArchiveServer(ThreadingHTTPServer):
+    """Локальная замена архива ЦБ: feeds -- путь -> ответ, failures -- сколько раз ответить 503 перед успехом."""
+    
+    daemon_threads = True
+    
+    def __init__(self, feeds: dict[str, dict]):
+        super().__init__(('127.0.0.1', 0), StubArchiveHandler)
+        self.feeds = feeds
+        self.failures: dict[str, int] = {}
+        self.delay = 0.0
+        self.requests = []
+        self.connections = set()
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        
+    @property
+    def template(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/archive/{{day:%Y/%m/%d}}/daily_json.js'
+    
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+    
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
 
 class MockRequest:
     def __init__(self, request: str):
@@ -28,6 +135,63 @@ class MockRequest:
     def sendall(self, *args, **kwargs):
         pass
 
+class StubCBRHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server: StubCBRServer = self.server
+        server.requests.append(self.headers)
+        time.sleep(server.delay)
+        
+        if server.status != 200:
+            self.send_response(server.status)
+            self.send_header('Content-Length', 0)
+            self.end_headers()
+            return
+        
+        if self.headers.get('If-None-Match') == server.etag:
+            self.send_response(304)
+            self.send_header('ETag', server.etag)
+            self.end_headers()
+            return
+        
+        body = json.dumps(server.feed).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', len(body))
+        self.send_header('ETag', server.etag)
+        self.send_header('Last-Modified', 'Fri, 16 Oct 2026 08:30:00 GMT')
+        self.end_headers()
+        self.wfile.write(body)
+        
+    def log_message(self, format, *args):
+        pass
+
+class StubCBRServer(ThreadingHTTPServer):
+    """Локальная замена API ЦБ: отдаёт feed с ETag и отвечает 304 на совпадающий If-None-Match."""
+    
+    def __init__(self, feed: dict):
+        super().__init__(('127.0.0.1', 0), StubCBRHandler)
+        self.feed = feed
+        self.etag = '"v1"'
+        self.status = 200
+        self.delay = 0.0
+        self.requests = []
+        
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/daily_json.js'
+    
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+    
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+def make_feed(*valutes: tuple[str, str, float]) -> dict:
+    return {'Valute': {code: {'ID': id, 'NumCode': id[-3:], 'CharCode': code, 'Name': code, 'Value': value, 'Nominal': 1}
+                       for id, code, value in valutes}}
+
 class TestHttpHandler(HttpHandler):
     wbufsize = 1
     
@@ -58,13 +222,17 @@ class Test(unittest.TestCase):
         
         self.mock_currencies_db = MagicMock()
         self.mock_currencies_db.get_all.return_value = [Currency('1', 'USD', 'Доллар', 75, 1), Currency('2', 'EUR', 'Евро', 90, 1)]
+        self.mock_currencies_db.get_page.return_value = Page(self.mock_currencies_db.get_all.return_value, has_next=False, has_prev=False, total=2)
         self.mock_currencies_db.get_by_id.return_value = Currency('1', 'USD', 'Доллар', 75, 1)
         self.mock_currencies_db.update_by_char_code.return_value = None
+        self.mock_currencies_db.update_many.return_value = {'USD': 1}
         self.mock_currencies_db.delete.return_value = None
         
         self.mock_users_db = MagicMock()
         self.mock_users_db.get_all.return_value = [User(1, "Вася"), User(2, "Петя"), User(3, 'Дима')]
+        self.mock_users_db.get_page.return_value = Page(self.mock_users_db.get_all.return_value, has_next=False, has_prev=False, total=3)
         self.mock_users_db.get_by_id.return_value = User(1, "Вася")
+        self.mock_users_db.get_with_currencies.return_value = (User(1, "Вася"), [Currency('1', 'USD', 'Доллар', 75, 1)])
         self.mock_users_db.delete.return_value = None
         
         self.mock_user_currencies_db = MagicMock()
@@ -92,9 +260,9 @@ class Test(unittest.TestCase):
         handler.end_headers.return_value = None
         type(handler).wfile = PropertyMock(return_value=buffer)
         
-        author_controller = AuthorController(handler=handler, env=self.env)
+        router = Router(AuthorController(env=self.env))
         
-        response = author_controller.handle_get('', params={})
+        response = router.dispatch(handler, '', params={})
         self.assertTrue(response)
         
         template = self.template_index.render({'app': APP, 'pages': PAGES}).encode()
@@ -103,7 +271,7 @@ class Test(unittest.TestCase):
         self.assertEqual(buffer.getvalue(), template)
         buffer.seek(0)
         
-        response = author_controller.handle_get('/author', params={})
+        response = router.dispatch(handler, '/author', params={})
         self.assertTrue(response)
         
         template = self.template_author.render({'app': APP, 'pages': PAGES}).encode()
@@ -120,15 +288,16 @@ class Test(unittest.TestCase):
         handler.end_headers.return_value = None
         type(handler).wfile = PropertyMock(return_value=buffer)
         
-        currencies_controller = CurrenciesController(handler=handler, db=self.mock_currencies_db, env=self.env)
+        router = Router(CurrenciesController(db=self.mock_currencies_db, env=self.env))
         
-        response = currencies_controller.handle_get('/currencies', params={})
+        response = router.dispatch(handler, '/currencies', params={})
         self.assertIsNotNone(response)
         
         template = self.template_currencies.render({
             'app': APP,
             'pages': PAGES,
-            'currencies': [Currency('1', 'USD', 'Доллар', 75, 1), Currency('2', 'EUR', 'Евро', 90, 1)]
+            'currencies': [Currency('1', 'USD', 'Доллар', 75, 1), Currency('2', 'EUR', 'Евро', 90, 1)],
+            'total': 2
         }).encode()
         
         handler.send_response.assert_called_with(200)
@@ -137,19 +306,30 @@ class Test(unittest.TestCase):
         buffer.seek(0)
         
         
-        response = currencies_controller.handle_get('/currency/delete', params={'id': 1})
+        response = router.dispatch(handler, '/currency/delete', params={'id': 1})
         self.assertIsNotNone(response)
         handler.send_response.assert_called_with(200)
         
         
-        response = currencies_controller.handle_get('/currency/update', params={'USD': 250})
+        buffer.seek(0)
+        buffer.truncate()
+        response = router.dispatch(handler, '/currency/update', params={'USD': 250, 'EUR': 'abc'})
         self.assertIsNotNone(response)        
         handler.send_response.assert_called_with(200)
+        self.assertEqual(json.loads(buffer.getvalue()), {'USD': 1})
         
         
-        self.mock_currencies_db.get_all.assert_called_once()
+        buffer.seek(0)
+        buffer.truncate()
+        response = router.dispatch(handler, '/currency/show', params={})
+        self.assertIsNotNone(response)
+        handler.send_response.assert_called_with(200)
+        self.assertEqual(json.loads(buffer.getvalue())[1], {'id': None, 'num_code': '2', 'char_code': 'EUR', 'name': 'Евро', 'value': 90, 'nominal': 1})
+        
+        
+        self.mock_currencies_db.get_page.assert_called_once_with(limit=100, after_id=None, before_id=None, sort='id')
         self.mock_currencies_db.delete.assert_called_once_with(id=1)
-        self.mock_currencies_db.update_by_char_code.assert_called_once_with('USD', 250.0)
+        self.mock_currencies_db.update_many.assert_called_once_with({'USD': 250.0})
         
     def test_users_controller(self):
         buffer = BytesIO()
@@ -160,24 +340,26 @@ class Test(unittest.TestCase):
         handler.end_headers.return_value = None
         type(handler).wfile = PropertyMock(return_value=buffer)
         
-        user_controller = UserController(handler=handler, users_db=self.mock_users_db, currencies_db=self.mock_currencies_db, user_currencies_db=self.mock_user_currencies_db, env=self.env)
+        router = Router(UserController(users_db=self.mock_users_db, currencies_db=self.mock_currencies_db, user_currencies_db=self.mock_user_currencies_db, env=self.env))
         
-        response = user_controller.handle_get('/users', params={})
+        response = router.dispatch(handler, '/users', params={})
         self.assertIsNotNone(response)
         
         template = self.template_users.render({
             'app': APP,
             'pages': PAGES,
-            'users': [User(1, "Вася"), User(2, "Петя"), User(3, 'Дима')]
+            'users': [User(1, "Вася"), User(2, "Петя"), User(3, 'Дима')],
+            'total': 3
         }).encode()
         
         handler.send_response.assert_called_with(200)
         handler.send_header.assert_has_calls(calls=[call('Content-Type', 'text/html'), call('Content-Length', len(template))])
         self.assertEqual(buffer.getvalue(), template)
         buffer.seek(0)
+        buffer.truncate()
         
         
-        response = user_controller.handle_get('/user', params={'id': 1})
+        response = router.dispatch(handler, '/user', params={'id': 1})
         self.assertIsNotNone(response)
         
         template = self.template_user.render({
@@ -193,8 +375,1510 @@ class Test(unittest.TestCase):
         buffer.seek(0)
         
         
-        self.mock_users_db.get_all.assert_called_once()
-        self.mock_users_db.get_by_id.assert_called_once_with(1)
+        self.mock_users_db.get_page.assert_called_once_with(limit=100, after_id=None, before_id=None, sort='id')
+        self.mock_users_db.get_with_currencies.assert_called_once_with(1)
+        self.mock_currencies_db.get_by_id.assert_not_called()
+
+    def test_models_are_read_only(self):
+        currency = Currency.from_row(None, (1, '840', 'USD', 'Доллар США', 90.0, 1))
+        self.assertEqual((currency.id, currency.num_code, currency.char_code, currency.name, currency.value, currency.nominal),
+                         (1, '840', 'USD', 'Доллар США', 90.0, 1))
+        user, user_currency = User.from_row(None, (1, 'Вася')), UserCurrency.from_row(None, (7, 1, 1))
+        self.assertEqual((user.id, user.name, user_currency.id, user_currency.user_id, user_currency.currency_id), (1, 'Вася', 7, 1, 1))
+        
+        for model, field in ((currency, 'id'), (currency, 'name'), (currency, 'nominal'), (user, 'name'), (user_currency, 'currency_id')):
+            with self.subTest(model=type(model).__name__, field=field), self.assertRaises(AttributeError):
+                setattr(model, field, 2)
+        
+        # Изменяемые поля Currency -- через проверяющие сеттеры
+        currency.char_code = 'eur'
+        self.assertEqual(currency.char_code, 'EUR')
+        with self.assertRaises(ValueError):
+            currency.value = -1
+
+class TestRouter(unittest.TestCase):
+    def setUp(self):
+        self.env = Environment(loader=FileSystemLoader('./templates/'), autoescape=select_autoescape())
+        
+    def test_dispatch(self):
+        users_db = MagicMock()
+        users_db.get_page.return_value = Page([User(1, "Вася")], has_next=False, has_prev=False, total=1)
+        router = Router(AuthorController(self.env), UserController(users_db, MagicMock(), MagicMock(), self.env))
+        
+        self.assertEqual(set(router.routes), {'', '/author', '/users', '/user'})
+        
+        handler = MagicMock()
+        type(handler).wfile = PropertyMock(return_value=BytesIO())
+        self.assertTrue(router.dispatch(handler, '/users', {}))
+        handler.send_response.assert_called_with(200)
+        users_db.get_page.assert_called_once()
+        
+        self.assertFalse(router.dispatch(handler, '/missing', {}))
+        
+    def test_duplicate_route(self):
+        with self.assertRaises(ValueError):
+            Router(AuthorController(self.env), AuthorController(self.env))
+            
+    def test_controllers_are_shared_between_requests(self):
+        with patch('controllers.authorController.AuthorController') as author_controller:
+            for _ in range(2):
+                handler = TestHttpHandler(MockRequest("GET /author HTTP/1.0\r\n\r\n"), client_address=("127.0.0.1", 1234), server=self)
+                self.assertTrue(handler.wfile.getvalue().startswith(b"HTTP/1.0 200 OK"))
+            
+        author_controller.assert_not_called()
+
+class TestServer(unittest.TestCase):
+    def assert_keep_alive(self, port: int):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        
+        conn.request('GET', '/author')
+        response = conn.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertIn(APP.author.name, response.read().decode())
+        sock = conn.sock
+        
+        with patch('controllers.currenciesController.STREAM_THRESHOLD', 0):
+            conn.request('GET', '/currencies')
+            response = conn.getresponse()
+            self.assertEqual(response.getheader('Transfer-Encoding'), 'chunked')
+            self.assertTrue(response.read().decode().rstrip().endswith('</html>'))
+        
+        conn.request('GET', '/not-found')
+        response = conn.getresponse()
+        self.assertEqual(response.status, 404)
+        self.assertEqual(response.read(), b'')
+        self.assertIs(conn.sock, sock)
+        conn.close()
+    
+    def test_threaded_server_keep_alive(self):
+        server = PooledHTTPServer(('127.0.0.1', 0), KeepAliveHttpHandler, max_workers=2)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            self.assert_keep_alive(server.server_address[1])
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+            
+    def test_prebound_socket(self):
+        sock = socket.create_server(('127.0.0.1', 0))
+        # Клиент подключается до того, как сервер создан: соединение ждёт в очереди сокета
+        conn = http.client.HTTPConnection('127.0.0.1', sock.getsockname()[1], timeout=10)
+        conn.connect()
+        
+        server = PooledHTTPServer(('127.0.0.1', 0), KeepAliveHttpHandler, max_workers=2, bind_and_activate=False)
+        adopt_socket(server, sock)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            conn.request('GET', '/author')
+            self.assertEqual(conn.getresponse().status, 200)
+            conn.close()
+            self.assert_keep_alive(server.server_address[1])
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+    
+    def test_pool_serves_more_connections_than_workers(self):
+        server = PooledHTTPServer(('127.0.0.1', 0), KeepAliveHttpHandler, max_workers=2, idle_timeout=0.5)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        port = server.server_address[1]
+        connections = []
+        try:
+            # Соединения без запросов и простаивающие после ответа поток пула не держат
+            silent = [socket.create_connection(('127.0.0.1', port)) for _ in range(3)]
+            for _ in range(5):
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                start = time.perf_counter()
+                conn.request('GET', '/author')
+                response = conn.getresponse()
+                response.read()
+                self.assertEqual(response.status, 200)
+                self.assertLess(time.perf_counter() - start, 1)
+                connections.append(conn)
+            
+            # Два запроса одним пакетом: второй уже в буфере rfile, а не в сокете
+            with socket.create_connection(('127.0.0.1', port), timeout=10) as sock:
+                sock.sendall(b'GET /author HTTP/1.1\r\nHost: x\r\n\r\nGET /not-found HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+                data = b''
+                while chunk := sock.recv(65536):
+                    data += chunk
+            self.assertEqual(data.count(b'HTTP/1.1 '), 2)
+            self.assertIn(b'HTTP/1.1 404 ', data)
+            
+            # Простаивающие дольше idle_timeout закрываются
+            for sock in silent:
+                sock.settimeout(5)
+                self.assertEqual(sock.recv(1), b'')
+                sock.close()
+        finally:
+            for conn in connections:
+                conn.close()
+            server.shutdown()
+            server.server_close()
+            thread.join()
+    
+    def test_async_server_keep_alive(self):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(serve_async('127.0.0.1', port, AsyncHttpHandler, max_workers=2))
+        
+        async def run():
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            await asyncio.gather(*(asyncio.all_tasks() - {asyncio.current_task()}), return_exceptions=True)
+        
+        thread = threading.Thread(target=loop.run_until_complete, args=(run(),))
+        thread.start()
+        try:
+            for _ in range(100):
+                try:
+                    socket.create_connection(('127.0.0.1', port)).close()
+                    break
+                except OSError:
+                    threading.Event().wait(0.05)
+            self.assert_keep_alive(port)
+        finally:
+            loop.call_soon_threadsafe(task.cancel)
+            thread.join()
+            loop.close()
+            
+    def test_async_request_handler(self):
+        handler = AsyncRequestHandler('GET', '/author', 'HTTP/1.0', {})
+        self.assertTrue(handler.close_connection)
+        
+        Router(AuthorController(env=Environment(loader=FileSystemLoader('./templates/')))).dispatch(handler, '/author', {})
+        head, _, body = handler.response().partition(b'\r\n\r\n')
+        
+        self.assertTrue(head.startswith(b'HTTP/1.1 200 OK\r\n'))
+        self.assertIn(f'Content-Length: {len(body)}'.encode(), head)
+        
+        handler = AsyncRequestHandler('GET', '/', 'HTTP/1.1', {})
+        self.assertFalse(handler.close_connection)
+        handler.send_response(404)
+        self.assertIn(b'Content-Length: 0', handler.response())
+    
+    def exchange(self, data: bytes) -> tuple[bytes, list[dict]]:
+        """Отправляет data соединению asyncio-сервера и закрывает запись; ответ сервера и ошибки цикла событий."""
+        errors = []
+        
+        async def run():
+            asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                server = await asyncio.start_server(lambda r, w: _serve_connection(r, w, AsyncHttpHandler, executor), '127.0.0.1', 0)
+                async with server:
+                    reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+                    writer.write(data)
+                    writer.write_eof()
+                    response = await reader.read()
+                    writer.close()
+                    # Даём задаче соединения завершиться до закрытия цикла
+                    await asyncio.sleep(0.05)
+                    return response
+        
+        return asyncio.run(run()), errors
+    
+    def test_async_request_body_bounds(self):
+        response, _ = self.exchange(b'POST /convert/batch HTTP/1.1\r\nContent-Length: -1\r\n\r\nGET /author HTTP/1.1\r\n\r\n')
+        self.assertEqual(response, b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+        
+        with patch('utils.server.MAX_BODY', 4):
+            response, _ = self.exchange(b'POST /convert/batch HTTP/1.1\r\nContent-Length: 5\r\n\r\n{}{}{')
+        self.assertTrue(response.startswith(b'HTTP/1.1 413 '))
+        self.assertIn(b'Connection: close', response)
+        
+        response, errors = self.exchange(b'POST /convert/batch HTTP/1.1\r\nContent-Length: 100\r\n\r\n{"from"')
+        self.assertEqual(response, b'')
+        self.assertEqual(errors, [])
+
+def decode_chunked(body: bytes) -> list[bytes]:
+    chunks = []
+    while True:
+        size, _, body = body.partition(b'\r\n')
+        size = int(size, 16)
+        if size == 0:
+            return chunks
+        chunks.append(body[:size])
+        body = body[size + 2:]
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.template = Environment(loader=FileSystemLoader('./templates/'), autoescape=select_autoescape()).get_template('currencies.html')
+        self.data = {'app': APP, 'pages': PAGES, 'total': 100, 'currencies': [Currency(str(i), f'C{i:02d}', f'Валюта {i}', float(i), 1) for i in range(100)]}
+        self.expected = self.template.render(self.data).encode()
+        
+    def make_handler(self, version: str) -> AsyncRequestHandler:
+        handler = AsyncRequestHandler('GET', '/currencies', version, {})
+        handler.protocol_version = version
+        return handler
+    
+    def test_chunked(self):
+        handler = self.make_handler('HTTP/1.1')
+        respond_html_stream(handler, self.template, self.data, chunk_size=1024)
+        head, _, body = handler.response().partition(b'\r\n\r\n')
+        
+        self.assertIn(b'Transfer-Encoding: chunked', head)
+        self.assertNotIn(b'Content-Length', head)
+        self.assertFalse(handler.close_connection)
+        
+        chunks = decode_chunked(body)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) >= 1024 for chunk in chunks[:-1]))
+        self.assertEqual(b''.join(chunks), self.expected)
+        
+    def test_http_1_0_closes_connection(self):
+        handler = self.make_handler('HTTP/1.0')
+        respond_html_stream(handler, self.template, self.data, chunk_size=1024)
+        head, _, body = handler.response().partition(b'\r\n\r\n')
+        
+        self.assertIn(b'Connection: close', head)
+        self.assertTrue(handler.close_connection)
+        self.assertEqual(body, self.expected)
+        
+    def test_controller_streams_large_lists(self):
+        db = MagicMock()
+        db.get_page.return_value = Page(self.data['currencies'], has_next=False, has_prev=False, total=100)
+        handler = self.make_handler('HTTP/1.1')
+        
+        with patch('controllers.currenciesController.STREAM_THRESHOLD', 10):
+            Router(CurrenciesController(db, Environment(loader=FileSystemLoader('./templates/'), autoescape=select_autoescape()))).dispatch(handler, '/currencies', {})
+        
+        head, _, body = handler.response().partition(b'\r\n\r\n')
+        self.assertIn(b'Transfer-Encoding: chunked', head)
+        self.assertEqual(b''.join(decode_chunked(body)), self.expected)
+
+class TestStatic(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'static')
+        os.makedirs(os.path.join(self.root, 'css'))
+        self.css = os.path.join(self.root, 'css', 'index.css')
+        self.css_body = b'body { margin: 0; }\n' * 200
+        with open(self.css, 'wb') as f:
+            f.write(self.css_body)
+        with open(os.path.join(self.tmp.name, 'secret.txt'), 'wb') as f:
+            f.write(b'secret')
+        self.big_body = os.urandom(64 * 1024)
+        with open(os.path.join(self.root, 'big.bin'), 'wb') as f:
+            f.write(self.big_body)
+        self.static = StaticFiles(self.root, sendfile_threshold=16 * 1024)
+        
+    def tearDown(self):
+        self.tmp.cleanup()
+        
+    def get(self, path: str, headers: dict = {}) -> tuple[int, dict, bytes]:
+        handler = AsyncRequestHandler('GET', '/static' + path, 'HTTP/1.1', headers)
+        self.static.serve(handler, path)
+        response = http.client.HTTPResponse(MockSocket(handler.response()))
+        response.begin()
+        return response.status, dict(response.getheaders()), response.read()
+    
+    def test_serve_from_cache(self):
+        status, headers, body = self.get('/css/index.css')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Type'], 'text/css')
+        self.assertEqual(body, self.css_body)
+        
+        with patch('pathlib.Path.read_bytes') as read_bytes:
+            self.assertEqual(self.get('/css/index.css')[2], self.css_body)
+        read_bytes.assert_not_called()
+        
+    def test_not_modified(self):
+        _, headers, _ = self.get('/css/index.css')
+        status, _, body = self.get('/css/index.css', {'If-None-Match': headers['ETag']})
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b'')
+        self.assertEqual(self.get('/css/index.css', {'If-None-Match': '"other"'})[0], 200)
+        
+    def test_modified_file_is_reloaded(self):
+        _, headers, _ = self.get('/css/index.css')
+        with open(self.css, 'wb') as f:
+            f.write(b'p { color: red; }')
+        st = os.stat(self.css)
+        os.utime(self.css, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        
+        status, new_headers, body = self.get('/css/index.css', {'If-None-Match': headers['ETag']})
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b'p { color: red; }')
+        self.assertNotEqual(new_headers['ETag'], headers['ETag'])
+        
+    def test_gzip(self):
+        _, headers, body = self.get('/css/index.css', {'Accept-Encoding': 'br, gzip'})
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertLess(len(body), len(self.css_body))
+        self.assertEqual(gzip.decompress(body), self.css_body)
+        
+        gzip_etag = headers['ETag']
+        
+        _, headers, body = self.get('/css/index.css', {'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(body, self.css_body)
+        
+        # У представлений с разными байтами разные строгие ETag, и 304 -- только для своего
+        self.assertNotEqual(headers['ETag'], gzip_etag)
+        self.assertEqual(self.get('/css/index.css', {'Accept-Encoding': 'gzip', 'If-None-Match': gzip_etag})[0], 304)
+        self.assertEqual(self.get('/css/index.css', {'If-None-Match': gzip_etag})[0], 200)
+        self.assertEqual(self.get('/css/index.css', {'Accept-Encoding': 'gzip', 'If-None-Match': headers['ETag']})[0], 200)
+        
+    def test_cache_counts_gzip_data(self):
+        entry = self.static.get(Path(self.css), os.stat(self.css))
+        self.assertIsNotNone(entry.gzip_data)
+        self.assertEqual(self.static._cached_bytes, len(self.css_body) + len(entry.gzip_data))
+        
+        # Места хватает только на сам файл, но не на его gzip-вариант
+        static = StaticFiles(self.root, max_bytes=len(self.css_body), sendfile_threshold=16 * 1024)
+        static.get(Path(self.css), os.stat(self.css))
+        self.assertEqual((len(static._cache), static._cached_bytes), (0, 0))
+        
+    def test_path_traversal(self):
+        for path in ('/../secret.txt', '/css/../../secret.txt', '/%2e%2e/secret.txt', '/css/%2E%2E/%2E%2E/secret.txt'):
+            with self.subTest(path=path):
+                status, _, body = self.get(path)
+                self.assertEqual(status, 403)
+                self.assertEqual(body, b'')
+        self.assertEqual(self.get('/css')[0], 403)
+        self.assertEqual(self.get('/css/missing.css')[0], 404)
+        self.assertEqual(self.get('/css/index.css/x')[0], 404)
+        
+    def test_large_file_uses_sendfile(self):
+        server = PooledHTTPServer(('127.0.0.1', 0), KeepAliveHttpHandler, max_workers=2)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            with patch('main.static_files', self.static), \
+                 patch('socket.socket.sendfile', autospec=True, side_effect=socket.socket.sendfile) as sendfile:
+                conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+                conn.request('GET', '/static/big.bin')
+                response = conn.getresponse()
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.read(), self.big_body)
+                sendfile.assert_called_once()
+                
+                conn.request('GET', '/static/css/index.css')
+                self.assertEqual(conn.getresponse().read(), self.css_body)
+                conn.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+        
+        self.assertEqual(self.get('/big.bin')[2], self.big_body)
+
+class MockSocket:
+    def __init__(self, data: bytes):
+        self.data = data
+        
+    def makefile(self, *args, **kwargs):
+        return BytesIO(self.data)
+
+class TestRatesProvider(unittest.TestCase):
+    def setUp(self):
+        self.server = StubCBRServer(make_feed(('R01235', 'USD', 80.0), ('R01239', 'EUR', 90.0))).__enter__()
+        self.provider = RatesProvider(self.server.url, ttl=60)
+        
+    def tearDown(self):
+        self.provider.stop()
+        self.server.__exit__()
+        
+    def wait_for(self, condition, timeout: float = 5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail('Условие не выполнилось')
+            time.sleep(0.01)
+    
+    def test_cached_within_ttl(self):
+        for _ in range(5):
+            currencies = get_currencies(['R01235'], provider=self.provider)
+        
+        self.assertEqual([c.char_code for c in currencies], ['USD'])
+        self.assertEqual(len(self.server.requests), 1)
+        
+    def test_lookup_by_any_code(self):
+        index = self.provider.index()
+        
+        self.assertIsInstance(index, ValuteIndex)
+        self.assertIs(index.find('R01235'), index.find('USD'))
+        self.assertIs(index.find('235'), index.find('USD'))
+        self.assertIsNone(index.find('KEK'))
+        
+        currencies = get_currencies(['EUR', 'R01235', 'KEK'], provider=self.provider)
+        self.assertEqual([c.char_code for c in currencies], ['EUR', 'USD'])
+        
+    def test_stale_served_while_refreshing(self):
+        self.provider.valutes()
+        self.provider.ttl = 0
+        self.server.delay = 0.5
+        
+        start = time.monotonic()
+        currencies = get_currencies(provider=self.provider)
+        self.assertLess(time.monotonic() - start, 0.25)
+        self.assertEqual(len(currencies), 2)
+        
+        self.wait_for(lambda: len(self.server.requests) == 2)
+        self.assertEqual(self.server.requests[1]['If-None-Match'], '"v1"')
+        self.assertEqual(self.server.requests[1]['If-Modified-Since'], 'Fri, 16 Oct 2026 08:30:00 GMT')
+        
+    def test_not_modified_keeps_data(self):
+        listener = MagicMock()
+        self.provider.subscribe(listener)
+        
+        self.assertTrue(self.provider.refresh())
+        self.assertFalse(self.provider.refresh())
+        self.assertEqual(listener.call_count, 1)
+        self.assertEqual(len(self.provider.valutes()), 2)
+        
+    def test_changed_feed_notifies_listeners(self):
+        listener = MagicMock()
+        self.provider.subscribe(listener)
+        self.provider.refresh()
+        
+        self.server.feed = make_feed(('R01235', 'USD', 81.5))
+        self.server.etag = '"v2"'
+        self.assertTrue(self.provider.refresh())
+        
+        currencies = listener.call_args.args[0]
+        self.assertEqual([(c.char_code, c.value) for c in currencies], [('USD', 81.5)])
+        self.assertEqual(get_currencies(['R01235'], provider=self.provider)[0].value, 81.5)
+        
+    def test_failed_refresh_keeps_stale_data(self):
+        self.provider.valutes()
+        self.provider.ttl = 0
+        self.server.status = 500
+        
+        with self.assertLogs('utils.currencies_api', level='ERROR'):
+            self.provider.valutes()
+            self.wait_for(lambda: len(self.server.requests) == 2 and not self.provider._refreshing)
+        
+        self.assertEqual(len(self.provider.valutes()), 2)
+        
+    def test_first_load_error(self):
+        self.server.status = 503
+        with self.assertRaises(Exception):
+            self.provider.valutes()
+        
+    def test_start_does_not_block(self):
+        self.server.delay = 0.5
+        start = time.monotonic()
+        self.provider.start()
+        self.assertLess(time.monotonic() - start, 0.25)
+        
+        # Читатель, пришедший до конца первой загрузки, дожидается её без второго запроса
+        self.assertEqual(len(self.provider.valutes()), 2)
+        self.assertEqual(len(self.server.requests), 1)
+        
+    def test_background_refresher(self):
+        self.provider.ttl = 0.05
+        self.provider.start()
+        self.wait_for(lambda: len(self.server.requests) >= 3)
+        self.provider.stop()
+
+class TestRatesClient(unittest.TestCase):
+    def setUp(self):
+        self.start = date(2024, 1, 1)
+        # Архив без выходных, как у ЦБ
+        self.days = [self.start + timedelta(days=i) for i in range(21) if (self.start + timedelta(days=i)).weekday() < 5]
+        feeds = {f'/archive/{day:%Y/%m/%d}/daily_json.js': make_snapshot(day, {'USD': (day.day - 1, day.day)}) for day in self.days}
+        self.server = StubArchiveServer(feeds).__enter__()
+        self.client = RatesClient(backoff=0.01)
+        
+    def tearDown(self):
+        self.client.close()
+        self.server.__exit__()
+        
+    def url(self, day: date) -> str:
+        return archive_urls(day, day, [self.server.template])[0][0]
+    
+    def test_retries_with_backoff(self):
+        path = f'/archive/{self.start:%Y/%m/%d}/daily_json.js'
+        self.server.failures[path] = 2
+        with patch('utils.rates_client.sleep') as sleep:
+            data = self.client.fetch_json(self.url(self.start))
+        self.assertEqual(data['Date'][:10], '2024-01-01')
+        self.assertEqual(self.server.requests, [path] * 3)
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [0.01, 0.02])
+        
+        self.server.failures[path] = 10
+        with patch('utils.rates_client.sleep'):
+            with self.assertRaises(FetchError):
+                self.client.fetch_json(self.url(self.start))
+        self.assertEqual(len(self.server.requests), 3 + self.client.retries + 1)
+        
+    def test_missing_day_and_mirrors(self):
+        self.assertIsNone(self.client.fetch_json(self.url(date(2024, 1, 6))))
+        
+        dead = 'http://127.0.0.1:1/daily_json.js'
+        data = self.client.fetch_json([dead, self.url(self.start)])
+        self.assertEqual(data['Valute']['USD']['Value'], 1)
+        with self.assertRaises(FetchError):
+            RatesClient(retries=0).fetch_json([dead])
+            
+    def test_timeout(self):
+        self.server.delay = 0.3
+        client = RatesClient(timeout=0.05, retries=0)
+        with self.assertRaises(FetchError):
+            client.fetch_json(self.url(self.start))
+        client.close()
+        
+    def test_fetch_archive_concurrently_over_pooled_connections(self):
+        self.server.delay = 0.05
+        self.server.failures[f'/archive/{self.days[3]:%Y/%m/%d}/daily_json.js'] = 1
+        client = RatesClient(backoff=0.01, max_workers=4)
+        snapshots, errors = client.fetch_archive(self.start, self.start + timedelta(days=20), [self.server.template])
+        client.close()
+        
+        self.assertEqual(errors, {})
+        self.assertEqual([parse_day(s['Date']) for s in snapshots], self.days)
+        self.assertGreater(self.server.max_active, 1)
+        self.assertLessEqual(self.server.max_active, 4)
+        self.assertLessEqual(len(self.server.connections), 4)
+        
+    def test_fetch_many_reports_errors_and_merges(self):
+        self.server.failures[f'/archive/{self.days[0]:%Y/%m/%d}/daily_json.js'] = 100
+        with patch('utils.rates_client.sleep'):
+            snapshots, errors = self.client.fetch_many([self.url(self.days[1]), self.url(self.days[0]), self.url(self.days[1])])
+        self.assertEqual(list(errors), [self.url(self.days[0])])
+        self.assertEqual(len(snapshots), 2)
+        self.assertEqual(merge_snapshots(snapshots), snapshots[:1])
+
+class TestFeedStream(unittest.TestCase):
+    def setUp(self):
+        self.feed = make_feed(('R01235', 'USD', 80.0), ('R01239', 'EUR', 90.0), ('R01375', 'CNY', 11.5))
+        self.feed = {'Date': '2024-01-01T11:30:00+03:00', 'Timestamp': 1704097800} | self.feed | {'Note': ['Юань', {'a': None}], 'Count': 3}
+        self.feed['Valute']['CNY']['Name'] = 'Китайский юань «Жэньминьби»'
+        self.body = json.dumps(self.feed, ensure_ascii=False, indent=2).encode()
+        
+    def chunks(self, size: int) -> list[bytes]:
+        return [self.body[i:i + size] for i in range(0, len(self.body), size)]
+    
+    def test_any_chunk_boundaries(self):
+        for size in (1, 2, 3, 5, 64, len(self.body)):
+            with self.subTest(size=size):
+                self.assertEqual(list(iter_valutes(self.chunks(size))), list(self.feed['Valute'].values()))
+                
+    def test_filter_by_code(self):
+        currencies = list(iter_currencies(self.chunks(7), ['CNY', 'R01235', '239', 'KEK']))
+        self.assertEqual([c.char_code for c in currencies], ['USD', 'EUR', 'CNY'])
+        self.assertEqual(currencies[2].name, 'Китайский юань «Жэньминьби»')
+        self.assertEqual([c.char_code for c in iter_currencies([self.body], ['EUR'])], ['EUR'])
+        self.assertEqual(list(iter_currencies([b'{"Valute": {}}'])), [])
+        
+    def test_malformed(self):
+        for body in (b'', b'[]', b'{"Valute": []}', b'{"Valute": {"USD": {"ID": 1}', b'{"Valute": {}} {}', self.body[:-20]):
+            with self.subTest(body=body[-20:]):
+                with self.assertRaises(ValueError):
+                    list(iter_valutes(self.chunks(16) if body is self.body else [body]))
+                    
+    def test_memory_bounded_by_entry(self):
+        entry = json.dumps(self.feed['Valute']['CNY'], ensure_ascii=False).encode()
+        n = 20000
+        
+        def chunks():
+            yield b'{"Date": "2024-01-01", "Valute": {'
+            for i in range(n):
+                yield b'%s"C%d": %s' % (b',' if i else b'', i, entry)
+            yield b'}}'
+        
+        tracemalloc.start()
+        count = sum(1 for _ in iter_currencies(chunks()))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.assertEqual(count, n)
+        self.assertLess(peak, len(entry) * n / 10)
+        
+    def test_stream_from_server(self):
+        with StubCBRServer(self.feed) as server:
+            client = RatesClient(retries=0)
+            currencies = list(stream_currencies(server.url, ['USD', 'CNY'], client))
+            self.assertEqual([(c.char_code, c.value) for c in currencies], [('USD', 80.0), ('CNY', 11.5)])
+            self.assertEqual(len(list(stream_currencies(server.url))), 3)
+            
+            server.status = 500
+            with self.assertRaises(Exception):
+                list(stream_currencies(server.url, client=client))
+            client.close()
+
+def make_snapshot(day: date, rates: dict[str, tuple[float, float]], nominal: int = 1) -> dict:
+    """Ответ daily_json.js за day: rates -- код -> (Previous, Value)."""
+    previous_day = day - timedelta(days=1)
+    return {'Date': f'{day.isoformat()}T11:30:00+03:00', 'PreviousDate': f'{previous_day.isoformat()}T11:30:00+03:00',
+            'Valute': {code: {'ID': code, 'NumCode': '000', 'CharCode': code, 'Name': code, 'Nominal': nominal, 'Value': value, 'Previous': previous}
+                       for code, (previous, value) in rates.items()}}
+
+class TestRatesHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.history = RatesHistory(self.tmpdir.name)
+        self.start = date(2024, 1, 1)
+        # 100 дней подряд: курс USD = номер дня, EUR = 2 * номер дня
+        self.history.import_snapshots(make_snapshot(self.start + timedelta(days=i), {'USD': (i - 1, i), 'EUR': (2 * i - 2, 2 * i)})
+                                      for i in range(1, 100))
+        
+    def tearDown(self):
+        self.history.close()
+        self.tmpdir.cleanup()
+        
+    def day(self, i: int) -> date:
+        return self.start + timedelta(days=i)
+        
+    def test_range_and_stats(self):
+        points = self.history.range('USD', self.day(10), self.day(14))
+        self.assertEqual(points, [(self.day(i), float(i)) for i in range(10, 15)])
+        self.assertEqual(self.history.range('USD', date(2000, 1, 1), self.day(1)), [(self.day(0), 0.0), (self.day(1), 1.0)])
+        self.assertEqual(self.history.range('USD', date(2030, 1, 1), date(2030, 2, 1)), [])
+        self.assertEqual(self.history.range('XXX', self.day(0), self.day(10)), [])
+        self.assertEqual(self.history.range('../USD', self.day(0), self.day(10)), [])
+        
+        self.assertEqual(self.history.stats('EUR', self.day(10), self.day(19)), {'count': 10, 'min': 20.0, 'max': 38.0, 'avg': 29.0})
+        self.assertIsNone(self.history.stats('EUR', date(2030, 1, 1), date(2030, 2, 1)))
+        
+    def test_windows(self):
+        windows = self.history.windows('USD', self.day(0), self.day(20), 7)
+        self.assertEqual([(w['start'], w['end'], w['count'], w['min'], w['max'], w['avg']) for w in windows], [
+            (self.day(0), self.day(6), 7, 0.0, 6.0, 3.0),
+            (self.day(7), self.day(13), 7, 7.0, 13.0, 10.0),
+            (self.day(14), self.day(20), 7, 14.0, 20.0, 17.0),
+        ])
+        with self.assertRaises(ValueError):
+            self.history.windows('USD', self.day(0), self.day(20), 0)
+        
+    def test_change(self):
+        change = self.history.change('USD', self.day(50))
+        self.assertEqual((change['date'], change['value'], change['previous_date'], change['previous_value'], change['change']),
+                         (self.day(50), 50.0, self.day(49), 49.0, 1.0))
+        self.assertAlmostEqual(change['change_percent'], 100 / 49)
+        self.assertEqual(self.history.change('USD')['date'], self.day(99))
+        self.assertIsNone(self.history.change('USD', self.day(0)))
+        
+    def test_append_is_idempotent_and_persistent(self):
+        self.assertEqual(self.history.append_snapshot(make_snapshot(self.day(99), {'USD': (98, 99)})), 0)
+        self.assertEqual(self.history.append_snapshot(make_snapshot(self.day(101), {'USD': (100, 101)})), 2)
+        self.assertEqual(self.history.append_snapshot(make_snapshot(self.day(101), {'CNY': (10, 20)}, nominal=10)), 2)
+        self.assertEqual(self.history.range('CNY', self.day(100), self.day(101)), [(self.day(100), 1.0), (self.day(101), 2.0)])
+        self.history.close()
+        
+        history = RatesHistory(self.tmpdir.name)
+        self.assertEqual(history.codes(), ['CNY', 'EUR', 'USD'])
+        self.assertEqual(len(history.range('USD', date(2000, 1, 1), date(2030, 1, 1))), 102)
+        self.assertEqual(history.range('USD', self.day(101), self.day(101)), [(self.day(101), 101.0)])
+        history.close()
+        
+    def test_import_merges_out_of_order(self):
+        old = [make_snapshot(date(2023, 1, 1) + timedelta(days=i), {'USD': (-1.0, -1.0)}) for i in range(0, 10)]
+        # 10 дней по Value и ещё один -- 31 декабря -- по Previous
+        self.assertEqual(self.history.import_snapshots(reversed(old)), 11)
+        points = self.history.range('USD', date(2022, 1, 1), date(2030, 1, 1))
+        self.assertEqual(len(points), 111)
+        self.assertEqual([day for day, _ in points], sorted(day for day, _ in points))
+        
+    def test_import_files(self):
+        paths = []
+        for i in range(3):
+            path = os.path.join(self.tmpdir.name, f'archive_{i}.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(make_snapshot(date(2020, 1, 10 + i), {'GBP': (1.0, 100.0 + i)}), f)
+            paths.append(path)
+        self.history.import_files(paths)
+        self.assertEqual([value for _, value in self.history.range('GBP', date(2020, 1, 10), date(2020, 1, 12))], [100.0, 101.0, 102.0])
+        
+    def test_torn_write_is_ignored(self):
+        series = self.history.series('USD')
+        with open(series.values.path, 'ab') as f:
+            f.write(b'\x00' * 12)
+        self.history.close()
+        
+        history = RatesHistory(self.tmpdir.name)
+        self.assertEqual(len(history.range('USD', date(2000, 1, 1), date(2030, 1, 1))), 100)
+        history.append_snapshot(make_snapshot(self.day(100), {'USD': (99, 100)}))
+        self.assertEqual(history.range('USD', self.day(99), self.day(100)), [(self.day(99), 99.0), (self.day(100), 100.0)])
+        history.close()
+        
+    def test_provider_appends_snapshots(self):
+        feed = make_snapshot(self.day(120), {'USD': (119, 120)})
+        with StubCBRServer(feed) as server:
+            provider = RatesProvider(server.url)
+            provider.subscribe_snapshot(self.history.append_snapshot)
+            provider.refresh()
+        self.assertEqual(self.history.range('USD', self.day(119), self.day(120)), [(self.day(119), 119.0), (self.day(120), 120.0)])
+        
+    def test_controller(self):
+        controller = HistoryController(self.history)
+        
+        def get(params: dict) -> tuple[int, dict | None]:
+            handler = AsyncRequestHandler('GET', '/currency/history', 'HTTP/1.1', {})
+            Router(controller).dispatch(handler, '/currency/history', params)
+            response = http.client.HTTPResponse(MockSocket(handler.response()))
+            response.begin()
+            body = response.read()
+            return response.status, json.loads(body) if body else None
+        
+        status, body = get({'code': 'USD', 'from': '2024-01-11', 'to': '2024-01-20', 'window': '5'})
+        self.assertEqual(status, 200)
+        self.assertEqual(body['points'][0], ['2024-01-11', 10.0])
+        self.assertEqual(len(body['points']), 10)
+        self.assertEqual(body['stats']['avg'], 14.5)
+        self.assertEqual(body['change']['date'], '2024-01-20')
+        self.assertEqual([w['avg'] for w in body['windows']], [12.0, 17.0])
+        
+        self.assertEqual(get({'code': 'XXX'})[0], 404)
+        for params in ({}, {'code': 'USD', 'from': 'вчера'}, {'code': 'USD', 'from': '2024-02-01', 'to': '2024-01-01'}, {'code': 'USD', 'window': '0'}):
+            with self.subTest(params=params):
+                self.assertEqual(get(params)[0], 400)
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'test.sqlite3')
+        self.currencies = [Currency(str(i), f'C{i:02d}', f'Валюта {i}', float(i), 1) for i in range(1, 50)]
+        
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        
+    def open(self) -> tuple[Database, CurrencyDatabase, UserDatabase, UserCurrencyDatabase]:
+        db = Database(self.path)
+        with patch('controllers.databaseController.get_currencies', return_value=self.currencies) as mock_get:
+            repos = CurrencyDatabase(db), UserDatabase(db), UserCurrencyDatabase(db)
+        self.fetch_calls = mock_get.call_count
+        return (db, *repos)
+    
+    def test_single_file_with_wal_and_indexes(self):
+        db, _, _, _ = self.open()
+        
+        with db.connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            
+        self.assertTrue({'Currencies', 'Users', 'UserCurrencies'} <= tables)
+        self.assertIn('idx_currencies_char_code', indexes)
+        self.assertIn('idx_user_currencies_user_id', indexes)
+        db.close()
+        
+    def test_cold_start_without_fetch(self):
+        db, currencies_db, _, _ = self.open()
+        self.assertEqual(self.fetch_calls, 1)
+        currencies_db.update_by_char_code('C01', 250.0)
+        db.close()
+        
+        db, currencies_db, users_db, user_currencies_db = self.open()
+        self.assertEqual(self.fetch_calls, 0)
+        self.assertEqual(len(currencies_db.get_all()), len(self.currencies))
+        self.assertEqual(currencies_db.get_by_id(1).value, 250.0)
+        self.assertEqual(len(users_db.get_all()), 3)
+        self.assertEqual(len(user_currencies_db.get_by_user_id(1)), 3)
+        db.close()
+        
+    def test_fill_empty_table_in_background(self):
+        db = Database(self.path)
+        with patch('controllers.databaseController.get_currencies') as mock_get:
+            currencies_db = CurrencyDatabase(db, fetch_if_empty=False)
+        mock_get.assert_not_called()
+        self.assertEqual(currencies_db.count(), 0)
+        
+        currencies_db.update_rates(self.currencies)
+        self.assertEqual(currencies_db.count(), len(self.currencies))
+        currencies_db.update_rates([Currency('1', 'C01', 'Валюта 1', 100.0, 1)])
+        self.assertEqual(currencies_db.count(), len(self.currencies))
+        self.assertEqual(currencies_db.get_by_id(1).value, 100.0)
+        db.close()
+
+    def test_seed_user_currencies_after_currencies(self):
+        db = Database(self.path)
+        currencies_db = CurrencyDatabase(db, fetch_if_empty=False)
+        UserDatabase(db)
+        # На пустой таблице валют подписки не добавляются: внешние ключи не на что ссылать
+        user_currencies_db = UserCurrencyDatabase(db)
+        self.assertEqual(user_currencies_db.get_by_user_id(1), [])
+
+        currencies_db.update_rates(self.currencies)
+        user_currencies_db.seed()
+        self.assertEqual(len(user_currencies_db.get_by_user_id(1)), 3)
+        # Удалённые пользователем подписки повторный вызов не возвращает
+        user_currencies_db.delete(user_currencies_db.get_by_user_id(1)[0].id)
+        user_currencies_db.seed()
+        self.assertEqual(len(user_currencies_db.get_by_user_id(1)), 2)
+        db.close()
+
+    def test_foreign_keys_cascade(self):
+        db, currencies_db, _, user_currencies_db = self.open()
+        
+        currencies_db.delete(2)
+        self.assertEqual([uc.currency_id for uc in user_currencies_db.get_by_user_id(1)], [5, 10])
+        db.close()
+        
+    def test_get_with_currencies(self):
+        db, _, users_db, user_currencies_db = self.open()
+        
+        user, currencies = users_db.get_with_currencies(1)
+        self.assertEqual((user.id, user.name), (1, "Вадим Козаков"))
+        self.assertEqual([c.id for c in currencies], [2, 5, 10])
+        self.assertEqual([c.char_code for c in currencies], ['C02', 'C05', 'C10'])
+        
+        users_db.insert(User(0, "Без подписок"))
+        user, currencies = users_db.get_with_currencies(4)
+        self.assertEqual(user.name, "Без подписок")
+        self.assertEqual(currencies, [])
+        
+        self.assertEqual(users_db.get_with_currencies(100), (None, []))
+        db.close()
+        
+    def test_concurrent_readers(self):
+        db, currencies_db, _, _ = self.open()
+        errors = []
+        
+        def read():
+            try:
+                for _ in range(50):
+                    self.assertEqual(len(currencies_db.get_all()), len(self.currencies))
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+            
+        self.assertEqual(errors, [])
+        self.assertLessEqual(db._created, db.pool_size)
+        db.close()
+
+class TestBatchUpdate(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(':memory:')
+        currencies = [Currency(str(i), f'C{i:02d}', f'Валюта {i}', float(i), 1) for i in range(1, 50)]
+        with patch('controllers.databaseController.get_currencies', return_value=currencies):
+            self.currencies_db = CurrencyDatabase(self.db)
+        self.currencies_db.insert(Currency('999', 'C01', 'Дубликат', 1.0, 1))
+        self.controller = CurrenciesController(self.currencies_db, Environment(loader=FileSystemLoader('./templates/')))
+        
+    def tearDown(self):
+        self.db.close()
+        
+    def values(self) -> dict[str, list[float]]:
+        result = {}
+        for currency in self.currencies_db.get_all():
+            result.setdefault(currency.char_code, []).append(currency.value)
+        return result
+        
+    def post(self, body: bytes, length: int | None = None) -> tuple[int, bytes]:
+        headers = {'Content-Length': str(len(body) if length is None else length)}
+        self.handler = AsyncHttpHandler('POST', '/currency/update', 'HTTP/1.1', headers, body)
+        with patch('main.router', Router(self.controller)):
+            self.handler.do_POST()
+        response = http.client.HTTPResponse(MockSocket(self.handler.response()))
+        response.begin()
+        return response.status, response.read()
+    
+    def test_update_many(self):
+        version = self.currencies_db.version()
+        with patch.object(self.db, 'connection', wraps=self.db.connection) as connection:
+            counts = self.currencies_db.update_many({'C01': 10.5, 'C02': 20.5, 'XXX': 1.0})
+        
+        self.assertEqual(counts, {'C01': 2, 'C02': 1, 'XXX': 0})
+        self.assertEqual(connection.call_count, 1)
+        values = self.values()
+        self.assertEqual(values['C01'], [10.5, 10.5])
+        self.assertEqual(values['C02'], [20.5])
+        self.assertEqual(values['C03'], [3.0])
+        self.assertNotEqual(self.currencies_db.version(), version)
+        
+        version = self.currencies_db.version()
+        self.assertEqual(self.currencies_db.update_many({'XXX': 1.0}), {'XXX': 0})
+        self.assertEqual(self.currencies_db.update_many({}), {})
+        self.assertEqual(self.currencies_db.version(), version)
+        
+    def test_update_many_large_batch(self):
+        rates = {f'C{i:02d}': i * 2.0 for i in range(1, 50)} | {f'N{i}': 1.0 for i in range(3000)}
+        counts = self.currencies_db.update_many(rates)
+        self.assertEqual(sum(counts.values()), 50)
+        self.assertEqual(self.values()['C49'], [98.0])
+        
+    def test_update_rates_uses_single_transaction(self):
+        with patch.object(self.currencies_db, 'update_by_char_code') as update_by_char_code:
+            self.currencies_db.update_rates([Currency('1', 'C05', 'Валюта 5', 55.0, 1)])
+        update_by_char_code.assert_not_called()
+        self.assertEqual(self.values()['C05'], [55.0])
+        
+    def test_post_json(self):
+        status, body = self.post(json.dumps({'C01': 11, 'C03': 33.3, 'XXX': 1}).encode())
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {'C01': 2, 'C03': 1, 'XXX': 0})
+        self.assertEqual(self.values()['C03'], [33.3])
+        
+        for body in (b'{', b'[1, 2]', b'{"C01": "10"}', b'{"C01": true}', b'\x80{}', b'{"C01": NaN}', b'{"C01": Infinity}',
+                     b'{"C01": -Infinity}', b'{"C01": -5}', b'{"C01": 0}', b'{"C01": 1' + b'0' * 400 + b'}'):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body)[0], 400)
+        self.assertEqual(self.values()['C01'], [11.0, 11.0])
+        
+        with patch('controllers.currenciesController.MAX_UPDATE_BODY', 4):
+            self.assertEqual(self.post(b'{"C01": 1}')[0], 413)
+        
+        self.assertEqual(self.post(b'{"C01": 1}', length=-1)[0], 400)
+        self.assertTrue(self.handler.close_connection)
+        self.assertEqual(self.values()['C01'], [11.0, 11.0])
+        
+    def test_get_update_skips_invalid_rates(self):
+        handler = AsyncHttpHandler('GET', '/currency/update', 'HTTP/1.1', {})
+        Router(self.controller).dispatch(handler, '/currency/update', {'C01': 'nan', 'C02': 'inf', 'C03': '-5', 'C04': '0', 'C05': '12.5'})
+        self.assertEqual(json.loads(handler.response().partition(b'\r\n\r\n')[2]), {'C05': 1})
+        values = self.values()
+        self.assertEqual([values[code] for code in ('C01', 'C02', 'C03', 'C04', 'C05')], [[1.0, 1.0], [2.0], [3.0], [4.0], [12.5]])
+
+class TestConversion(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(':memory:')
+        currencies = [Currency('840', 'USD', 'Доллар США', 90.0, 1), Currency('978', 'EUR', 'Евро', 99.0, 1),
+                      Currency('392', 'JPY', 'Иена', 60.0, 100)]
+        with patch('controllers.databaseController.get_currencies', return_value=currencies):
+            self.currencies_db = CurrencyDatabase(self.db)
+        self.converter = CurrencyConverter(self.currencies_db)
+        self.controller = ConversionController(self.converter)
+        
+    def tearDown(self):
+        self.db.close()
+        
+    def request(self, method: str, path: str, body: bytes = b'', length: int | None = None) -> tuple[int, dict | None]:
+        headers = {'Content-Length': str(len(body) if length is None else length)}
+        self.handler = handler = AsyncHttpHandler(method, path, 'HTTP/1.1', headers, body)
+        with patch('main.router', Router(self.controller)):
+            handler.do_POST() if method == 'POST' else handler.do_GET()
+        response = http.client.HTTPResponse(MockSocket(handler.response()))
+        response.begin()
+        body = response.read()
+        return response.status, json.loads(body) if response.status == 200 else None
+    
+    def check_rates(self, rates: CrossRates):
+        self.assertEqual(rates.codes, ['RUB', 'USD', 'EUR', 'JPY'])
+        self.assertAlmostEqual(rates.rate('USD', 'RUB'), 90.0)
+        self.assertAlmostEqual(rates.rate('RUB', 'EUR'), 1 / 99.0)
+        self.assertAlmostEqual(rates.convert('EUR', 'USD', 10), 11.0)
+        self.assertAlmostEqual(rates.convert('USD', 'JPY', 1), 150.0)
+        self.assertEqual(rates.rate('EUR', 'EUR'), 1.0)
+        
+        self.assertEqual(list(rates.convert_many('USD', 'RUB', [1, 2.5, 0])), [90.0, 225.0, 0.0])
+        result = rates.convert_many(['USD', 'EUR', 'USD'], 'RUB', [1, 1, 2])
+        self.assertEqual(list(result), [90.0, 99.0, 180.0])
+        result = rates.convert_many(['EUR', 'JPY'], ['USD', 'RUB'], [9, 100])
+        self.assertEqual([round(value, 9) for value in result], [9.9, 60.0])
+        self.assertEqual(len(rates.convert_many('USD', 'EUR', [])), 0)
+        
+        with self.assertRaises(UnknownCurrency):
+            rates.rate('USD', 'XXX')
+        with self.assertRaises(UnknownCurrency):
+            rates.convert_many(['USD', 'XXX'], 'RUB', [1, 2])
+        with self.assertRaises(ValueError):
+            rates.convert_many(['USD'], 'RUB', [1, 2])
+    
+    def test_cross_rates(self):
+        self.check_rates(CrossRates(self.currencies_db.get_all()))
+        
+    def test_cross_rates_without_numpy(self):
+        with patch('utils.conversion._numpy', return_value=None):
+            rates = CrossRates(self.currencies_db.get_all())
+            self.assertIsInstance(rates.matrix, array)
+            self.check_rates(rates)
+    
+    def test_rebuild_only_on_rate_change(self):
+        with patch.object(self.currencies_db, 'get_all', wraps=self.currencies_db.get_all) as get_all:
+            rates = self.converter.rates()
+            self.assertIs(self.converter.rates(), rates)
+            self.currencies_db.update_by_char_code('XXX', 1.0)
+            self.assertIs(self.converter.rates(), rates)
+            self.assertEqual(get_all.call_count, 1)
+            
+            self.currencies_db.update_many({'USD': 100.0})
+            self.assertAlmostEqual(self.converter.rates().rate('USD', 'RUB'), 100.0)
+            self.assertEqual(get_all.call_count, 2)
+        
+    def test_convert_endpoint(self):
+        status, body = self.request('GET', '/convert?from=USD&to=EUR&amount=11')
+        self.assertEqual(status, 200)
+        self.assertEqual((body['from'], body['to'], body['amount']), ('USD', 'EUR', 11.0))
+        self.assertAlmostEqual(body['result'], 10.0)
+        self.assertAlmostEqual(self.request('GET', '/convert?from=EUR&to=RUB')[1]['result'], 99.0)
+        
+        self.assertEqual(self.request('GET', '/convert?from=USD&to=XXX')[0], 404)
+        # Сумма конечна, а результат -- уже нет
+        self.assertEqual(self.request('GET', '/convert?from=USD&to=RUB&amount=1e308')[0], 422)
+        for query in ('from=USD', 'to=USD', 'from=USD&to=EUR&amount=много', 'from=USD&to=EUR&amount=nan'):
+            with self.subTest(query=query):
+                self.assertEqual(self.request('GET', '/convert?' + query)[0], 400)
+                
+    def test_batch_endpoint(self):
+        status, body = self.request('POST', '/convert/batch', json.dumps({'from': 'USD', 'to': 'RUB', 'amounts': [1, 2, 0.5]}).encode())
+        self.assertEqual(status, 200)
+        self.assertEqual(body, {'results': [90.0, 180.0, 45.0]})
+        
+        status, body = self.request('POST', '/convert/batch', json.dumps({'from': ['USD', 'EUR'], 'to': 'RUB', 'amounts': [1, 1]}).encode())
+        self.assertEqual(body, {'results': [90.0, 99.0]})
+        
+        self.assertEqual(self.request('POST', '/convert/batch', b'{"from": "XXX", "to": "RUB", "amounts": [1]}')[0], 404)
+        self.assertEqual(self.request('POST', '/convert/batch', b'{"from": "USD", "to": "RUB", "amounts": [1, 1e308]}')[0], 422)
+        with patch('utils.conversion._numpy', return_value=None):
+            self.converter._rates = None
+            self.assertEqual(self.request('POST', '/convert/batch', b'{"from": ["USD", "EUR"], "to": "RUB", "amounts": [1, 1e308]}')[0], 422)
+        for body in (b'{', b'[]', b'{"from": "USD", "to": "RUB"}', b'{"from": "USD", "to": "RUB", "amounts": ["1"]}',
+                     b'{"from": ["USD"], "to": "RUB", "amounts": [1, 2]}', b'{"from": 1, "to": "RUB", "amounts": [1]}',
+                     b'{"from": "USD", "to": "RUB", "amounts": [1, NaN]}', b'{"from": "USD", "to": "RUB", "amounts": [-Infinity]}',
+                     b'{"from": "USD", "to": "RUB", "amounts": [1' + b'0' * 400 + b']}'):
+            with self.subTest(body=body):
+                self.assertEqual(self.request('POST', '/convert/batch', body)[0], 400)
+                
+        with patch('controllers.conversionController.MAX_BATCH_BODY', 4):
+            self.assertEqual(self.request('POST', '/convert/batch', b'{"from": "USD"}')[0], 413)
+            
+        self.assertEqual(self.request('POST', '/convert/batch', b'{"from": "USD", "to": "RUB", "amounts": [1]}', length=-1)[0], 400)
+        self.assertTrue(self.handler.close_connection)
+
+class TestMetrics(unittest.TestCase):
+    def test_threads_are_merged(self):
+        m = Metrics()
+        cache = PageCache()
+        cache.hits, cache.misses = 3, 1
+        m.register_cache('page_cache', cache)
+        
+        def work():
+            for _ in range(100):
+                stats = m.begin()
+                stats.queries = 2
+                stats.render = 0.003
+                m.end(stats, '/users', 'GET', 200)
+        
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        m.end(m.begin(), 'other', 'GET', 404)
+        
+        text = m.exposition()
+        self.assertIn('http_requests_total{route="/users",method="GET",status="200"} 400\n', text)
+        self.assertIn('http_requests_total{route="other",method="GET",status="404"} 1\n', text)
+        self.assertIn('http_request_db_queries_bucket{route="/users",le="1"} 0\n', text)
+        self.assertIn('http_request_db_queries_bucket{route="/users",le="2"} 400\n', text)
+        self.assertIn('http_request_db_queries_bucket{route="/users",le="+Inf"} 400\n', text)
+        self.assertIn('http_request_db_queries_sum{route="/users"} 800\n', text)
+        self.assertIn('http_request_phase_seconds_bucket{route="/users",phase="render",le="0.0025"} 0\n', text)
+        self.assertIn('http_request_phase_seconds_bucket{route="/users",phase="render",le="0.005"} 400\n', text)
+        self.assertIn('http_request_duration_seconds_count{route="/users"} 400\n', text)
+        self.assertIn('page_cache_hit_ratio 0.75\n', text)
+    
+    def test_fold_without_numpy(self):
+        m = Metrics()
+        for i in range(300):
+            stats = m.begin()
+            stats.queries = i % 7
+            stats.db = i * 0.0001
+            stats.render = 0.003 if i % 2 else 0.0
+            m.end(stats, ('/users', '/user', 'other')[i % 3], 'GET', 200 if i % 5 else 404)
+        # Те же записи без NumPy
+        fallback = Metrics()
+        fallback._pending.extend(m._pending)
+        fallback._keys.extend(m._keys)
+        fallback._numbers.update(m._numbers)
+        
+        requests, histograms = m.snapshot()
+        with patch('utils.metrics._numpy', return_value=None):
+            self.assertEqual(fallback.snapshot()[0], requests)
+        _, fallback_histograms = fallback.snapshot()
+        self.assertEqual(fallback_histograms.keys(), histograms.keys())
+        for key, histogram in histograms.items():
+            self.assertEqual(fallback_histograms[key][:-1], histogram[:-1], key)
+            # Суммы NumPy складывает в другом порядке
+            self.assertAlmostEqual(fallback_histograms[key][-1], histogram[-1], msg=key)
+        self.assertEqual(histograms['http_request_db_queries', ('/users',)][-1], sum(i % 7 for i in range(0, 300, 3)))
+    
+    def test_disabled(self):
+        m = Metrics(enabled=False)
+        self.assertIsNone(m.begin())
+        m.end(None, '/users', 'GET', 200)
+        self.assertEqual(m.snapshot(), ({}, {}))
+    
+    def test_phases(self):
+        db = Database(':memory:')
+        self.addCleanup(db.close)
+        currencies = [Currency(str(i), f'C{i:02d}', f'Валюта {i}', float(i), 1) for i in range(1, 50)]
+        with patch('controllers.databaseController.get_currencies', return_value=currencies):
+            currencies_db, users_db, user_currencies_db = CurrencyDatabase(db), UserDatabase(db), UserCurrencyDatabase(db)
+        env = Environment(loader=FileSystemLoader('./templates/'), autoescape=select_autoescape())
+        env.template_class = MeteredTemplate
+        controller = UserController(users_db, user_currencies_db, currencies_db, env)
+        
+        m = Metrics()
+        with patch('controllers.databaseController.metrics', m), patch('utils.response.metrics', m), patch('utils.templates.metrics', m):
+            stats = m.begin()
+            self.assertTrue(Router(controller).dispatch(AsyncRequestHandler('GET', '/user', 'HTTP/1.1', {}), '/user', {'id': '1'}))
+            m.end(stats, '/user', 'GET', 200)
+        
+        self.assertEqual(stats.queries, 1)
+        self.assertGreater(stats.db, 0)
+        self.assertGreater(stats.render, 0)
+        self.assertGreater(stats.write, 0)
+    
+    def test_endpoint(self):
+        server = PooledHTTPServer(('127.0.0.1', 0), KeepAliveHttpHandler, max_workers=2)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            requests, _ = metrics.snapshot()
+            conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+            for path in ('/author', '/author', '/no-such-page/123', '/metrics'):
+                conn.request('GET', path)
+                conn.getresponse().read()
+            
+            # Запрос учитывается после отправки ответа; следующий запрос того же соединения видит предыдущие
+            conn.request('GET', '/metrics')
+            response = conn.getresponse()
+            self.assertEqual(response.getheader('Content-Type'), 'text/plain; version=0.0.4; charset=utf-8')
+            text = response.read().decode()
+            self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+            self.assertIn('http_requests_total{route="/metrics",method="GET",status="200"}', text)
+            self.assertIn('http_request_phase_seconds_count{route="/author",phase="write"}', text)
+            self.assertIn('page_cache_hit_ratio', text)
+            self.assertNotIn('no-such-page', text)
+            
+            after, _ = metrics.snapshot()
+            self.assertEqual(after[('/author', 'GET', 200)] - requests.get(('/author', 'GET', 200), 0), 2)
+            self.assertEqual(after[('other', 'GET', 404)] - requests.get(('other', 'GET', 404), 0), 1)
+            conn.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(':memory:')
+        currencies = [Currency('840', 'USD', 'Доллар США', 90.0, 1), Currency('036', 'AUD', 'Австралийский доллар', 60.0, 1),
+                      Currency('978', 'EUR', 'Евро', 99.0, 1), Currency('392', 'JPY', 'Японских иен', 60.0, 100)]
+        with patch('controllers.databaseController.get_currencies', return_value=currencies):
+            self.currencies_db, self.users_db = CurrencyDatabase(self.db), UserDatabase(self.db)
+        self.controller = SearchController(self.currencies_db, self.users_db)
+        
+    def tearDown(self):
+        self.db.close()
+        
+    def codes(self, query: str) -> list[str]:
+        return [currency.char_code for currency in self.currencies_db.search(query)]
+    
+    def request(self, path: str) -> tuple[int, dict | None]:
+        handler = AsyncHttpHandler('GET', path, 'HTTP/1.1', {}, b'')
+        with patch('main.router', Router(self.controller)):
+            handler.do_GET()
+        response = http.client.HTTPResponse(MockSocket(handler.response()))
+        response.begin()
+        body = response.read()
+        return response.status, json.loads(body) if response.status == 200 else None
+    
+    def test_fts_query(self):
+        self.assertEqual(fts_query('Доллар с'), '"Доллар" "с"*')
+        self.assertEqual(fts_query('"usd" OR name:*'), '"usd" "OR" "name"*')
+        self.assertIsNone(fts_query(' * - '))
+        
+    def test_search(self):
+        self.assertEqual(self.db.full_text, True)
+        self.assertEqual(self.codes('доллар'), ['USD', 'AUD'])
+        self.assertEqual(self.codes('ДОЛ'), ['USD', 'AUD'])
+        self.assertEqual(self.codes('доллар сша'), ['USD'])
+        self.assertEqual(self.codes('jp'), ['JPY'])
+        self.assertEqual(self.codes('иен'), ['JPY'])
+        self.assertEqual(self.codes('фунт'), [])
+        self.assertEqual(self.codes('"'), [])
+        self.assertEqual(len(self.currencies_db.search('доллар', limit=1)), 1)
+        self.assertEqual([user.name for user in self.users_db.search('попов')], ['Максим Попов'])
+        self.assertEqual([user.name for user in self.users_db.search('вла')], ['Владимир Семенюк'])
+        
+    def test_index_follows_writes(self):
+        self.assertEqual(self.currencies_db.suggest('д'), ['Доллар США'])
+        self.currencies_db.insert(Currency('933', 'BYN', 'Белорусский рубль', 30.0, 1))
+        self.currencies_db.insert_many(iter([Currency('124', 'CAD', 'Канадский доллар', 65.0, 1),
+                                             Currency('999', 'DKK', 'Датская крона', 13.0, 1)]))
+        self.assertEqual(self.codes('рубль'), ['BYN'])
+        self.assertEqual(self.codes('доллар'), ['USD', 'AUD', 'CAD'])
+        self.assertEqual(self.currencies_db.suggest('д'), ['Датская крона', 'Доллар США'])
+        self.assertEqual(self.currencies_db.suggest('d'), ['DKK'])
+        self.assertEqual(self.currencies_db.suggest('к'), ['Канадский доллар'])
+        
+        # Курс в индекс не входит, переименование -- входит
+        self.currencies_db.update_many({'USD': 91.0})
+        with self.db.connection() as conn:
+            conn.execute("UPDATE Currencies SET name = 'Доллар' WHERE char_code = 'USD'")
+        self.assertEqual(self.codes('сша'), [])
+        self.assertEqual(self.codes('доллар'), ['USD', 'AUD', 'CAD'])
+        
+        cad = self.currencies_db.search('CAD')[0]
+        self.currencies_db.delete(cad.id)
+        self.assertEqual(self.codes('доллар'), ['USD', 'AUD'])
+        self.assertEqual(self.currencies_db.suggest('к'), [])
+        self.currencies_db.delete(cad.id)
+        
+        self.users_db.insert(User(None, 'Максим Попов'))
+        self.assertEqual(self.users_db.suggest('макс'), ['Максим Попов'])
+        first = self.users_db.search('попов')[0]
+        self.users_db.delete(first.id)
+        # Второй такой же пользователь остался
+        self.assertEqual(self.users_db.suggest('макс'), ['Максим Попов'])
+        self.assertEqual(len(self.users_db.search('попов')), 1)
+        
+    def test_prefix_index(self):
+        index = PrefixIndex(lambda: ['USD', 'usd', 'Евро', 'Евро'] + [f'Валюта {i}' for i in range(100)])
+        self.assertFalse(index.loaded)
+        index.add_many(['не попадёт: индекса ещё нет'])
+        self.assertEqual(index.complete('us'), ['USD', 'usd'])
+        self.assertEqual(len(index), 104)
+        self.assertEqual(index.complete('валюта 1', 3), ['Валюта 1', 'Валюта 10', 'Валюта 11'])
+        self.assertEqual(index.complete('нет'), [])
+        
+        index.discard_many(['Евро', 'USD'])
+        self.assertEqual(index.complete('е'), ['Евро'])
+        self.assertEqual(index.complete('u'), ['usd'])
+        index.discard_many(['Евро', 'Евро'])
+        self.assertEqual(index.complete('е'), [])
+        index.add_many([f'Евро {i}' for i in range(100)])
+        self.assertEqual(index.complete('евро 9', 2), ['Евро 9', 'Евро 90'])
+        self.assertEqual(len(index), 201)
+    
+    def test_existing_database_is_indexed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'old.sqlite3')
+            with sqlite3.connect(path) as conn:
+                conn.executescript(SCHEMA)
+                conn.execute("INSERT INTO Currencies(num_code, char_code, name, value, nominal) VALUES ('840', 'USD', 'Доллар США', 90.0, 1)")
+            conn.close()
+            
+            db = Database(path)
+            try:
+                self.assertEqual([currency.char_code for currency in CurrencyDatabase(db).search('сша')], ['USD'])
+            finally:
+                db.close()
+                
+    def test_without_fts5(self):
+        self.db.full_text = False
+        self.assertEqual(self.codes('доллар'), ['AUD'])
+        self.assertEqual(self.codes('Доллар'), ['USD'])
+        self.assertEqual(self.codes('%'), [])
+        self.assertEqual([user.name for user in self.users_db.search('Попов')], ['Максим Попов'])
+    
+    def test_endpoint(self):
+        status, body = self.request('/search?q=%D0%B4%D0%BE%D0%BB')
+        self.assertEqual(status, 200)
+        self.assertEqual(body['query'], 'дол')
+        self.assertEqual(body['suggestions'], ['Доллар США'])
+        self.assertEqual([currency['char_code'] for currency in body['currencies']], ['USD', 'AUD'])
+        self.assertEqual(body['currencies'][0], {'id': 1, 'char_code': 'USD', 'name': 'Доллар США', 'value': 90.0, 'nominal': 1})
+        self.assertEqual(body['users'], [])
+        
+        status, body = self.request('/search?q=%D0%9C%D0%B0%D0%BA%D1%81%D0%B8%D0%BC&limit=1')
+        self.assertEqual(body['suggestions'], ['Максим Попов'])
+        self.assertEqual(body['users'], [{'id': 3, 'name': 'Максим Попов'}])
+        
+        for query in ('', 'q=', 'q=usd&limit=0', 'q=usd&limit=много', 'q=usd&limit=1000'):
+            with self.subTest(query=query):
+                self.assertEqual(self.request('/search?' + query)[0], 400)
+
+class TestPagination(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(':memory:')
+        # Повторяющиеся курсы проверяют, что курсор различает строки с равным ключом сортировки
+        currencies = [Currency(str(i), f'C{(i * 7) % 250:03d}', f'Валюта {i}', float(i % 10), 1) for i in range(250)]
+        with patch('controllers.databaseController.get_currencies', return_value=currencies):
+            self.currencies_db, self.users_db = CurrencyDatabase(self.db), UserDatabase(self.db)
+        self.controller = CurrenciesController(self.currencies_db, Environment(loader=FileSystemLoader('./templates/'), autoescape=select_autoescape()))
+        
+    def tearDown(self):
+        self.db.close()
+        
+    def walk(self, sort: str, limit: int) -> list[list[Currency]]:
+        pages = []
+        page = self.currencies_db.get_page(limit, sort=sort)
+        while True:
+            pages.append(page.items)
+            self.assertEqual(page.has_prev, len(pages) > 1)
+            if not page.has_next:
+                return pages
+            page = self.currencies_db.get_page(limit, after_id=page.items[-1].id, sort=sort)
+    
+    def test_walk_forward_and_back(self):
+        all_currencies = self.currencies_db.get_all()
+        for sort, key in (('id', lambda c: c.id), ('char_code', lambda c: (c.char_code, c.id)), ('value', lambda c: (c.value, c.id))):
+            with self.subTest(sort=sort):
+                pages = self.walk(sort, 100)
+                self.assertEqual([len(items) for items in pages], [100, 100, 50])
+                self.assertEqual([c.id for items in pages for c in items], [c.id for c in sorted(all_currencies, key=key)])
+                
+                page = self.currencies_db.get_page(100, before_id=pages[2][0].id, sort=sort)
+                self.assertEqual([c.id for c in page.items], [c.id for c in pages[1]])
+                self.assertTrue(page.has_prev)
+                self.assertTrue(page.has_next)
+                
+                page = self.currencies_db.get_page(100, before_id=pages[1][0].id, sort=sort)
+                self.assertEqual([c.id for c in page.items], [c.id for c in pages[0]])
+                self.assertFalse(page.has_prev)
+                
+        with self.assertRaises(ValueError):
+            self.currencies_db.get_page(10, sort='name; DROP TABLE Currencies')
+            
+    def test_users_page(self):
+        page = self.users_db.get_page(2)
+        self.assertEqual([u.name for u in page.items], ["Вадим Козаков", "Владимир Семенюк"])
+        self.assertEqual(page.total, 3)
+        self.assertTrue(page.has_next)
+        
+        page = self.users_db.get_page(2, after_id=2)
+        self.assertEqual([u.id for u in page.items], [3])
+        self.assertFalse(page.has_next)
+        
+    def test_cached_count(self):
+        self.assertEqual(self.currencies_db.get_page(10).total, 250)
+        with patch.object(self.db, 'connection', wraps=self.db.connection) as connection:
+            self.assertEqual(self.currencies_db.count(), 250)
+        connection.assert_not_called()
+        
+        self.currencies_db.insert(Currency('999', 'NEW', 'Новая', 1.0, 1))
+        self.assertEqual(self.currencies_db.count(), 251)
+        self.currencies_db.delete(1)
+        self.assertEqual(self.currencies_db.count(), 250)
+        
+    def test_controller_links(self):
+        handler = AsyncRequestHandler('GET', '/currencies', 'HTTP/1.1', {})
+        Router(self.controller).dispatch(handler, '/currencies', {'limit': '100', 'sort': 'value'})
+        body = handler.response().decode()
+        last_id = self.currencies_db.get_page(100, sort='value').items[-1].id
+        
+        # limit по умолчанию в ссылки не переносится: /currencies?limit=100 и /currencies -- одна страница
+        self.assertIn(f'href="/currencies?sort=value&amp;after_id={last_id}"', body)
+        self.assertNotIn('before_id', body)
+        self.assertIn('Всего: 250', body)
+        self.assertEqual(body.count('class="currency_card"'), 100)
+        
+        for params in ({'limit': '0'}, {'limit': 'abc'}, {'limit': '100000'}, {'sort': 'name'}, {'after_id': 'x'}, {'after_id': '1', 'before_id': '2'}):
+            with self.subTest(params=params):
+                handler = AsyncRequestHandler('GET', '/currencies', 'HTTP/1.1', {})
+                Router(self.controller).dispatch(handler, '/currencies', params)
+                self.assertTrue(handler.response().startswith(b'HTTP/1.1 400'))
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(':memory:')
+        currencies = [Currency(str(i), f'C{i:02d}', f'Валюта {i}', float(i), 1) for i in range(1, 50)]
+        with patch('controllers.databaseController.get_currencies', return_value=currencies):
+            self.currencies_db, self.users_db, self.user_currencies_db = CurrencyDatabase(self.db), UserDatabase(self.db), UserCurrencyDatabase(self.db)
+        
+        env = Environment(loader=FileSystemLoader('./templates/'), autoescape=select_autoescape())
+        self.cache = PageCache()
+        self.router = Router(
+            AuthorController(env, self.cache),
+            UserController(self.users_db, self.user_currencies_db, self.currencies_db, env, self.cache),
+            CurrenciesController(self.currencies_db, env, self.cache),
+        )
+        
+    def tearDown(self):
+        self.db.close()
+        
+    def get(self, path: str, params: dict = {}, headers: dict = {}) -> http.client.HTTPResponse:
+        handler = AsyncRequestHandler('GET', path, 'HTTP/1.1', headers)
+        self.assertTrue(self.router.dispatch(handler, path, params))
+        response = http.client.HTTPResponse(MockSocket(handler.response()))
+        response.begin()
+        return response
+    
+    def test_hit_without_render_or_query(self):
+        first = self.get('/currencies')
+        body = first.read()
+        routes = (('/currencies', {}), ('/users', {}), ('/user', {'id': '1'}), ('/author', {}))
+        for path, params in routes:
+            self.get(path, params)
+        
+        with patch.object(Template, 'render', autospec=True, side_effect=Template.render) as render, \
+             patch.object(self.db, 'connection', wraps=self.db.connection) as connection:
+            for path, params in routes:
+                self.get(path, params)
+            second = self.get('/currencies')
+            self.assertEqual(second.read(), body)
+        
+        render.assert_not_called()
+        connection.assert_not_called()
+        self.assertEqual(second.getheader('ETag'), first.getheader('ETag'))
+        
+        response = self.get('/currencies', headers={'If-None-Match': first.getheader('ETag')})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(response.read(), b'')
+        
+    def test_params_are_part_of_key(self):
+        self.get('/user', {'id': '1'})
+        self.get('/user', {'id': '2'})
+        self.assertEqual(len(self.cache), 2)
+        
+    def test_unknown_params_share_key(self):
+        for path, variants in (('/currencies', ({}, {'limit': '100'}, {'x': '1'}, {'sort': 'id', 'x': '2'})),
+                               ('/users', ({}, {'utm': 'a'})),
+                               ('/user', ({'id': '1'}, {'id': '01', 'x': '1'})),
+                               ('/author', ({}, {'x': '1'}))):
+            with self.subTest(path=path):
+                etags = {self.get(path, params).getheader('ETag') for params in variants}
+                self.assertEqual(len(etags), 1)
+        self.assertEqual(len(self.cache), 4)
+        
+        self.get('/currencies', {'limit': '10', 'x': '1'})
+        self.get('/currencies', {'sort': 'value'})
+        self.assertEqual(len(self.cache), 6)
+        self.assertNotIn('x=1', self.get('/currencies', {'limit': '10', 'x': '1'}).read().decode())
+        
+    def test_update_invalidates_affected_pages(self):
+        pages = {path: self.get(path, params).getheader('ETag')
+                 for path, params in (('/currencies', {}), ('/users', {}), ('/user', {'id': '1'}), ('/author', {}))}
+        
+        self.currencies_db.update_by_char_code('XXX', 1.0)
+        self.assertEqual(self.get('/currencies').getheader('ETag'), pages['/currencies'])
+        
+        self.currencies_db.update_by_char_code('C02', 1234.5)
+        response = self.get('/currencies', headers={'If-None-Match': pages['/currencies']})
+        self.assertEqual(response.status, 200)
+        self.assertIn('1234.5', response.read().decode())
+        
+        with patch.object(Template, 'render', autospec=True, side_effect=Template.render) as render:
+            self.get('/user', {'id': '1'})
+        self.assertEqual(render.call_count, 1)
+        
+        with patch.object(Template, 'render', autospec=True, side_effect=Template.render) as render:
+            self.assertEqual(self.get('/users').getheader('ETag'), pages['/users'])
+            self.assertEqual(self.get('/author').getheader('ETag'), pages['/author'])
+        render.assert_not_called()
+        
+    def test_delete_and_insert_invalidate(self):
+        before = self.get('/user', {'id': '1'}).read()
+        self.currencies_db.delete(2)
+        after = self.get('/user', {'id': '1'}).read()
+        self.assertNotEqual(after, before)
+        
+        self.currencies_db.insert_many([Currency('999', 'NEW', 'Новая', 1.0, 1)])
+        self.assertIn('NEW', self.get('/currencies').read().decode())
+        
+    def test_lru_bounded_by_bytes(self):
+        cache = PageCache(max_bytes=100)
+        cache.put('a', 1, b'a' * 40)
+        cache.put('b', 1, b'b' * 40)
+        self.assertIsNotNone(cache.get('a', 1))
+        cache.put('c', 1, b'c' * 40)
+        
+        self.assertIsNotNone(cache.get('a', 1))
+        self.assertIsNone(cache.get('b', 1))
+        self.assertIsNone(cache.get('a', 2))
+        
+        cache.put('big', 1, b'x' * 101)
+        self.assertIsNone(cache.get('big', 1))
+        self.assertLessEqual(cache._size, 100)
 
 if __name__ == '__main__':
     unittest.main()
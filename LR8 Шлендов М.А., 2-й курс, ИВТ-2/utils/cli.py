@@ -0,0 +1,15 @@
+import argparse
+
+# Модуль не импортирует ничего тяжелее argparse: start.py разбирает аргументы до открытия сокета
+SERVING_MODES = ('single', 'threaded', 'asyncio')
+
+def make_parser() -> argparse.ArgumentParser:
+    """Аргументы сервера; общие для main.py и start.py."""
+    parser = argparse.ArgumentParser(description='Сервер курсов валют')
+    parser.add_argument('--host', default='')
+    parser.add_argument('--port', type=int, default=1234)
+    parser.add_argument('--mode', choices=SERVING_MODES, default='threaded',
+                        help='single -- HTTPServer, threaded -- пул потоков, asyncio -- цикл событий + пул потоков')
+    parser.add_argument('--workers', type=int, default=16, help='размер пула потоков')
+    parser.add_argument('--no-metrics', dest='metrics', action='store_false', help='не собирать метрики для /metrics')
+    return parser
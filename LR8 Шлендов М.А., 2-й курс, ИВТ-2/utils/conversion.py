@@ -0,0 +1,134 @@
+import threading
+from array import array
+from typing import Hashable, Iterable, Protocol, Sequence, Union
+
+from models.currency import Currency
+
+BASE_CODE = 'RUB'
+
+Codes = Union[str, Sequence[str]]
+
+class UnknownCurrency(KeyError):
+    pass
+
+class CurrencySource(Protocol):
+    """Откуда CurrencyConverter берёт курсы; в сервере это CurrencyDatabase."""
+
+    def version(self) -> Hashable:
+        """Меняется при каждом изменении курсов."""
+
+    def get_all(self) -> Iterable[Currency]:
+        ...
+
+def _numpy():
+    """NumPy или None, если он не установлен. Импортируется при первом построении матрицы, а не при запуске сервера."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+class CrossRates:
+    """
+    Матрица кросс-курсов N×N: matrix[i, j] -- сколько единиц валюты j
+    стоит одна единица валюты i. Строится один раз из снимка курсов
+    (value/nominal в рублях); рубль добавляется с курсом 1.
+    """
+
+    def __init__(self, currencies: Iterable[Currency]):
+        rates = {BASE_CODE: 1.0}
+        for currency in currencies:
+            if currency.value and currency.nominal:
+                rates[currency.char_code] = currency.value / currency.nominal
+
+        self.codes = list(rates)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        n = len(self.codes)
+        self.np = np = _numpy()
+        if np is not None:
+            per_unit = np.fromiter(rates.values(), dtype=np.float64, count=n)
+            self.matrix = np.outer(per_unit, 1.0 / per_unit)
+        else:
+            per_unit = list(rates.values())
+            self.matrix = array('d', (a / b for a in per_unit for b in per_unit))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def _position(self, code: str) -> int:
+        try:
+            return self.index[code]
+        except KeyError:
+            raise UnknownCurrency(code) from None
+
+    def rate(self, from_code: str, to_code: str) -> float:
+        i, j = self._position(from_code), self._position(to_code)
+        if self.np is not None:
+            return float(self.matrix[i, j])
+        return self.matrix[i * len(self.codes) + j]
+
+    def convert(self, from_code: str, to_code: str, amount: float) -> float:
+        return amount * self.rate(from_code, to_code)
+
+    def convert_many(self, from_codes: Codes, to_codes: Codes, amounts: Sequence[float]):
+        """
+        Пересчитывает amounts одним векторным умножением. from_codes/to_codes --
+        один код на все суммы или последовательность кодов той же длины.
+        С NumPy возвращает ndarray, без него -- array('d'). Суммы, которые после
+        умножения не помещаются во float, становятся inf.
+        """
+        n = len(amounts)
+        for codes in (from_codes, to_codes):
+            if not isinstance(codes, str) and len(codes) != n:
+                raise ValueError("Число кодов не совпадает с числом сумм")
+
+        np = self.np
+        if np is not None:
+            values = np.asarray(amounts, dtype=np.float64)
+            if isinstance(from_codes, str) and isinstance(to_codes, str):
+                rates = self.matrix[self._position(from_codes), self._position(to_codes)]
+            else:
+                rates = self.matrix[self._positions(from_codes), self._positions(to_codes)]
+            # Переполнение даёт inf, как и без NumPy; проверяет его вызывающий
+            with np.errstate(over='ignore'):
+                return values * rates
+
+        size = len(self.codes)
+        if isinstance(from_codes, str) and isinstance(to_codes, str):
+            rate = self.rate(from_codes, to_codes)
+            return array('d', (amount * rate for amount in amounts))
+        rows = [self._position(from_codes)] * n if isinstance(from_codes, str) else [self._position(code) for code in from_codes]
+        columns = [self._position(to_codes)] * n if isinstance(to_codes, str) else [self._position(code) for code in to_codes]
+        return array('d', (amount * self.matrix[i * size + j] for amount, i, j in zip(amounts, rows, columns)))
+
+    def _positions(self, codes: Codes):
+        if isinstance(codes, str):
+            return self._position(codes)
+        try:
+            return self.np.fromiter(map(self.index.__getitem__, codes), dtype=self.np.intp, count=len(codes))
+        except KeyError as e:
+            raise UnknownCurrency(e.args[0]) from None
+
+class CurrencyConverter:
+    """
+    Хранит CrossRates для текущих курсов и перестраивает матрицу, только
+    когда меняется версия таблицы валют.
+    """
+
+    def __init__(self, db: CurrencySource):
+        self.db = db
+        self._rates: CrossRates | None = None
+        self._built_for: tuple | None = None
+        self._lock = threading.Lock()
+
+    def rates(self) -> CrossRates:
+        version = self.db.version()
+        rates = self._rates
+        if rates is not None and self._built_for == version:
+            return rates
+
+        with self._lock:
+            if self._rates is None or self._built_for != version:
+                self._rates = CrossRates(self.db.get_all())
+                self._built_for = version
+            return self._rates
@@ -0,0 +1,125 @@
+"""
+Потоковый разбор ленты курсов: ответ читается кусками, и записи
+объекта Valute разбираются по одной, поэтому в памяти одновременно
+находятся только текущий кусок и одна запись -- не весь текст ответа,
+его дерево и список Currency.
+"""
+import codecs
+import json
+from typing import Iterable, Iterator, Optional
+
+from models.currency import Currency
+from utils.currencies_api import CBR_URL, dict_to_currency
+from utils.rates_client import RatesClient
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+class FeedReader:
+    """Курсор по JSON-тексту, который приходит кусками байт."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Дочитывает следующий кусок; прочитанная часть буфера отбрасывается."""
+        if self.eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.eof = True
+            text = self._utf8.decode(b'', final=True)
+        else:
+            text = self._utf8.decode(chunk)
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Следующий значимый символ ('' в конце текста)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Ожидался один из символов {chars!r}, получено {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Разбирает одно JSON-значение, дочитывая куски, пока оно не поместится в буфер."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # Число на границе куска могло оборваться: значение завершено, только если за ним что-то есть
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def members(self) -> Iterator[str]:
+        """Ключи объекта, начинающегося в текущей позиции; значение каждого ключа должен прочитать вызывающий."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("Ключ объекта должен быть строкой")
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+def iter_valutes(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """Записи объекта Valute по одной; остальные поля ответа разбираются и пропускаются."""
+    reader = FeedReader(chunks)
+    for key in reader.members():
+        if key != 'Valute':
+            reader.value()
+            continue
+        for _ in reader.members():
+            yield reader.value()
+    if reader.peek():
+        raise ValueError("Лишние данные после JSON")
+
+def iter_currencies(chunks: Iterable[bytes], codes: Optional[Iterable[str]] = None) -> Iterator[Currency]:
+    """
+    Currency по одной записи ленты. codes -- ID, символьные или цифровые
+    коды нужных валют; без codes возвращается вся лента.
+    """
+    wanted = None if codes is None else set(codes)
+    for valute in iter_valutes(chunks):
+        if wanted is None or valute['ID'] in wanted or valute['CharCode'] in wanted or valute['NumCode'] in wanted:
+            yield dict_to_currency(valute)
+
+def stream_currencies(url: str = CBR_URL, codes: Optional[Iterable[str]] = None,
+                      client: Optional[RatesClient] = None) -> Iterator[Currency]:
+    """Загружает ленту url и отдаёт Currency по мере чтения ответа."""
+    own_client = client is None
+    client = client or RatesClient()
+    response = client.get(url, stream=True)
+    try:
+        if response.status_code != 200:
+            raise Exception("Ошибка выполнения запроса к API")
+        yield from iter_currencies(response.iter_content(CHUNK_SIZE), codes)
+    finally:
+        response.close()
+        if own_client:
+            client.close()
@@ -0,0 +1,275 @@
+"""
+Метрики HTTP-сервера в текстовом формате Prometheus (/metrics).
+
+Для каждого маршрута: число ответов по методу и статусу, гистограммы
+полного времени запроса и его фаз -- db (блоки Database.connection()),
+render (Template.render) и write (запись ответа в сокет), -- и гистограмма
+числа обращений к базе за запрос. Плюс доли попаданий зарегистрированных кэшей.
+
+Запрос записывается без блокировок: end() дописывает строку из ROW_SIZE чисел
+в один array('d') (extend потокобезопасен), без объектов, которые надо
+держать до раскладки. Раскладывает строки по корзинам тот поток, на котором
+их набралось FOLD_EVERY, или exposition() -- под блокировкой, пачкой: с NumPy
+одним searchsorted/bincount на столбец, без него -- по строке. Разбор по одной
+записи в конце каждого запроса обходится примерно вдвое дороже (см.
+benchmarks/metrics.py).
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from time import perf_counter
+from typing import Optional
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+PHASES = ('db', 'render', 'write')
+# Сколько записей копится до раскладки по корзинам
+FOLD_EVERY = 1024
+# Строка записи: номер ключа (route, method, status), полное время, фазы PHASES, число обращений к базе
+ROW_SIZE = 2 + len(PHASES) + 1
+_FOLD_SIZE = FOLD_EVERY * ROW_SIZE
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': (('route',), LATENCY_BUCKETS, "Полное время обработки запроса"),
+    'http_request_phase_seconds': (('route', 'phase'), LATENCY_BUCKETS, "Время фаз запроса: db, render, write"),
+    'http_request_db_queries': (('route',), QUERY_BUCKETS, "Обращений к базе (блоков Database.connection()) за запрос"),
+}
+
+class RequestStats:
+    """Накопители одного запроса: время фаз и число обращений к базе."""
+
+    __slots__ = ('start', 'db', 'render', 'write', 'queries')
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.db = 0.0
+        self.render = 0.0
+        self.write = 0.0
+        self.queries = 0
+
+_MISSING = object()
+
+class _Local(threading.local):
+    # Значение по умолчанию в классе: getattr с default на отсутствующем атрибуте идёт через исключение
+    current: Optional[RequestStats] = None
+
+def _numpy():
+    """NumPy или None, если он не установлен."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def _histogram(buckets: tuple) -> list:
+    """Число значений в каждой корзине, в +Inf и сумма значений."""
+    return [0] * (len(buckets) + 2)
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for value in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+class Metrics:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._local = _Local()
+        # Строки ROW_SIZE чисел завершённых запросов, ещё не разложенные по корзинам
+        self._pending = array('d')
+        # (route, method, status) -> номер в строке записи; _keys -- обратно
+        self._numbers: dict[tuple[str, str, int], int] = {}
+        self._keys: list[tuple[str, str, int]] = []
+        self._keys_lock = threading.Lock()
+        self._np = _MISSING
+        # (route, method, status) -> число ответов
+        self._requests: dict[tuple[str, str, int], int] = {}
+        # route -> гистограммы: полное время, фазы PHASES, число обращений к базе
+        self._routes: dict[str, list[list]] = {}
+        self._caches: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register_cache(self, name: str, cache):
+        """Кэш с атрибутами hits и misses (например, PageCache) попадёт в /metrics как {name}_hits_total и т. д."""
+        self._caches[name] = cache
+
+    def begin(self) -> Optional[RequestStats]:
+        """Начинает запрос в текущем потоке; None, если метрики выключены."""
+        if not self.enabled:
+            return None
+        stats = self._local.current = RequestStats()
+        return stats
+
+    def current(self) -> Optional[RequestStats]:
+        return self._local.current
+
+    def load(self):
+        """
+        NumPy для раскладки пачек или None. Импортируется при первой раскладке;
+        start() вызывает load() в фоне, чтобы импорт не пришёлся на запрос.
+        """
+        if self._np is _MISSING:
+            self._np = _numpy()
+        return self._np
+
+    def _number(self, key: tuple[str, str, int]) -> int:
+        with self._keys_lock:
+            number = self._numbers.get(key)
+            if number is None:
+                # Сначала в _keys: строка с этим номером может попасть в _pending сразу после return
+                self._keys.append(key)
+                number = self._numbers[key] = len(self._keys) - 1
+            return number
+
+    def end(self, stats: Optional[RequestStats], route: str, method: str, status: int):
+        if stats is None:
+            return
+        number = self._numbers.get((route, method, status))
+        if number is None:
+            number = self._number((route, method, status))
+        pending = self._pending
+        pending.extend((number, perf_counter() - stats.start, stats.db, stats.render, stats.write, stats.queries))
+        # _local.current не сбрасывается: следующий begin() всё равно его заменит, а фазы,
+        # попавшие в уже записанный stats, никуда не идут
+        # Раскладывает один поток; остальные тем временем только добавляют
+        if len(pending) >= _FOLD_SIZE and self._lock.acquire(blocking=False):
+            try:
+                self._fold()
+            finally:
+                self._lock.release()
+
+    def _fold(self):
+        """Раскладывает накопленные строки по счётчикам и корзинам; вызывается под self._lock."""
+        pending = self._pending
+        size = len(pending)
+        if not size:
+            return
+        rows = pending[:size]
+        # Строки, дописанные после len(), остаются до следующей раскладки
+        del pending[:size]
+
+        np = self.load()
+        if np is None:
+            self._fold_rows(rows)
+        else:
+            self._fold_table(np, rows)
+
+    def _histograms(self, route: str) -> list[list]:
+        """Гистограммы маршрута: полное время, фазы PHASES, число обращений к базе."""
+        histograms = self._routes.get(route)
+        if histograms is None:
+            histograms = self._routes[route] = [_histogram(LATENCY_BUCKETS) for _ in range(len(PHASES) + 1)] + [_histogram(QUERY_BUCKETS)]
+        return histograms
+
+    def _fold_table(self, np, rows: array):
+        """Пачка целиком: строки -- таблица NumPy, корзины всех маршрутов -- один bincount на столбец."""
+        table = np.frombuffer(rows, dtype=np.float64).reshape(-1, ROW_SIZE)
+        numbers = table[:, 0].astype(np.intp)
+        keys, requests = self._keys, self._requests
+        counts = np.bincount(numbers)
+        for number in np.flatnonzero(counts).tolist():
+            key = keys[number]
+            requests[key] = requests.get(key, 0) + int(counts[number])
+
+        # Номер маршрута для каждого ключа, затем для каждой строки
+        routes = sorted({key[0] for key in keys})
+        route_numbers = {route: i for i, route in enumerate(routes)}
+        row_routes = np.array([route_numbers[key[0]] for key in keys], dtype=np.intp)[numbers]
+        histograms = [self._histograms(route) for route in routes]
+
+        for column, buckets in enumerate((LATENCY_BUCKETS,) * (len(PHASES) + 1) + (QUERY_BUCKETS,), start=1):
+            values = table[:, column]
+            width = len(buckets) + 1
+            cells = np.bincount(row_routes * width + np.searchsorted(np.asarray(buckets, dtype=np.float64), values),
+                                minlength=len(routes) * width).reshape(len(routes), width).tolist()
+            sums = np.bincount(row_routes, weights=values, minlength=len(routes)).tolist()
+            for route_histograms, route_cells, total in zip(histograms, cells, sums):
+                histogram = route_histograms[column - 1]
+                for i, count in enumerate(route_cells):
+                    histogram[i] += count
+                # Сумма обращений к базе -- целое, как и без NumPy
+                histogram[-1] += total if buckets is LATENCY_BUCKETS else round(total)
+
+    def _fold_rows(self, rows: array):
+        """Без NumPy: по одной строке."""
+        keys, requests = self._keys, self._requests
+        for i in range(0, len(rows), ROW_SIZE):
+            number, elapsed, db_time, render_time, write_time, query_count = rows[i:i + ROW_SIZE]
+            key = keys[int(number)]
+            requests[key] = requests.get(key, 0) + 1
+
+            # Развёрнуто вручную: цикл по фазам заметно дороже. Фазы, которых у запроса
+            # не было (страница из кэша -- без db и render), -- в первую корзину без поиска
+            duration, db, render, write, queries = self._histograms(key[0])
+            duration[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+            duration[-1] += elapsed
+            value = db_time
+            if value:
+                db[bisect_left(LATENCY_BUCKETS, value)] += 1
+                db[-1] += value
+            else:
+                db[0] += 1
+            value = render_time
+            if value:
+                render[bisect_left(LATENCY_BUCKETS, value)] += 1
+                render[-1] += value
+            else:
+                render[0] += 1
+            value = write_time
+            if value:
+                write[bisect_left(LATENCY_BUCKETS, value)] += 1
+                write[-1] += value
+            else:
+                write[0] += 1
+            value = int(query_count)
+            queries[bisect_left(QUERY_BUCKETS, value)] += 1
+            queries[-1] += value
+
+    def snapshot(self) -> tuple[dict, dict]:
+        """
+        Ответы по (route, method, status) и гистограммы по (метрика, метки) --
+        списки из числа значений в каждой корзине, в +Inf и суммы.
+        """
+        with self._lock:
+            self._fold()
+            requests = dict(self._requests)
+            histograms: dict[tuple, list] = {}
+            for route, (duration, *phases, queries) in self._routes.items():
+                histograms['http_request_duration_seconds', (route,)] = list(duration)
+                for phase, histogram in zip(PHASES, phases):
+                    histograms['http_request_phase_seconds', (route, phase)] = list(histogram)
+                histograms['http_request_db_queries', (route,)] = list(queries)
+        return requests, histograms
+
+    def exposition(self) -> str:
+        requests, histograms = self.snapshot()
+        lines = ["# HELP http_requests_total Ответы по маршруту, методу и статусу",
+                 "# TYPE http_requests_total counter"]
+        for key in sorted(requests):
+            lines.append(f"http_requests_total{{{_labels(('route', 'method', 'status'), key)}}} {requests[key]}")
+
+        for name, (label_names, buckets, help) in HISTOGRAMS.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, label_values), counts in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                labels = _labels(label_names, label_values)
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {counts[-1]}")
+                lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+        for name, cache in sorted(self._caches.items()):
+            hits, misses = cache.hits, cache.misses
+            lines.append(f"# TYPE {name}_hits_total counter")
+            lines.append(f"{name}_hits_total {hits}")
+            lines.append(f"# TYPE {name}_misses_total counter")
+            lines.append(f"{name}_misses_total {misses}")
+            lines.append(f"# TYPE {name}_hit_ratio gauge")
+            lines.append(f"{name}_hit_ratio {hits / (hits + misses) if hits + misses else 0}")
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
@@ -0,0 +1,72 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+PAGE_CACHE_SIZE = 32 * 2**20
+
+class CachedPage:
+    def __init__(self, body: bytes, version: Hashable, mime_type: str = 'text/html'):
+        self.body = body
+        self.version = version
+        self.mime_type = mime_type
+        self.etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+class PageCache:
+    """
+    LRU-кэш готовых страниц (закодированное тело + ETag), не больше max_bytes.
+
+    Страница хранится вместе с версией данных, из которых она построена
+    (Database.version()); если версия изменилась, get() считает запись
+    устаревшей, и страница строится заново.
+    """
+
+    def __init__(self, max_bytes: int = PAGE_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self._pages: OrderedDict[Hashable, CachedPage] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(path: str, params: dict) -> tuple:
+        """
+        Ключ страницы. params -- только разобранные параметры, от которых страница
+        зависит: с сырыми параметрами запроса ?x=1, ?x=2, ... заняли бы кэш копиями.
+        """
+        return path, tuple(sorted(params.items()))
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[CachedPage]:
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None or page.version != version:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(self, key: Hashable, version: Hashable, body: bytes, mime_type: str = 'text/html') -> CachedPage:
+        page = CachedPage(body, version, mime_type)
+        if len(body) > self.max_bytes:
+            return page
+
+        with self._lock:
+            old = self._pages.pop(key, None)
+            if old is not None:
+                self._size -= len(old.body)
+            self._pages[key] = page
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._pages.popitem(last=False)
+                self._size -= len(evicted.body)
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+            self._size = 0
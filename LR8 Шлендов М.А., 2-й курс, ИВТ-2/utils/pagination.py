@@ -0,0 +1,59 @@
+from typing import Optional
+from urllib.parse import urlencode
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+class Page:
+    """Страница выборки: строки и признаки наличия соседних страниц для keyset-курсоров."""
+
+    __slots__ = ('items', 'has_next', 'has_prev', 'total')
+
+    def __init__(self, items: list, has_next: bool, has_prev: bool, total: int = 0):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.total = total
+
+def parse_page_params(params: dict, sort_keys: tuple[str, ...] = ('id',)) -> Optional[dict]:
+    """
+    Разбирает limit, after_id, before_id и sort из параметров запроса.
+    Возвращает аргументы для get_page() или None, если параметры некорректны.
+    """
+    try:
+        limit = int(params.get('limit', PAGE_SIZE))
+        after_id = int(params['after_id']) if 'after_id' in params else None
+        before_id = int(params['before_id']) if 'before_id' in params else None
+    except ValueError:
+        return None
+
+    sort = params.get('sort', sort_keys[0])
+    if not 1 <= limit <= MAX_PAGE_SIZE or sort not in sort_keys or (after_id is not None and before_id is not None):
+        return None
+    return {'limit': limit, 'after_id': after_id, 'before_id': before_id, 'sort': sort}
+
+def page_query(page_params: dict, sort_keys: tuple[str, ...] = ('id',)) -> dict:
+    """
+    Параметры запроса, однозначно задающие страницу, по результату parse_page_params():
+    без неизвестных параметров и без значений по умолчанию, так что /users и
+    /users?limit=100&x=1 дают одно и то же.
+    """
+    query = {}
+    if page_params['limit'] != PAGE_SIZE:
+        query['limit'] = str(page_params['limit'])
+    for key in ('after_id', 'before_id'):
+        if page_params[key] is not None:
+            query[key] = str(page_params[key])
+    if page_params['sort'] != sort_keys[0]:
+        query['sort'] = page_params['sort']
+    return query
+
+def page_links(path: str, params: dict, page: Page) -> dict:
+    """Ссылки prev_url/next_url: курсор -- id первой/последней строки страницы."""
+    base = {key: value for key, value in params.items() if key not in ('after_id', 'before_id')}
+    links = {'prev_url': None, 'next_url': None}
+    if page.has_prev and page.items:
+        links['prev_url'] = path + '?' + urlencode(base | {'before_id': page.items[0].id})
+    if page.has_next and page.items:
+        links['next_url'] = path + '?' + urlencode(base | {'after_id': page.items[-1].id})
+    return links
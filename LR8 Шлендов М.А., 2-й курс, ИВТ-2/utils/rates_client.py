@@ -0,0 +1,165 @@
+"""
+HTTP-клиент для источников курсов: одна requests.Session с пулом соединений
+на все запросы, таймаут на каждый запрос, повторы с экспоненциальной
+задержкой и параллельная загрузка нескольких адресов (лента дня, архив
+по датам, зеркала) в пуле потоков.
+
+requests импортируется при первом запросе, а не при импорте модуля,
+чтобы не замедлять запуск сервера.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from time import sleep
+from typing import TYPE_CHECKING, Iterable, Optional, Sequence, Union
+
+if TYPE_CHECKING:
+    import requests
+
+ARCHIVE_URL = "https://www.cbr-xml-daily.ru/archive/{day:%Y/%m/%d}/daily_json.js"
+REQUEST_TIMEOUT = 10
+MAX_WORKERS = 16
+RETRIES = 3
+BACKOFF = 0.5
+BACKOFF_MAX = 8.0
+# Ответы, после которых имеет смысл повторить запрос
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+logger = logging.getLogger(__name__)
+
+# Адрес или список зеркал одного и того же документа
+Source = Union[str, Sequence[str]]
+
+class FetchError(Exception):
+    pass
+
+def make_session(pool_size: int = MAX_WORKERS) -> 'requests.Session':
+    """Session, держащая до pool_size открытых соединений на каждый хост."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def archive_urls(start: date, end: date, templates: Sequence[str] = (ARCHIVE_URL,)) -> list[list[str]]:
+    """Адреса архива за дни start..end: для каждого дня -- список зеркал."""
+    days = (start + timedelta(days=i) for i in range((end - start).days + 1))
+    return [[template.format(day=day) for template in templates] for day in days]
+
+def merge_snapshots(snapshots: Iterable[dict]) -> list[dict]:
+    """Ответы разных источников без повторов по Date, по возрастанию даты; первый ответ за дату важнее."""
+    by_date: dict[str, dict] = {}
+    for data in snapshots:
+        by_date.setdefault(data['Date'], data)
+    return [by_date[key] for key in sorted(by_date)]
+
+class RatesClient:
+    def __init__(self, session: Optional['requests.Session'] = None, timeout: float = REQUEST_TIMEOUT,
+                 retries: int = RETRIES, backoff: float = BACKOFF, max_workers: int = MAX_WORKERS):
+        self._session = session
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> 'requests.Session':
+        """Session создаётся при первом запросе."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = make_session(self.max_workers)
+        return self._session
+
+    def delay(self, attempt: int) -> float:
+        return min(self.backoff * 2 ** attempt, BACKOFF_MAX)
+
+    def get(self, url: str, headers: Optional[dict] = None, stream: bool = False) -> 'requests.Response':
+        """
+        GET с повторами: сетевые ошибки, таймауты и ответы из RETRY_STATUSES
+        повторяются до retries раз. Остальные ответы (включая 304 и 404)
+        возвращаются как есть; после последней попытки -- последний ответ
+        или исключение requests. С stream=True тело читается по мере
+        iter_content(), а ответ нужно закрыть.
+        """
+        import requests
+
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last:
+                    raise
+                logger.warning(f"{url}: {e}, повтор через {self.delay(attempt)} с")
+            else:
+                if response.status_code not in RETRY_STATUSES or last:
+                    return response
+                response.close()
+                logger.warning(f"{url}: HTTP {response.status_code}, повтор через {self.delay(attempt)} с")
+            sleep(self.delay(attempt))
+
+    def fetch_json(self, source: Source) -> Optional[dict]:
+        """
+        JSON первого ответившего зеркала. None, если документа нет (404 --
+        в архиве ЦБ так выглядят выходные); FetchError, если не ответило ни одно.
+        """
+        import requests
+
+        mirrors = [source] if isinstance(source, str) else source
+        errors = []
+        for url in mirrors:
+            try:
+                response = self.get(url)
+            except requests.RequestException as e:
+                errors.append(f"{url}: {e}")
+                continue
+
+            if response.status_code == 404:
+                return None
+            if response.status_code != 200:
+                errors.append(f"{url}: HTTP {response.status_code}")
+                continue
+            try:
+                return response.json()
+            except ValueError:
+                errors.append(f"{url}: ответ не JSON")
+
+        raise FetchError('; '.join(errors))
+
+    def fetch_many(self, sources: Iterable[Source]) -> tuple[list[dict], dict[str, FetchError]]:
+        """
+        Загружает sources параллельно. Возвращает ответы в порядке sources
+        (без отсутствующих документов) и ошибки по первому адресу источника.
+        """
+        sources = list(sources)
+        results: list[dict] = []
+        errors: dict[str, FetchError] = {}
+
+        def fetch(source: Source):
+            try:
+                return self.fetch_json(source)
+            except FetchError as e:
+                return e
+
+        with ThreadPoolExecutor(min(self.max_workers, len(sources) or 1), thread_name_prefix='rates-fetch') as executor:
+            for source, result in zip(sources, executor.map(fetch, sources)):
+                if isinstance(result, FetchError):
+                    errors[source if isinstance(source, str) else source[0]] = result
+                elif result is not None:
+                    results.append(result)
+        return results, errors
+
+    def fetch_archive(self, start: date, end: date, templates: Sequence[str] = (ARCHIVE_URL,)) -> tuple[list[dict], dict[str, FetchError]]:
+        """Ответы архива за start..end, слитые по Date, и ошибки по адресам."""
+        snapshots, errors = self.fetch_many(archive_urls(start, end, templates))
+        return merge_snapshots(snapshots), errors
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
@@ -0,0 +1,287 @@
+"""
+История курсов ЦБ: для каждой валюты два append-only файла --
+дни (array('i'), date.toordinal()) и курсы за единицу валюты (array('d')).
+Файлы читаются через mmap, поиск дня -- bisect по отсортированным дням,
+поэтому выборка за период стоит O(log n + k).
+
+Массовый импорт архива: python -m utils.rates_history archive/*.json
+или загрузка архива ЦБ за период: python -m utils.rates_history --fetch 2024-01-01 2024-12-31
+"""
+import argparse
+import json
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from typing import Iterable, Iterator, Optional
+
+from utils.rates_client import RatesClient
+
+HISTORY_PATH = 'rates_history'
+
+def parse_day(value: str) -> date:
+    """День из '2024-05-17' или '2024-05-17T11:30:00+03:00'."""
+    return datetime.fromisoformat(value).date()
+
+def snapshot_points(data: dict) -> Iterator[tuple[str, int, float, bool]]:
+    """
+    Точки (код, день, курс за единицу, из Previous ли) из ответа daily_json.js:
+    Value на Date и, если есть, Previous на PreviousDate.
+    """
+    day = parse_day(data['Date']).toordinal()
+    previous_day = parse_day(data['PreviousDate']).toordinal() if 'PreviousDate' in data else None
+    for valute in data['Valute'].values():
+        nominal = valute.get('Nominal') or 1
+        if previous_day is not None and 'Previous' in valute:
+            yield valute['CharCode'], previous_day, valute['Previous'] / nominal, True
+        yield valute['CharCode'], day, valute['Value'] / nominal, False
+
+class MappedArray:
+    """Append-only файл элементов array(typecode), доступный для чтения через mmap."""
+
+    def __init__(self, path: str, typecode: str):
+        self.path = path
+        self.typecode = typecode
+        self.itemsize = array(typecode).itemsize
+        self._file = open(path, 'a+b')
+        self.view = memoryview(b'').cast(typecode)
+        self._remap()
+
+    def _remap(self):
+        size = os.fstat(self._file.fileno()).st_size
+        # Недописанный хвост (падение посреди записи) не читаем
+        size -= size % self.itemsize
+        if size == 0:
+            self.view = memoryview(b'').cast(self.typecode)
+            return
+        # Старое отображение освобождается сборщиком, когда на него не останется ссылок из выборок
+        self.view = memoryview(mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)).cast(self.typecode)
+
+    def append(self, items: array, at: int):
+        """Дописывает items после первых at элементов (лишний хвост от прерванной записи отбрасывается)."""
+        if os.fstat(self._file.fileno()).st_size != at * self.itemsize:
+            self._file.truncate(at * self.itemsize)
+        self._file.write(items.tobytes())
+        self._file.flush()
+        self._remap()
+
+    def rewrite(self, items: array):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            items.tofile(f)
+        self.view = memoryview(b'').cast(self.typecode)
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a+b')
+        self._remap()
+
+    def close(self):
+        self.view = memoryview(b'').cast(self.typecode)
+        self._file.close()
+
+class RateSeries:
+    """Ряд одной валюты: параллельные файлы дней и курсов, дни строго возрастают."""
+
+    def __init__(self, directory: str, code: str):
+        self.code = code
+        self.days = MappedArray(os.path.join(directory, f'{code}.days'), 'i')
+        self.values = MappedArray(os.path.join(directory, f'{code}.values'), 'd')
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> tuple[memoryview, memoryview]:
+        """Согласованная пара (дни, курсы) одинаковой длины."""
+        with self._lock:
+            days, values = self.days.view, self.values.view
+        n = min(len(days), len(values))
+        return days[:n], values[:n]
+
+    def append(self, points: list[tuple[int, float]]) -> int:
+        """Дописывает точки новее последнего дня; более ранние дни пропускаются."""
+        with self._lock:
+            n = min(len(self.days.view), len(self.values.view))
+            last = self.days.view[n - 1] if n else None
+            days, values = array('i'), array('d')
+            for day, value in sorted(points):
+                if last is not None and day <= last:
+                    continue
+                days.append(day)
+                values.append(value)
+                last = day
+            if days:
+                # Сначала курсы: если запись прервётся, лишний курс без дня отбросится по min-длине
+                self.values.append(values, n)
+                self.days.append(days, n)
+            return len(days)
+
+    def merge(self, points: dict[int, float], fallback: Optional[dict[int, float]] = None) -> int:
+        """
+        Вливает точки любых дней и переписывает файлы: points заменяют
+        сохранённые значения, fallback (курсы из Previous) только заполняют пропуски.
+        """
+        with self._lock:
+            n = min(len(self.days.view), len(self.values.view))
+            merged = (fallback or {}) | dict(zip(self.days.view[:n], self.values.view[:n]))
+            before = n
+            merged.update(points)
+            ordered = sorted(merged)
+            self.values.rewrite(array('d', (merged[day] for day in ordered)))
+            self.days.rewrite(array('i', ordered))
+            return len(merged) - before
+
+    def close(self):
+        self.days.close()
+        self.values.close()
+
+class RatesHistory:
+    """
+    Хранилище истории курсов в каталоге path.
+
+    append_snapshot() подписывается на RatesProvider и дописывает каждый
+    полученный ответ ЦБ; import_snapshots()/import_files() загружают архив
+    за любые даты. Запросы: range(), stats(), windows(), change().
+    """
+
+    def __init__(self, path: str = HISTORY_PATH):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._series: dict[str, RateSeries] = {}
+        self._lock = threading.Lock()
+
+    def codes(self) -> list[str]:
+        return sorted(name.removesuffix('.days') for name in os.listdir(self.path) if name.endswith('.days'))
+
+    def series(self, code: str, create: bool = False) -> Optional[RateSeries]:
+        # Код становится именем файла, поэтому допускаются только буквы и цифры
+        if not code.isascii() or not code.isalnum():
+            return None
+        with self._lock:
+            series = self._series.get(code)
+            if series is None:
+                if not create and not os.path.exists(os.path.join(self.path, f'{code}.days')):
+                    return None
+                series = self._series[code] = RateSeries(self.path, code)
+            return series
+
+    def append_snapshot(self, data: dict) -> int:
+        """Дописывает ответ daily_json.js; уже сохранённые дни пропускаются. Возвращает число новых точек."""
+        by_code: dict[str, list[tuple[int, float]]] = {}
+        for code, day, value, _ in snapshot_points(data):
+            by_code.setdefault(code, []).append((day, value))
+
+        added = 0
+        for code, points in by_code.items():
+            series = self.series(code, create=True)
+            if series is not None:
+                added += series.append(points)
+        return added
+
+    def import_snapshots(self, snapshots: Iterable[dict]) -> int:
+        """
+        Массовый импорт ответов за любые даты: каждая валюта переписывается один раз.
+        Value дня важнее, чем Previous из ответа за следующий день.
+        """
+        by_code: dict[str, tuple[dict[int, float], dict[int, float]]] = {}
+        for data in snapshots:
+            for code, day, value, is_previous in snapshot_points(data):
+                points, fallback = by_code.setdefault(code, ({}, {}))
+                (fallback if is_previous else points)[day] = value
+
+        added = 0
+        for code, (points, fallback) in by_code.items():
+            series = self.series(code, create=True)
+            if series is not None:
+                added += series.merge(points, fallback)
+        return added
+
+    def import_files(self, paths: Iterable[str]) -> int:
+        def load():
+            for path in paths:
+                with open(path, encoding='utf-8') as f:
+                    yield json.load(f)
+        return self.import_snapshots(load())
+
+    def _slice(self, code: str, start: date, end: date) -> tuple[memoryview, memoryview, int]:
+        series = self.series(code)
+        if series is None:
+            return memoryview(b'').cast('i'), memoryview(b'').cast('d'), 0
+        days, values = series.snapshot()
+        i = bisect_left(days, start.toordinal())
+        j = bisect_right(days, end.toordinal())
+        return days[i:j], values[i:j], i
+
+    def range(self, code: str, start: date, end: date) -> list[tuple[date, float]]:
+        """Курсы code за дни start..end включительно."""
+        days, values, _ = self._slice(code, start, end)
+        return [(date.fromordinal(day), value) for day, value in zip(days, values)]
+
+    def stats(self, code: str, start: date, end: date) -> Optional[dict]:
+        """min/max/avg за период или None, если точек нет."""
+        _, values, _ = self._slice(code, start, end)
+        if not values:
+            return None
+        return {'count': len(values), 'min': min(values), 'max': max(values), 'avg': sum(values) / len(values)}
+
+    def windows(self, code: str, start: date, end: date, days: int) -> list[dict]:
+        """min/max/avg по окнам из days дней, начиная со start; пустые окна пропускаются."""
+        if days < 1:
+            raise ValueError("Окно должно быть не меньше одного дня")
+        day_view, values, _ = self._slice(code, start, end)
+        result = []
+        origin = start.toordinal()
+        for day, value in zip(day_view, values):
+            window_start = origin + (day - origin) // days * days
+            if not result or result[-1]['start'] != window_start:
+                result.append({'start': window_start, 'count': 0, 'min': value, 'max': value, 'sum': 0.0})
+            window = result[-1]
+            window['count'] += 1
+            window['min'] = min(window['min'], value)
+            window['max'] = max(window['max'], value)
+            window['sum'] += value
+        return [{'start': date.fromordinal(w['start']), 'end': date.fromordinal(w['start'] + days - 1),
+                 'count': w['count'], 'min': w['min'], 'max': w['max'], 'avg': w['sum'] / w['count']} for w in result]
+
+    def change(self, code: str, day: Optional[date] = None) -> Optional[dict]:
+        """Изменение курса на день day (или на последний день до него) относительно предыдущей точки."""
+        series = self.series(code)
+        if series is None:
+            return None
+        days, values = series.snapshot()
+        i = len(days) if day is None else bisect_right(days, day.toordinal())
+        if i < 2:
+            return None
+        value, previous = values[i - 1], values[i - 2]
+        return {'date': date.fromordinal(days[i - 1]), 'value': value,
+                'previous_date': date.fromordinal(days[i - 2]), 'previous_value': previous,
+                'change': value - previous, 'change_percent': (value - previous) / previous * 100 if previous else None}
+
+    def close(self):
+        with self._lock:
+            for series in self._series.values():
+                series.close()
+            self._series.clear()
+
+def main():
+    parser = argparse.ArgumentParser(description='Импорт архива ответов daily_json.js в историю курсов')
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--fetch', nargs=2, metavar=('FROM', 'TO'), type=parse_day, help='загрузить архив ЦБ за дни FROM..TO')
+    parser.add_argument('--path', default=HISTORY_PATH)
+    args = parser.parse_args()
+    if not args.files and not args.fetch:
+        parser.error('нужны файлы или --fetch')
+
+    history = RatesHistory(args.path)
+    added = history.import_files(args.files)
+    if args.fetch:
+        client = RatesClient()
+        snapshots, errors = client.fetch_archive(*args.fetch)
+        client.close()
+        for url, error in errors.items():
+            print(f"Не загружен {url}: {error}")
+        added += history.import_snapshots(snapshots)
+    print(f"Добавлено точек: {added}, валют: {len(history.codes())}")
+    history.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,106 @@
+import json
 from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from utils.metrics import metrics
+from utils.page_cache import CachedPage
+from utils.static import etag_matches
+
+# jinja2 нужен только для аннотации: шаблоны передают контроллеры
+if TYPE_CHECKING:
+    from jinja2 import Template
+
+STREAM_CHUNK_SIZE = 16 * 1024
+
+def _write(handler: BaseHTTPRequestHandler, data: bytes):
+    """Запись тела ответа; время идёт в метрики текущего запроса (фаза write)."""
+    stats = metrics.current()
+    if stats is None:
+        handler.wfile.write(data)
+        return
+    start = perf_counter()
+    handler.wfile.write(data)
+    stats.write += perf_counter() - start
 
 def respond_bytes(handler: BaseHTTPRequestHandler, b: bytes, mime_type: str, status: HTTPStatus = HTTPStatus.OK):
     handler.send_response(status)
     handler.send_header('Content-Type', mime_type)
     handler.send_header('Content-Length', len(b))
     handler.end_headers()
-    handler.wfile.write(b)
+    _write(handler, b)
+
+def respond_page(handler: BaseHTTPRequestHandler, page: CachedPage):
+    """Отдаёт страницу из PageCache с ETag; при совпадении If-None-Match -- 304 без тела."""
+    if etag_matches(handler.headers.get('If-None-Match'), page.etag):
+        handler.send_response(HTTPStatus.NOT_MODIFIED)
+        handler.send_header('ETag', page.etag)
+        handler.end_headers()
+        return
+    
+    handler.send_response(HTTPStatus.OK)
+    handler.send_header('Content-Type', page.mime_type)
+    handler.send_header('Content-Length', len(page.body))
+    handler.send_header('ETag', page.etag)
+    handler.end_headers()
+    _write(handler, page.body)
 
 def respond_html(handler: BaseHTTPRequestHandler, html: str, status: HTTPStatus = HTTPStatus.OK):
     respond_bytes(handler, html.encode('utf-8'), 'text/html', status=status)
     
+def respond_json(handler: BaseHTTPRequestHandler, obj, status: HTTPStatus = HTTPStatus.OK):
+    respond_bytes(handler, json.dumps(obj, ensure_ascii=False).encode('utf-8'), 'application/json', status=status)
+    
+def respond_html_stream(handler: BaseHTTPRequestHandler, template: 'Template', data: dict, status: HTTPStatus = HTTPStatus.OK, chunk_size: int = STREAM_CHUNK_SIZE):
+    """
+    Рендерит шаблон через Template.generate() и отправляет его по частям, не
+    собирая страницу целиком. Фрагменты копятся до chunk_size байт и уходят
+    одним write: для HTTP/1.1 -- кусками Transfer-Encoding: chunked, для
+    HTTP/1.0 -- как есть с закрытием соединения в конце.
+    """
+    chunked = handler.protocol_version == 'HTTP/1.1' and handler.request_version == 'HTTP/1.1'
+    
+    handler.send_response(status)
+    handler.send_header('Content-Type', 'text/html')
+    if chunked:
+        handler.send_header('Transfer-Encoding', 'chunked')
+    else:
+        handler.send_header('Connection', 'close')
+        handler.close_connection = True
+    handler.end_headers()
+    
+    # Рендер и запись чередуются: фаза render -- всё время цикла, кроме записи
+    stats = metrics.current()
+    start = perf_counter()
+    written = stats.write if stats is not None else 0.0
+    buffer = bytearray()
+    for fragment in template.generate(data):
+        buffer += fragment.encode('utf-8')
+        if len(buffer) >= chunk_size:
+            _write_chunk(handler, buffer, chunked)
+            buffer.clear()
+    
+    if buffer:
+        _write_chunk(handler, buffer, chunked)
+    if chunked:
+        _write(handler, b'0\r\n\r\n')
+    if stats is not None:
+        stats.render += perf_counter() - start - (stats.write - written)
+
+def _write_chunk(handler: BaseHTTPRequestHandler, data: bytearray, chunked: bool):
+    if chunked:
+        _write(handler, b'%x\r\n%b\r\n' % (len(data), data))
+    else:
+        _write(handler, data)
+    
+def respond_status(handler: BaseHTTPRequestHandler, status: HTTPStatus):
+    handler.send_response(status)
+    handler.send_header('Content-Length', 0)
+    handler.end_headers()
+    
 def redirect(handler: BaseHTTPRequestHandler, url: str):
     handler.send_response(301)
     handler.send_header('Location', url)
-    handler.end_headers()
\ No newline at end of file
+    handler.send_header('Content-Length', 0)
+    handler.end_headers()
@@ -0,0 +1,142 @@
+"""
+Поиск по кодам и названиям: строка пользователя превращается в запрос
+FTS5, а подсказки при наборе отдаёт индекс префиксов в памяти.
+"""
+import re
+import threading
+from bisect import bisect_left, insort
+from typing import Callable, Iterable, Optional
+
+SEARCH_LIMIT = 20
+SUGGEST_LIMIT = 10
+# С этого размера пачка добавляется одной сортировкой, а не вставками по одной
+BULK_SIZE = 64
+
+_WORD = re.compile(r'\w+')
+
+def fts_query(text: str) -> Optional[str]:
+    """
+    Запрос MATCH: все слова text, последнее -- как префикс ("дол" найдёт
+    «Доллар США»). Слова берутся в кавычки, поэтому операторы FTS5 в
+    тексте пользователя не работают. None, если слов нет.
+    """
+    words = _WORD.findall(text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+def like_pattern(text: str) -> str:
+    """Шаблон LIKE ... ESCAPE '\\' для подстроки text -- поиск без FTS5."""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+class PrefixIndex:
+    """
+    Подсказки при наборе: строки, начинающиеся с префикса, без учёта регистра.
+
+    Это trie, развёрнутый в список строк, отсортированный по casefold():
+    поддерево любого префикса -- непрерывный отрезок списка, его начало
+    находится бинарным поиском. Узел-словарь на каждый символ для миллиона
+    названий занял бы в Python сотни мегабайт, а список хранит только
+    ссылки на сами строки.
+
+    Индекс читает все строки через функцию load из конструктора -- при
+    первой подсказке или заранее, методом load(), -- а дальше репозиторий
+    обновляет его сам через add_many()/discard_many(). Запись
+    в базу и обновление индекса выполняются под lock, чтобы построение не
+    попало между ними и не учло строку дважды.
+    """
+
+    def __init__(self, load: Callable[[], Iterable[str]]):
+        self._load = load
+        self._keys: list[str] | None = None
+        # Сколько раз строка встречается сверх первого (одинаковые названия у разных строк таблицы)
+        self._duplicates: dict[str, int] = {}
+        self.lock = threading.RLock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._keys is not None
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self._ensure_loaded()) + sum(self._duplicates.values())
+
+    def load(self):
+        """Строит индекс заранее, чтобы первая подсказка не ждала чтения таблицы."""
+        with self.lock:
+            self._ensure_loaded()
+
+    def _ensure_loaded(self) -> list[str]:
+        if self._keys is None:
+            # Если чтение из базы упадёт, индекс останется непостроенным, а не пустым
+            texts = self._load()
+            self._keys = []
+            self._add_many(texts)
+        return self._keys
+
+    def _find(self, text: str) -> int | None:
+        keys = self._keys
+        folded = text.casefold()
+        i = bisect_left(keys, folded, key=str.casefold)
+        while i < len(keys) and keys[i].casefold() == folded:
+            if keys[i] == text:
+                return i
+            i += 1
+        return None
+
+    def _add_many(self, texts: Iterable[str]):
+        keys, duplicates = self._keys, self._duplicates
+        texts = list(texts)
+        if len(texts) < BULK_SIZE:
+            for text in texts:
+                if self._find(text) is None:
+                    insort(keys, text, key=str.casefold)
+                else:
+                    duplicates[text] = duplicates.get(text, 0) + 1
+            return
+
+        present = set(keys)
+        for text in texts:
+            if text in present:
+                duplicates[text] = duplicates.get(text, 0) + 1
+            else:
+                present.add(text)
+                keys.append(text)
+        keys.sort(key=str.casefold)
+
+    def add_many(self, texts: Iterable[str]):
+        with self.lock:
+            # До первой подсказки индекса нет: load() и так прочитает всё из базы
+            if self._keys is not None:
+                self._add_many(texts)
+
+    def discard_many(self, texts: Iterable[str]):
+        with self.lock:
+            if self._keys is None:
+                return
+            for text in texts:
+                extra = self._duplicates.get(text)
+                if extra:
+                    if extra == 1:
+                        del self._duplicates[text]
+                    else:
+                        self._duplicates[text] = extra - 1
+                    continue
+                i = self._find(text)
+                if i is not None:
+                    del self._keys[i]
+
+    def complete(self, prefix: str, limit: int = SUGGEST_LIMIT) -> list[str]:
+        """До limit строк, начинающихся с prefix, по алфавиту без учёта регистра."""
+        folded = prefix.casefold()
+        with self.lock:
+            keys = self._ensure_loaded()
+            start = bisect_left(keys, folded, key=str.casefold)
+            candidates = keys[start:start + limit]
+        result = []
+        for text in candidates:
+            if not text.casefold().startswith(folded):
+                break
+            result.append(text)
+        return result
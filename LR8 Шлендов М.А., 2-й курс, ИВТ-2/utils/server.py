@@ -0,0 +1,301 @@
+import selectors
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+from http.client import parse_headers
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from io import BytesIO
+from typing import TYPE_CHECKING, Optional
+
+# asyncio нужен только режиму asyncio и импортируется при его запуске
+if TYPE_CHECKING:
+    import asyncio
+
+KEEP_ALIVE_TIMEOUT = 5
+# Тело длиннее читать не будем: 413 и закрытие соединения; не больше самого большого ограничения маршрутов (MAX_BATCH_BODY)
+MAX_BODY = 64 * 2**20
+
+def adopt_socket(server: HTTPServer, sock: socket.socket):
+    """Подменяет сокет сервера, созданного с bind_and_activate=False, уже открытым слушающим сокетом."""
+    server.socket.close()
+    server.socket = sock
+    server.server_address = sock.getsockname()
+    # HTTPServer.server_bind() берёт имя через getfqdn(), то есть DNS-запросом; при запуске он не нужен
+    server.server_name, server.server_port = server.server_address[:2]
+
+class _Connection:
+    """Соединение PooledHTTPServer: сокет, его обработчик (вместе с буфером rfile) и срок простоя."""
+
+    __slots__ = ('request', 'client_address', 'handler', 'deadline')
+
+    def __init__(self, request, client_address, handler: BaseHTTPRequestHandler):
+        self.request = request
+        self.client_address = client_address
+        self.handler = handler
+        self.deadline = 0.0
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer, обрабатывающий запросы в пуле из max_workers потоков.
+
+    В пул уходит не соединение целиком, а один готовый запрос: между запросами
+    соединение keep-alive ждёт в селекторе отдельного потока и поток пула не
+    занимает. Соединения, простаивающие дольше idle_timeout, закрываются.
+    """
+
+    def __init__(self, server_address, RequestHandlerClass, max_workers: int = 16, bind_and_activate: bool = True, idle_timeout: float = KEEP_ALIVE_TIMEOUT):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='http')
+        self.idle_timeout = idle_timeout
+        self._selector = selectors.DefaultSelector()
+        # Соединения, вернувшиеся из пула, регистрирует в селекторе только его поток
+        self._parked: list[_Connection] = []
+        self._parked_lock = threading.Lock()
+        self._wakeup, self._waker = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._waker.setblocking(False)
+        self._selector.register(self._wakeup, selectors.EVENT_READ)
+        self._closing = False
+        super().__init__(server_address, RequestHandlerClass, bind_and_activate)
+        self._idle_thread = threading.Thread(target=self._serve_idle, name='http-idle', daemon=True)
+        self._idle_thread.start()
+
+    def process_request(self, request, client_address):
+        # Как BaseRequestHandler.__init__, но без handle(): запросы соединения обрабатываются по одному
+        handler = self.RequestHandlerClass.__new__(self.RequestHandlerClass)
+        handler.request, handler.client_address, handler.server = request, client_address, self
+        handler.setup()
+        self._park(_Connection(request, client_address, handler))
+
+    def _park(self, connection: _Connection):
+        connection.deadline = time.monotonic() + self.idle_timeout
+        with self._parked_lock:
+            self._parked.append(connection)
+        try:
+            self._waker.send(b'\0')
+        except BlockingIOError:
+            # Буфер полон: поток селектора и так проснётся
+            pass
+
+    def _serve_idle(self):
+        """Поток селектора: отдаёт в пул соединения, от которых пришли данные, и закрывает простаивающие."""
+        selector = self._selector
+        interval = min(self.idle_timeout, 1.0)
+        next_check = time.monotonic() + interval
+        while not self._closing:
+            with self._parked_lock:
+                parked, self._parked = self._parked, []
+            for connection in parked:
+                selector.register(connection.request, selectors.EVENT_READ, connection)
+
+            for key, _ in selector.select(timeout=interval):
+                connection = key.data
+                if connection is None:
+                    while True:
+                        try:
+                            if not self._wakeup.recv(4096):
+                                break
+                        except BlockingIOError:
+                            break
+                    continue
+                selector.unregister(connection.request)
+                self.executor.submit(self._process_connection, connection)
+
+            now = time.monotonic()
+            if now >= next_check:
+                next_check = now + interval
+                for key in list(selector.get_map().values()):
+                    if key.data is not None and key.data.deadline <= now:
+                        selector.unregister(key.fileobj)
+                        self._close(key.data)
+
+        for key in list(selector.get_map().values()):
+            if key.data is not None:
+                self._close(key.data)
+        selector.close()
+
+    def _process_connection(self, connection: _Connection):
+        handler = connection.handler
+        try:
+            while True:
+                # Как BaseHTTPRequestHandler.handle(): без keep-alive соединение закрывается после ответа
+                handler.close_connection = True
+                handler.handle_one_request()
+                if handler.close_connection:
+                    break
+                if not self._has_request(connection):
+                    self._park(connection)
+                    return
+        except Exception:
+            self.handle_error(connection.request, connection.client_address)
+        self._close(connection)
+
+    def _has_request(self, connection: _Connection) -> bool:
+        """Есть ли уже данные следующего запроса. Конвейерный запрос мог прочитаться в буфер rfile -- селектор его не увидит."""
+        connection.request.setblocking(False)
+        try:
+            return bool(connection.handler.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            connection.request.settimeout(connection.handler.timeout)
+
+    def _close(self, connection: _Connection):
+        try:
+            connection.handler.finish()
+        except OSError:
+            pass
+        self.shutdown_request(connection.request)
+
+    def server_close(self):
+        super().server_close()
+        self._closing = True
+        try:
+            self._waker.send(b'\0')
+        except BlockingIOError:
+            pass
+        self._idle_thread.join()
+        self.executor.shutdown(wait=True)
+        # Вернувшиеся из пула после остановки потока селектора
+        for connection in self._parked:
+            self._close(connection)
+        self._parked.clear()
+        self._wakeup.close()
+        self._waker.close()
+
+class AsyncRequestHandler:
+    """
+    Запрос asyncio-сервера с тем же интерфейсом, что у BaseHTTPRequestHandler
+    (path, headers, send_response, send_header, end_headers, wfile), поэтому
+    контроллеры работают с ним без изменений. Ответ копится в wfile и
+    отправляется в сокет после обработки.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    server_version = BaseHTTPRequestHandler.server_version
+    sys_version = BaseHTTPRequestHandler.sys_version
+
+    def __init__(self, command: str, path: str, request_version: str, headers, body: bytes = b''):
+        self.command = command
+        self.path = path
+        self.request_version = request_version
+        self.headers = headers
+        self.rfile = BytesIO(body)
+        self.wfile = BytesIO()
+        self._headers_buffer: list[str] = []
+
+        connection = headers.get('Connection', '').lower()
+        if request_version == 'HTTP/1.1':
+            self.close_connection = connection == 'close'
+        else:
+            self.close_connection = connection != 'keep-alive'
+
+    def version_string(self) -> str:
+        return f'{self.server_version} {self.sys_version}'
+
+    def date_time_string(self, timestamp=None) -> str:
+        return formatdate(timestamp, usegmt=True)
+
+    def send_response(self, code: int, message: str | None = None):
+        if message is None:
+            try:
+                message = HTTPStatus(code).phrase
+            except ValueError:
+                message = ''
+        self._headers_buffer.append(f'{self.protocol_version} {int(code)} {message}\r\n')
+        self.send_header('Server', self.version_string())
+        self.send_header('Date', self.date_time_string())
+
+    def send_header(self, keyword: str, value):
+        self._headers_buffer.append(f'{keyword}: {value}\r\n')
+        if keyword.lower() == 'connection':
+            if str(value).lower() == 'close':
+                self.close_connection = True
+            elif str(value).lower() == 'keep-alive':
+                self.close_connection = False
+
+    def end_headers(self):
+        self._headers_buffer.append('\r\n')
+        self.wfile.write(''.join(self._headers_buffer).encode('latin-1', 'strict'))
+        self._headers_buffer = []
+
+    def response(self) -> bytes:
+        # Статус без end_headers: дописываем пустое тело, чтобы не сломать keep-alive
+        if self._headers_buffer:
+            self.send_header('Content-Length', 0)
+            self.end_headers()
+        return self.wfile.getvalue()
+
+async def _serve_connection(reader: 'asyncio.StreamReader', writer: 'asyncio.StreamWriter', handler_class, executor: ThreadPoolExecutor):
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+                break
+
+            request_line, _, raw_headers = head.partition(b'\r\n')
+            try:
+                command, path, request_version = request_line.decode('latin-1').split()
+                headers = parse_headers(BytesIO(raw_headers))
+                length = int(headers.get('Content-Length', 0))
+                if length < 0:
+                    raise ValueError(length)
+            except ValueError:
+                writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                break
+
+            if length > MAX_BODY:
+                writer.write(b'HTTP/1.1 413 Request Entity Too Large\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                break
+
+            try:
+                body = await reader.readexactly(length) if length else b''
+            except asyncio.IncompleteReadError:
+                # Клиент закрыл соединение, не дослав тело
+                break
+            handler = handler_class(command, path, request_version, headers, body)
+
+            method = getattr(handler, 'do_' + command, None)
+            if method is None:
+                handler.send_response(HTTPStatus.NOT_IMPLEMENTED)
+            else:
+                try:
+                    await loop.run_in_executor(executor, method)
+                except Exception:
+                    writer.write(b'HTTP/1.1 500 Internal Server Error\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                    break
+
+            writer.write(handler.response())
+            await writer.drain()
+
+            if handler.close_connection:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def serve_async(address: str, port: int, handler_class, max_workers: int = 16, sock: Optional[socket.socket] = None):
+    """
+    HTTP/1.1 сервер на asyncio с keep-alive.
+
+    Разбор запросов и сетевой ввод-вывод идут в цикле событий, а do_GET/do_POST
+    (рендеринг шаблонов и запросы к SQLite) -- в пуле из max_workers потоков.
+    sock -- уже открытый слушающий сокет (тогда address и port не используются).
+    """
+    import asyncio
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='http') as executor:
+        serve = lambda r, w: _serve_connection(r, w, handler_class, executor)
+        if sock is None:
+            server = await asyncio.start_server(serve, address, port)
+        else:
+            server = await asyncio.start_server(serve, sock=sock)
+        async with server:
+            await server.serve_forever()
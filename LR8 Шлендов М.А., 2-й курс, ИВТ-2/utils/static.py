@@ -0,0 +1,193 @@
+import gzip
+import os
+import socket
+import stat
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Optional
+from urllib.parse import unquote
+
+MIME_TYPES: dict = {
+    '.css': 'text/css',
+    '.html': 'text/html',
+    '.js': 'text/javascript'
+}
+
+COMPRESSIBLE_TYPES = ('text/css', 'text/html', 'text/javascript')
+
+class StaticFile:
+    def __init__(self, path: Path, st: os.stat_result, data: Optional[bytes], gzip_data: Optional[bytes]):
+        self.path = path
+        self.mtime_ns = st.st_mtime_ns
+        self.size = st.st_size
+        self.mime_type = MIME_TYPES.get(path.suffix, "application/octet-stream")
+        self.etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        self.last_modified = formatdate(st.st_mtime, usegmt=True)
+        self.data = data
+        self.gzip_data = gzip_data
+
+    @property
+    def gzip_etag(self) -> str:
+        # Строгий ETag различает представления с разными байтами: у gzip-варианта свой
+        return self.etag[:-1] + '-gz"'
+
+    @property
+    def cached_bytes(self) -> int:
+        """Сколько записи занимает в кэше StaticFiles: файл и его gzip-вариант."""
+        return len(self.data or b'') + len(self.gzip_data or b'')
+
+    def is_fresh(self, st: os.stat_result) -> bool:
+        return self.mtime_ns == st.st_mtime_ns and self.size == st.st_size
+
+class StaticFiles:
+    """
+    Раздача файлов из каталога root.
+
+    Содержимое файлов до sendfile_threshold байт хранится в LRU-кэше (не больше
+    max_bytes вместе с gzip-вариантами) и перечитывается при смене
+    mtime/размера; для текстовых типов заранее готовится gzip-вариант (или
+    берётся лежащий рядом файл .gz). Ответы содержат ETag (у gzip-варианта --
+    свой, с суффиксом -gz) и Last-Modified, на совпадающий If-None-Match
+    отдаётся 304. Большие файлы отправляются через sendfile без копирования
+    в память. Пути вне root отклоняются с 403.
+    """
+
+    def __init__(self, root: str = './static', max_bytes: int = 16 * 2**20, sendfile_threshold: int = 256 * 2**10):
+        self.root = Path(root).resolve()
+        self.max_bytes = max_bytes
+        self.sendfile_threshold = sendfile_threshold
+        self._cache: OrderedDict[Path, StaticFile] = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def resolve(self, path: str) -> Optional[Path]:
+        """Путь к файлу внутри root или None, если запрос выходит за его пределы."""
+        relative = unquote(path).lstrip('/')
+        if '\0' in relative:
+            return None
+        resolved = (self.root / relative).resolve()
+        if resolved != self.root and not resolved.is_relative_to(self.root):
+            return None
+        return resolved
+
+    def get(self, path: Path, st: os.stat_result) -> StaticFile:
+        with self._lock:
+            entry = self._cache.get(path)
+            if entry is not None and entry.is_fresh(st):
+                self._cache.move_to_end(path)
+                return entry
+
+        entry = self._load(path, st)
+
+        with self._lock:
+            old = self._cache.pop(path, None)
+            if old is not None:
+                self._cached_bytes -= old.cached_bytes
+            if entry.data is not None:
+                self._cache[path] = entry
+                self._cached_bytes += entry.cached_bytes
+                while self._cached_bytes > self.max_bytes and self._cache:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cached_bytes -= evicted.cached_bytes
+        return entry
+
+    def _load(self, path: Path, st: os.stat_result) -> StaticFile:
+        if st.st_size >= self.sendfile_threshold:
+            return StaticFile(path, st, None, None)
+
+        data = path.read_bytes()
+        entry = StaticFile(path, st, data, None)
+        if entry.mime_type in COMPRESSIBLE_TYPES:
+            gz_path = path.with_name(path.name + '.gz')
+            try:
+                gz_st = gz_path.stat()
+                entry.gzip_data = gz_path.read_bytes() if gz_st.st_mtime_ns >= st.st_mtime_ns else None
+            except FileNotFoundError:
+                pass
+            if entry.gzip_data is None:
+                compressed = gzip.compress(data, mtime=0)
+                entry.gzip_data = compressed if len(compressed) < len(data) else None
+        return entry
+
+    def serve(self, handler: BaseHTTPRequestHandler, path: str):
+        file_path = self.resolve(path)
+        if file_path is None:
+            _respond_empty(handler, HTTPStatus.FORBIDDEN)
+            return
+
+        try:
+            st = file_path.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            _respond_empty(handler, HTTPStatus.NOT_FOUND)
+            return
+
+        if stat.S_ISDIR(st.st_mode):
+            _respond_empty(handler, HTTPStatus.FORBIDDEN)
+            return
+
+        entry = self.get(file_path, st)
+        headers = handler.headers
+
+        body, encoding, etag = entry.data, None, entry.etag
+        if entry.gzip_data is not None and _accepts_gzip(headers.get('Accept-Encoding')):
+            body, encoding, etag = entry.gzip_data, 'gzip', entry.gzip_etag
+
+        if etag_matches(headers.get('If-None-Match'), etag):
+            handler.send_response(HTTPStatus.NOT_MODIFIED)
+            handler.send_header('ETag', etag)
+            handler.send_header('Cache-Control', 'no-cache')
+            if entry.gzip_data is not None:
+                handler.send_header('Vary', 'Accept-Encoding')
+            handler.end_headers()
+            return
+
+        handler.send_response(HTTPStatus.OK)
+        handler.send_header('Content-Type', entry.mime_type)
+        handler.send_header('Content-Length', entry.size if body is None else len(body))
+        handler.send_header('ETag', etag)
+        handler.send_header('Last-Modified', entry.last_modified)
+        handler.send_header('Cache-Control', 'no-cache')
+        if entry.gzip_data is not None:
+            handler.send_header('Vary', 'Accept-Encoding')
+        if encoding is not None:
+            handler.send_header('Content-Encoding', encoding)
+        handler.end_headers()
+
+        if body is not None:
+            handler.wfile.write(body)
+        else:
+            self._send_large(handler, entry)
+
+    def _send_large(self, handler: BaseHTTPRequestHandler, entry: StaticFile):
+        with open(entry.path, 'rb') as f:
+            connection = getattr(handler, 'connection', None)
+            if isinstance(connection, socket.socket):
+                # socket.sendfile использует os.sendfile: данные идут из файла в сокет без копирования
+                connection.sendfile(f, count=entry.size)
+                return
+            while chunk := f.read(self.sendfile_threshold):
+                handler.wfile.write(chunk)
+
+def _respond_empty(handler: BaseHTTPRequestHandler, status: HTTPStatus):
+    handler.send_response(status)
+    handler.send_header('Content-Length', 0)
+    handler.end_headers()
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    if not accept_encoding:
+        return False
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
@@ -0,0 +1,18 @@
+from time import perf_counter
+
+from jinja2 import Template
+
+from utils.metrics import metrics
+
+class MeteredTemplate(Template):
+    """Template, время render() которого идёт в метрики текущего запроса (фаза render); см. Environment.template_class."""
+
+    def render(self, *args, **kwargs) -> str:
+        stats = metrics.current()
+        if stats is None:
+            return super().render(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            stats.render += perf_counter() - start